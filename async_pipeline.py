@@ -0,0 +1,140 @@
+"""Contains asyncio pipeline sending reminders, what overlaps reading database, rendering
+messages and waiting for email server"""
+import asyncio
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from instrumentation import INSTRUMENTATION
+
+
+class AsyncReminderPipeline():
+    """Streams due materials from database into bounded queue of rendered messages consumed
+    by limited number of sending tasks. Producer waits when queue is full, so slow email
+    server does not make pipeline keep all messages in memory. Materials already notified
+    for their review date are skipped and sent ones are saved in notification ledger in
+    small batches while sending goes on"""
+
+    def __init__(self, database, dispatcher, messages_factory, queue_size=200,
+                 batch_size=100, days_interval=3, suppressor=None, record_size=20):
+        """Initiates pipeline
+
+        Arguments:
+            database (Database): connected database of raw materials
+            dispatcher (MailDispatcher): dispatcher sending single messages, its pool size
+            decides number of sending tasks
+            messages_factory (callable): creates list of messages from list of materials
+            queue_size (int): maximal number of rendered messages waiting for sending
+            batch_size (int): number of materials read and rendered at once
+            days_interval (int): number of days what added to last review date indicates
+            new date when material should be reviewed
+            suppressor (ReminderSuppressor): drops reminders sent recently and saves sent
+            ones, reminders are not suppressed when None
+            record_size (int): number of sent messages saved in ledger at once"""
+
+        self.database = database
+        self.dispatcher = dispatcher
+        self.messages_factory = messages_factory
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.days_interval = days_interval
+        self.suppressor = suppressor
+        self.record_size = record_size
+        self.unrecorded_results = []
+
+    async def produce(self, messages_queue, senders_count):
+        """Reads due materials in batches and puts their rendered messages into queue.
+        Database is read in event loop thread, which owns its connection, while previous
+        batch is rendered in executor thread
+
+        Arguments:
+            messages_queue (asyncio.Queue): queue of pairs of material and message
+            senders_count (int): number of sending tasks, each gets end marker"""
+
+        loop = asyncio.get_running_loop()
+        review_cutoff_date = datetime.date.today() - datetime.timedelta(days=self.days_interval)
+        materials = self.database.iter_materials_to_notify(review_cutoff_date,
+                                                           self.batch_size)
+        batch = list(islice(materials, self.batch_size))
+        while batch:
+            if self.suppressor is not None:
+                batch = self.suppressor.filter(batch)
+            rendering = loop.run_in_executor(None, self.messages_factory, batch)
+            next_batch = list(islice(materials, self.batch_size))
+            messages = await rendering
+            for material, message in zip(batch, messages):
+                if self.dispatcher.rate_limiter is not None:
+                    self.dispatcher.rate_limiter.change_backlog(1)
+                await messages_queue.put((material, message))
+            INSTRUMENTATION.count("async.queued_messages", len(batch))
+            batch = next_batch
+        for _ in range(senders_count):
+            await messages_queue.put(None)
+
+    async def send(self, messages_queue, executor, results):
+        """Sends messages taken from queue until end marker is received. Blocking SMTP
+        conversation runs in executor thread, so event loop keeps reading database
+
+        Arguments:
+            messages_queue (asyncio.Queue): queue of pairs of material and message
+            executor (ThreadPoolExecutor): threads talking with email server
+            results (list): list extended with pairs of material and DispatchResult"""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await messages_queue.get()
+            if item is None:
+                return
+            material, message = item
+            result = await loop.run_in_executor(executor, self.dispatcher.send_one,
+                                                material.responsible_employee, message)
+            results.append((material, result))
+            self.unrecorded_results.append((material, result))
+            if len(self.unrecorded_results) >= self.record_size:
+                self.record_results()
+
+    def record_results(self):
+        """Saves materials of sent messages not recorded yet in notification ledger and
+        suppressor. Called in event loop thread, which owns database connection"""
+
+        sent_materials = [material for material, result in self.unrecorded_results
+                          if result.success]
+        self.unrecorded_results = []
+        if not sent_materials:
+            return
+        self.database.record_notifications(sent_materials)
+        if self.suppressor is not None:
+            self.suppressor.mark_sent(sent_materials)
+
+    async def run_async(self):
+        """Runs producer and sending tasks until all due materials are sent. Messages sent
+        before failure or interruption are recorded too, so they are not sent again
+
+        Returns:
+            results (list): DispatchResult of every sent message in order of sending"""
+
+        senders_count = self.dispatcher.pool.size
+        messages_queue = asyncio.Queue(maxsize=self.queue_size)
+        results = []
+        self.unrecorded_results = []
+        with ThreadPoolExecutor(max_workers=senders_count) as executor:
+            tasks = [asyncio.create_task(self.produce(messages_queue, senders_count))]
+            tasks.extend(asyncio.create_task(self.send(messages_queue, executor, results))
+                         for _ in range(senders_count))
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            finally:
+                self.record_results()
+        return [result for _, result in results]
+
+    @INSTRUMENTATION.timed("async.run")
+    def run(self):
+        """Runs pipeline in new event loop
+
+        Returns:
+            results (list): DispatchResult of every sent message in order of sending"""
+
+        return asyncio.run(self.run_async())
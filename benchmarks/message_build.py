@@ -0,0 +1,68 @@
+"""Compares cost of building reminder messages as plain strings and as MIME messages
+with shared policy and batch headers, so message formatting does not cost throughput.
+
+Usage:
+    python -m benchmarks.message_build --messages 10000 --output message_build.json"""
+from argparse import ArgumentParser
+import datetime
+import json
+import platform
+from benchmarks.run_benchmarks import measure
+from database_manager import Material
+from program import Program
+
+
+def create_materials(materials_number):
+    """Returns synthetic materials with non-ASCII names
+
+    Arguments:
+        materials_number (int): number of created materials
+
+    Returns:
+        materials (list): Material objects"""
+
+    today = datetime.date.today()
+    return [Material(number, f"Żelatyna {number}", 100000 + number, number % 5000, 4.2,
+                     today, f"buyer{number % 200}@example.com")
+            for number in range(materials_number)]
+
+
+def main():
+    """Measures message building and saves JSON report"""
+
+    argument_parser = ArgumentParser(description="Benchmark of reminder message building")
+    argument_parser.add_argument("--messages", type=int, default=10000,
+                                 help="Number of built reminders")
+    argument_parser.add_argument("--repeat", type=int, default=3,
+                                 help="Number of runs of every benchmark")
+    argument_parser.add_argument("--output", default="message_build.json",
+                                 help="Path of JSON file with results")
+    arguments = argument_parser.parse_args()
+    materials = create_materials(arguments.messages)
+    program = Program()
+    benchmarks = {
+        "plain_string": lambda: [
+            Program.fill_message_template(material.sku_description,
+                                          material.current_stock_kg,
+                                          material.last_review_date)
+            for material in materials],
+        "mime_build": lambda: program.build_reminder_messages(materials),
+        "mime_build_and_serialize": lambda: [
+            message.as_bytes() for message in program.build_reminder_messages(materials)],
+    }
+    report = {"created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "messages": arguments.messages,
+              "results": []}
+    for name, function in benchmarks.items():
+        timings = measure(function, arguments.repeat)
+        microseconds = timings["seconds_min"] / arguments.messages * 1000000
+        report["results"].append({"benchmark": name,
+                                  "microseconds_per_message": microseconds, **timings})
+        print(f"{name:<28}{timings['seconds_min']:>10.4f} s {microseconds:>10.1f} us/message")
+    with open(arguments.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved in {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Measures database and reminder hot paths on synthetic raw materials tables of growing size
+and saves results as JSON, so they can be compared between releases.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 1000000 --output results.json"""
+from argparse import ArgumentParser, Namespace
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from async_pipeline import AsyncReminderPipeline
+from database_manager import Database
+from mail_dispatcher import MailDispatcher, SmtpConnectionPool
+from program import Program
+from stock_report import StockReport
+
+
+class SinkConnection():
+    """Stands in for logged in SMTP connection, accepts and drops every message"""
+
+    def __init__(self):
+        """Initiates sink with empty counter of messages"""
+
+        self.sock = True
+        self.sent_messages = 0
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        """Counts message instead of sending it"""
+
+        self.sent_messages += 1
+        return {}
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        """Counts message instead of sending it"""
+
+        self.sent_messages += 1
+        return {}
+
+    def quit(self):
+        """Ends fake session"""
+
+    def close(self):
+        """Ends fake session"""
+
+
+def create_synthetic_database(path, rows_number, seed=2022):
+    """Creates database file with raw materials table filled with random materials
+
+    Arguments:
+        path (str): path of created database file
+        rows_number (int): number of materials in table
+        seed (int): seed of random generator, so tables are the same between runs
+
+    Returns:
+        database (Database): connected database"""
+
+    if os.path.exists(path):
+        os.remove(path)
+    database = Database(path)
+    database.connect_database()
+    database.create_raw_materials_table()
+    generator = random.Random(seed)
+    today = datetime.date.today()
+    employees = [f"buyer{number}@example.com" for number in range(200)]
+    rows = ((f"RM{sku_id}", sku_id, generator.randint(0, 20000),
+             round(generator.uniform(0.5, 50), 2),
+             today - datetime.timedelta(days=generator.randint(0, 30)),
+             generator.choice(employees))
+            for sku_id in range(100000, 100000 + rows_number))
+    with database.transaction() as cursor:
+        cursor.executemany("INSERT INTO raw_materials_stock"
+                           "(sku_description, sku_id, current_stock_kg, price,"
+                           " last_review_date, responsible_employee)"
+                           " VALUES (?, ?, ?, ?, ?, ?)", rows)
+    return database
+
+
+def measure(function, repeat):
+    """Runs function several times and returns its timings
+
+    Arguments:
+        function (callable): measured code
+        repeat (int): number of runs
+
+    Returns:
+        timings (dict): minimal, mean and maximal time of single run [s]"""
+
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    return {"seconds_min": min(timings), "seconds_mean": statistics.mean(timings),
+            "seconds_max": max(timings), "repeat": repeat}
+
+
+def create_benchmarked_program(database):
+    """Returns program working on provided database and sending emails to sink
+
+    Arguments:
+        database (Database): connected database
+
+    Returns:
+        program (Program): program with mocked email server"""
+
+    program = Program()
+    program.database = database
+    database.parsed_arguments = Namespace(smtp_connections=4, max_per_minute=None,
+                                          max_per_day=None, shards=[], suppression_days=7,
+                                          dry_run=False)
+    program.email.ask_admin_password = lambda: "benchmark"
+    program.email.open_connection = lambda admin_password: SinkConnection()
+    return program
+
+
+def send_reminders_from_empty_outbox(program):
+    """Sends reminders of all due materials, clearing outbox and sent reminders left
+    by previous run first
+
+    Arguments:
+        program (Program): program with mocked email server"""
+
+    with program.database.transaction() as cursor:
+        cursor.execute("DELETE FROM outbox")
+        cursor.execute("DELETE FROM sent_reminders")
+    program.send_email_reminders()
+
+
+def send_reminders_async(program):
+    """Sends reminders of all due materials through asyncio pipeline, clearing
+    notification ledger left by previous run first
+
+    Arguments:
+        program (Program): program with mocked email server"""
+
+    with program.database.transaction() as cursor:
+        cursor.execute("DELETE FROM notification_ledger")
+    with SmtpConnectionPool(lambda: program.email.open_connection("benchmark"),
+                            size=4) as pool:
+        dispatcher = MailDispatcher(pool, sender=program.email.admin_email)
+        AsyncReminderPipeline(program.database, dispatcher,
+                              program.build_reminder_messages).run()
+
+
+def run_size(rows_number, repeat, directory):
+    """Measures every hot path on table of provided size
+
+    Arguments:
+        rows_number (int): number of materials in table
+        repeat (int): number of runs of every benchmark
+        directory (str): directory where synthetic database is created
+
+    Returns:
+        results (list): timings of every benchmark"""
+
+    database = create_synthetic_database(
+        os.path.join(directory, f"benchmark_{rows_number}.db"), rows_number)
+    program = create_benchmarked_program(database)
+    due_materials = database.get_materials_to_review()
+    benchmarks = {
+        "get_all_materials": database.get_all_materials,
+        "get_materials_to_review": database.get_materials_to_review,
+        "stock_report": StockReport(database).create,
+        "show_data": lambda: database.show_data(database.iter_materials()),
+        "fill_message_template": lambda: [
+            program.fill_message_template(material.sku_description,
+                                          material.current_stock_kg,
+                                          material.last_review_date)
+            for material in due_materials],
+        "send_email_reminders": lambda: send_reminders_from_empty_outbox(program),
+        "async_pipeline": lambda: send_reminders_async(program),
+    }
+    results = []
+    for name, function in benchmarks.items():
+        with open(os.devnull, "w", encoding="utf-8") as devnull, \
+                contextlib.redirect_stdout(devnull):
+            timings = measure(function, repeat)
+        results.append({"benchmark": name, "rows": rows_number,
+                        "due_rows": len(due_materials), **timings})
+        print(f"{name:<28}{rows_number:>10} rows {timings['seconds_min']:>10.4f} s")
+    database.disconnect_database()
+    return results
+
+
+def main():
+    """Runs benchmarks with command line options and saves JSON report"""
+
+    argument_parser = ArgumentParser(description="Benchmarks of database and reminder paths")
+    argument_parser.add_argument("--sizes", type=int, nargs="+",
+                                 default=[1000, 100000, 1000000],
+                                 help="Numbers of rows of synthetic tables")
+    argument_parser.add_argument("--repeat", type=int, default=3,
+                                 help="Number of runs of every benchmark")
+    argument_parser.add_argument("--output", default="benchmark_results.json",
+                                 help="Path of JSON file with results")
+    arguments = argument_parser.parse_args()
+    report = {"created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(),
+              "sqlite": sqlite3.sqlite_version,
+              "platform": platform.platform(),
+              "results": []}
+    with tempfile.TemporaryDirectory() as directory:
+        for rows_number in arguments.sizes:
+            report["results"].extend(run_size(rows_number, arguments.repeat, directory))
+    with open(arguments.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved in {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measures wall time of starting program for quick read-only queries, compared with
+importing all sending modules eagerly, so startup cost of scripted calls can be tracked.
+
+Usage:
+    python -m benchmarks.startup --rows 1000 --repeat 10 --output startup.json"""
+from argparse import ArgumentParser
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from benchmarks.run_benchmarks import create_synthetic_database, measure
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_PATH = os.path.join(PROJECT_DIRECTORY, "main.py")
+EAGER_IMPORTS = ("import program, mail_manager, mail_dispatcher, outbox, rate_limiter, "
+                 "reminder_daemon, async_pipeline, shard_scanner, stock_forecast, "
+                 "material_importer, cProfile, html")
+
+
+def run_command(command, directory):
+    """Runs command in provided directory discarding its output
+
+    Arguments:
+        command (list): program and its arguments
+        directory (str): working directory of command"""
+
+    environment = dict(os.environ, PYTHONPATH=PROJECT_DIRECTORY)
+    subprocess.run(command, cwd=directory, env=environment, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def main():
+    """Measures startup of program and saves JSON report"""
+
+    argument_parser = ArgumentParser(description="Benchmark of program startup")
+    argument_parser.add_argument("--rows", type=int, default=1000,
+                                 help="Number of rows of synthetic table")
+    argument_parser.add_argument("--repeat", type=int, default=10,
+                                 help="Number of runs of every benchmark")
+    argument_parser.add_argument("--output", default="startup.json",
+                                 help="Path of JSON file with results")
+    arguments = argument_parser.parse_args()
+    report = {"created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "rows": arguments.rows, "results": []}
+    with tempfile.TemporaryDirectory() as directory:
+        os.mkdir(os.path.join(directory, "data"))
+        create_synthetic_database(os.path.join(directory, "data", "goods_database.db"),
+                                  arguments.rows).disconnect_database()
+        benchmarks = {
+            "interpreter": [sys.executable, "-c", "pass"],
+            "import_program": [sys.executable, "-c", "import program"],
+            "import_program_eager": [sys.executable, "-c", EAGER_IMPORTS],
+            "list_due": [sys.executable, MAIN_PATH, "--list_due"],
+            "show_page": [sys.executable, MAIN_PATH, "--show", "--limit", "20"],
+        }
+        for name, command in benchmarks.items():
+            timings = measure(lambda: run_command(command, directory), arguments.repeat)
+            report["results"].append({"benchmark": name, **timings})
+            print(f"{name:<28}{timings['seconds_min'] * 1000:>10.1f} ms")
+    with open(arguments.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved in {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
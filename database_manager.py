@@ -1,23 +1,189 @@
 """Includes class connected with database operations"""
-from argparse import ArgumentParser
+from argparse import SUPPRESS, ArgumentParser, ArgumentTypeError
 from collections import namedtuple
+from contextlib import contextmanager
+from itertools import groupby
+import json
+from operator import attrgetter
 import os
+import re
 import sqlite3
 import datetime
-from exceptions.database_manager_exceptions import NotExistingSKU
+from urllib.parse import quote
+from exceptions.database_manager_exceptions import DuplicatedSKUs, NotExistingSKU
+from instrumentation import INSTRUMENTATION
+from table_renderer import TableRenderer
+
+# Each entry upgrades the schema by one version, stored in PRAGMA user_version
+SCHEMA_MIGRATIONS = [
+    ["CREATE INDEX IF NOT EXISTS idx_raw_materials_last_review_date "
+     "ON raw_materials_stock(last_review_date)"],
+    ["CREATE UNIQUE INDEX IF NOT EXISTS idx_raw_materials_sku_id "
+     "ON raw_materials_stock(sku_id)"],
+    ["CREATE TABLE IF NOT EXISTS notification_ledger (sku_id INTEGER, "
+     "last_review_date DATE, notified_at TIMESTAMP, "
+     "PRIMARY KEY (sku_id, last_review_date))",
+     "CREATE TABLE IF NOT EXISTS reminder_state (name TEXT PRIMARY KEY, value TEXT)"],
+    ["CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+     "dedupe_key TEXT UNIQUE, recipient TEXT, message BLOB, status TEXT, "
+     "attempts INTEGER, next_attempt_at TIMESTAMP, last_error TEXT, "
+     "created_at TIMESTAMP, sent_at TIMESTAMP)",
+     "CREATE INDEX IF NOT EXISTS idx_outbox_status_next_attempt "
+     "ON outbox(status, next_attempt_at)"],
+    ["UPDATE raw_materials_stock SET last_review_date = date(last_review_date) "
+     "WHERE date(last_review_date) IS NOT NULL "
+     "AND last_review_date IS NOT date(last_review_date)",
+     "UPDATE OR IGNORE notification_ledger SET last_review_date = date(last_review_date) "
+     "WHERE date(last_review_date) IS NOT NULL "
+     "AND last_review_date IS NOT date(last_review_date)"],
+    ["CREATE TABLE IF NOT EXISTS stock_history (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+     "sku_id INTEGER, stock_kg NUMERIC, recorded_at TIMESTAMP)",
+     "CREATE INDEX IF NOT EXISTS idx_stock_history_sku_id ON stock_history(sku_id, id)",
+     "CREATE TABLE IF NOT EXISTS stock_forecast (sku_id INTEGER PRIMARY KEY, "
+     "consumption_kg_per_day REAL, days_of_cover REAL, computed_at TIMESTAMP)",
+     "CREATE INDEX IF NOT EXISTS idx_stock_forecast_days_of_cover "
+     "ON stock_forecast(days_of_cover)",
+     "CREATE TRIGGER IF NOT EXISTS trg_raw_materials_stock_insert_history "
+     "AFTER INSERT ON raw_materials_stock BEGIN "
+     "INSERT INTO stock_history(sku_id, stock_kg, recorded_at) "
+     "VALUES (NEW.sku_id, NEW.current_stock_kg, datetime('now', 'localtime')); END",
+     "CREATE TRIGGER IF NOT EXISTS trg_raw_materials_stock_update_history "
+     "AFTER UPDATE OF current_stock_kg ON raw_materials_stock BEGIN "
+     "INSERT INTO stock_history(sku_id, stock_kg, recorded_at) "
+     "VALUES (NEW.sku_id, NEW.current_stock_kg, datetime('now', 'localtime')); END",
+     "INSERT INTO stock_history(sku_id, stock_kg, recorded_at) "
+     "SELECT sku_id, current_stock_kg, datetime('now', 'localtime') FROM raw_materials_stock"],
+    ["CREATE TABLE IF NOT EXISTS sent_reminders (key_hash BLOB PRIMARY KEY, "
+     "sent_at TIMESTAMP) WITHOUT ROWID",
+     "CREATE INDEX IF NOT EXISTS idx_sent_reminders_sent_at ON sent_reminders(sent_at)"],
+    ["DELETE FROM reminder_state WHERE name = 'last_review_cutoff_date'"],
+    ["DROP TRIGGER IF EXISTS trg_raw_materials_stock_update_history",
+     "CREATE TRIGGER trg_raw_materials_stock_update_history "
+     "AFTER UPDATE OF current_stock_kg ON raw_materials_stock "
+     "WHEN NEW.current_stock_kg IS NOT OLD.current_stock_kg BEGIN "
+     "INSERT INTO stock_history(sku_id, stock_kg, recorded_at) "
+     "VALUES (NEW.sku_id, NEW.current_stock_kg, datetime('now', 'localtime')); END"],
+]
+# Index of migration what requires every SKU to be saved only once
+UNIQUE_SKU_MIGRATION = 1
+
+
+def convert_date(value):
+    """Converts ISO date saved in DATE column into date object. Value what is not valid
+    ISO date is returned as text, so single wrong row does not break reading table
+
+    Arguments:
+        value (bytes): saved value
+
+    Returns:
+        date (datetime.date): converted date"""
+
+    text = value.decode()
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def convert_timestamp(value):
+    """Converts ISO date and time saved in TIMESTAMP column into datetime object
+
+    Arguments:
+        value (bytes): saved value
+
+    Returns:
+        timestamp (datetime.datetime): converted date and time"""
+
+    text = value.decode()
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+# Dates are saved as ISO text, what keeps them sortable, comparable and indexable as text
+sqlite3.register_adapter(datetime.date, datetime.date.isoformat)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", convert_date)
+sqlite3.register_converter("TIMESTAMP", convert_timestamp)
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "busy_timeout": 5000,
+}
+
+# PRAGMAs changing database file are not set on read-only connections
+WRITE_PRAGMAS = ("journal_mode", "synchronous")
+
+MATERIAL_COLUMNS = ("id, sku_description, sku_id, current_stock_kg, "
+                    "price, last_review_date, responsible_employee")
+MATERIAL_COLUMN_NAMES = MATERIAL_COLUMNS.split(", ")
+
+
+def split_columns(value):
+    """Converts comma separated names of columns provided as flag value into list
+
+    Arguments:
+        value (str): flag value
+
+    Returns:
+        columns (list): names of columns"""
+
+    return [column.strip() for column in value.split(",")]
+
+
+def parse_stock_level(value):
+    """Converts SKU=KG pair provided as command argument into material sku code and
+    new quantity
+
+    Arguments:
+        value (str): command argument
+
+    Returns:
+        stock_level (tuple): material sku code and new quantity [kg]"""
+
+    sku_id, separator, quantity = value.partition("=")
+    if not separator:
+        raise ArgumentTypeError(f"Expected SKU=KG, got {value}")
+    try:
+        stock_level = int(sku_id), float(quantity)
+    except ValueError as error:
+        raise ArgumentTypeError(f"Wrong stock level {value}") from error
+    if stock_level[1] < 0:
+        raise ArgumentTypeError(f"Stock can not be negative: {value}")
+    return stock_level
+
+
+class Material(namedtuple("Material", MATERIAL_COLUMNS)):
+    """Represents single row of raw materials table"""
+
+    __slots__ = ()
 
 
 class Database():
     """Represents database of raw material stocks"""
 
-    def __init__(self, path="data/goods_database.db"):
-        """Initiates database object"""
+    def __init__(self, path="data/goods_database.db", pragmas=None, read_only=False):
+        """Initiates database object
+
+        Arguments:
+            path (str): path of database file
+            pragmas (dict): SQLite PRAGMA values overriding DEFAULT_PRAGMAS
+            read_only (bool): opens existing database file without possibility of
+            changing it"""
 
         self.exists = False
         self.path = path
+        self.read_only = read_only
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
         self.parsed_arguments = None
         self.cursor = None
         self.connection = None
+        self.transaction_depth = 0
+        self.write_counter = 0
 
     def define_parser_arguments(self):
         """Defines arguments connected with database as flags able to trigger
@@ -30,7 +196,205 @@ class Database():
         argument_parser.add_argument("--add",
                                      help="Add new raw material",
                                      action="store_true")
+        argument_parser.add_argument("--import",
+                                     help="Import or update raw materials from CSV or "
+                                          "JSON Lines file and quit",
+                                     dest="import_file", metavar="FILE")
+        argument_parser.add_argument("--update_stocks",
+                                     help="Set stock levels from CSV or JSON Lines file "
+                                          "with sku_id and current_stock_kg and quit",
+                                     metavar="FILE")
+        argument_parser.add_argument("--run_once",
+                                     help="Send reminders about newly due materials "
+                                          "without interaction and quit",
+                                     action="store_true")
+        argument_parser.add_argument("--daemon",
+                                     help="Send reminders about newly due materials "
+                                          "periodically without interaction",
+                                     action="store_true")
+        argument_parser.add_argument("--async_send",
+                                     help="Send reminders about due materials without "
+                                          "interaction through asyncio pipeline, what "
+                                          "reads database while emails are sent, and quit",
+                                     action="store_true")
+        argument_parser.add_argument("--queue_size",
+                                     help="Maximal number of rendered reminders waiting "
+                                          "for sending in --async_send mode",
+                                     type=int, default=200)
+        argument_parser.add_argument("--interval_minutes",
+                                     help="Minutes between reminder runs in daemon mode",
+                                     type=float, default=60)
+        argument_parser.add_argument("--password_file",
+                                     help="File with email password used instead of "
+                                          "ADMIN_EMAIL_PASSWORD environment variable",
+                                     metavar="FILE")
+        argument_parser.add_argument("--pragma",
+                                     help="SQLite PRAGMA set on database connection, "
+                                          "may be repeated",
+                                     action="append", default=[], metavar="NAME=VALUE")
+        argument_parser.add_argument("--list_due",
+                                     help="Print raw materials to be reviewed and quit",
+                                     action="store_true")
+        argument_parser.add_argument("--show",
+                                     help="Print raw materials table and quit",
+                                     action="store_true")
+        argument_parser.add_argument("--export",
+                                     help="Write raw materials table in chosen format "
+                                          "and quit",
+                                     choices=["csv", "jsonl"])
+        argument_parser.add_argument("--output",
+                                     help="File written by --show or --export, standard "
+                                          "output by default",
+                                     metavar="FILE")
+        argument_parser.add_argument("--columns",
+                                     help="Comma separated names of shown columns",
+                                     type=split_columns)
+        argument_parser.add_argument("--limit",
+                                     help="Maximal number of shown rows", type=int)
+        argument_parser.add_argument("--offset",
+                                     help="Number of rows skipped from table beginning",
+                                     type=int, default=0)
+        argument_parser.add_argument("--smtp_connections",
+                                     help="Number of email server connections used "
+                                          "to send reminders at once",
+                                     type=int, default=4)
+        argument_parser.add_argument("--max_per_minute",
+                                     help="Maximal number of emails sent per minute",
+                                     type=int)
+        argument_parser.add_argument("--max_per_day",
+                                     help="Maximal number of emails sent per day",
+                                     type=int)
+        argument_parser.add_argument("--suppression_days",
+                                     help="Days after sending when reminder to the same "
+                                          "person about the same material and review date "
+                                          "is not sent again",
+                                     type=float, default=7)
+        argument_parser.add_argument("--transport",
+                                     help="Transport reminders are sent through: "
+                                          "administrator's email server, plain local "
+                                          "SMTP server, mailbox file or memory",
+                                     choices=["smtp", "local_smtp", "mbox", "maildir",
+                                              "memory"],
+                                     default="smtp")
+        argument_parser.add_argument("--transport_target",
+                                     help="HOST:PORT of local SMTP server or path of "
+                                          "mailbox used by chosen transport",
+                                     metavar="TARGET")
+        argument_parser.add_argument("--dry_run",
+                                     help="Scan database, render reminders and pass them "
+                                          "to transport at full speed, print messages "
+                                          "sent per second and discard database changes, "
+                                          "memory transport is used instead of email "
+                                          "server",
+                                     action="store_true")
+        argument_parser.add_argument("--shards",
+                                     help="Databases of plants or directories with them "
+                                          "scanned for materials to review instead of "
+                                          "main database when reminders are sent",
+                                     nargs="+", default=[], metavar="PATH")
+        argument_parser.add_argument("--shard_workers",
+                                     help="Number of shards scanned at once, number of "
+                                          "CPUs by default",
+                                     type=int)
+        argument_parser.add_argument("--shard_processes",
+                                     help="Scan shards in separate processes instead "
+                                          "of threads",
+                                     action="store_true")
+        argument_parser.add_argument("--metrics_file",
+                                     help="Collect timings of hot paths and save them "
+                                          "in file when program ends",
+                                     metavar="FILE")
+        argument_parser.add_argument("--metrics_format",
+                                     help="Format of metrics file",
+                                     choices=["json", "prometheus"], default="json")
+        argument_parser.add_argument("--profile",
+                                     help="Profile program run with cProfile and save "
+                                          "statistics in file",
+                                     metavar="FILE")
+        self.define_subcommands(argument_parser)
         self.parsed_arguments = argument_parser.parse_args()
+        if self.parsed_arguments.transport == "memory" and not self.parsed_arguments.dry_run:
+            argument_parser.error("memory transport drops messages, it can be used only "
+                                  "with --dry_run")
+        if self.parsed_arguments.dry_run and self.parsed_arguments.command not in (None,
+                                                                                   "remind"):
+            argument_parser.error("--dry_run can be used only with remind subcommand")
+
+    @staticmethod
+    def define_subcommands(argument_parser):
+        """Defines subcommands performing single operation without interactive menu.
+        Options shared with flags of main parser are not set when they are not provided,
+        so values of main parser flags are kept
+
+        Arguments:
+            argument_parser (ArgumentParser): parser of program arguments"""
+
+        subparsers = argument_parser.add_subparsers(dest="command", metavar="COMMAND")
+        list_parser = subparsers.add_parser("list", help="Print raw materials table")
+        due_parser = subparsers.add_parser("due", help="Print raw materials to be reviewed")
+        due_parser.add_argument("--days", help="Number of days after last review when "
+                                               "material should be reviewed",
+                                type=int, default=3)
+        due_parser.add_argument("--format", help="Format of printed materials",
+                                choices=["table", "csv", "jsonl"], default="table",
+                                dest="output_format")
+        export_parser = subparsers.add_parser("export",
+                                              help="Write raw materials table in chosen "
+                                                   "format")
+        export_parser.add_argument("export", help="Format of written table",
+                                   choices=["csv", "jsonl"])
+        export_parser.add_argument("--output", help="Written file, standard output "
+                                                    "by default",
+                                   metavar="FILE", default=SUPPRESS)
+        for page_parser in [list_parser, export_parser]:
+            page_parser.add_argument("--columns", help="Comma separated names of columns",
+                                     type=split_columns, default=SUPPRESS)
+            page_parser.add_argument("--limit", help="Maximal number of rows", type=int,
+                                     default=SUPPRESS)
+            page_parser.add_argument("--offset", help="Number of rows skipped from table "
+                                                      "beginning",
+                                     type=int, default=SUPPRESS)
+        for filtered_parser in [list_parser, due_parser, export_parser]:
+            filtered_parser.add_argument("--sku", help="Process only materials with "
+                                                       "provided SKUs",
+                                         type=int, nargs="+", dest="sku_ids")
+        add_parser = subparsers.add_parser("add", help="Add raw materials")
+        add_parser.add_argument("--material", help="Added material, may be repeated",
+                                nargs=5, action="append", default=[], dest="materials",
+                                metavar=("DESCRIPTION", "SKU", "STOCK_KG", "PRICE",
+                                         "EMAIL"))
+        add_parser.add_argument("--file", help="CSV or JSON Lines file with added or "
+                                               "updated materials",
+                                dest="materials_file", metavar="FILE")
+        stock_parser = subparsers.add_parser("set-stock",
+                                             help="Set stock levels and review dates")
+        stock_parser.add_argument("stock_levels", help="New quantity of material",
+                                  type=parse_stock_level, nargs="*", metavar="SKU=KG")
+        stock_parser.add_argument("--file", help="CSV or JSON Lines file with sku_id and "
+                                                 "current_stock_kg",
+                                  dest="stocks_file", metavar="FILE")
+        remind_parser = subparsers.add_parser("remind",
+                                              help="Send reminders about materials to be "
+                                                   "reviewed")
+        remind_parser.add_argument("--digest", help="Send one email per responsible person",
+                                   action="store_true")
+        remind_parser.add_argument("--pending", help="Send only reminders left in outbox "
+                                                     "by previous runs",
+                                   action="store_true")
+        report_parser = subparsers.add_parser("report",
+                                              help="Print stock value and review backlog "
+                                                   "report")
+        report_parser.add_argument("--days", help="Number of days after last review when "
+                                                  "material should be reviewed",
+                                   type=int, default=3)
+        report_parser.add_argument("--format", help="Format of printed report",
+                                   choices=["table", "json"], default="table",
+                                   dest="output_format")
+        import_parser = subparsers.add_parser("import",
+                                              help="Import or update raw materials from "
+                                                   "CSV or JSON Lines files")
+        import_parser.add_argument("import_files", help="Imported file", nargs="+",
+                                   metavar="FILE")
 
     def check_database_existence(self):
         """Checks if database with provided path exists"""
@@ -38,20 +402,75 @@ class Database():
         self.exists = os.path.exists(self.path)
 
     def connect_database(self):
-        """Creates new database connection"""
-
-        with sqlite3.connect(self.path) as self.connection:
-            self.cursor = self.connection.cursor()
+        """Opens database connection kept for whole program run, if it is not opened yet,
+        and configures it with PRAGMA values"""
+
+        if self.connection is not None:
+            return
+        if self.read_only:
+            self.connection = sqlite3.connect(
+                f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True,
+                detect_types=sqlite3.PARSE_DECLTYPES)
+        else:
+            self.connection = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES)
+        self.cursor = self.connection.cursor()
+        for name, value in self.pragmas.items():
+            if self.read_only and name in WRITE_PRAGMAS:
+                continue
+            if not re.fullmatch(r"\w+", name) or not re.fullmatch(r"[\w.-]+", str(value)):
+                raise ValueError(f"Wrong PRAGMA {name}={value}")
+            self.cursor.execute(f"PRAGMA {name} = {value}")
 
     def disconnect_database(self):
         """Disconnects database"""
 
         self.connection.close()
+        self.connection = None
+        self.cursor = None
+
+    @contextmanager
+    def transaction(self):
+        """Groups database changes into single transaction committed when the outermost
+        transaction block ends or rolled back when exception is raised inside it. Nested
+        blocks join transaction of the outer one. Every commit increases write counter,
+        so cached data can be invalidated
+
+        Returns:
+            cursor (sqlite3.Cursor): cursor executing statements of transaction"""
+
+        self.transaction_depth += 1
+        try:
+            yield self.cursor
+        except BaseException:
+            self.transaction_depth -= 1
+            if self.transaction_depth == 0:
+                self.connection.rollback()
+            raise
+        self.transaction_depth -= 1
+        if self.transaction_depth == 0:
+            self.connection.commit()
+            self.write_counter += 1
+
+    @contextmanager
+    def rolled_back(self):
+        """Groups database changes into single transaction what is always rolled back when
+        block ends, so operations can be run without saving their changes. Transaction
+        blocks inside join this one
+
+        Returns:
+            cursor (sqlite3.Cursor): cursor executing statements of transaction"""
+
+        self.transaction_depth += 1
+        try:
+            yield self.cursor
+        finally:
+            self.transaction_depth -= 1
+            self.connection.rollback()
 
     def drop_table_from_database(self):
         """Drops existing table from database"""
 
-        self.cursor.execute("DROP TABLE raw_materials_stock")
+        self.cursor.execute("DROP TABLE IF EXISTS raw_materials_stock")
 
     def create_raw_materials_table(self):
         """Creates initial table of raw materials"""
@@ -60,7 +479,67 @@ class Database():
                             "AUTOINCREMENT, sku_description TEXT, sku_id INTEGER,"
                             " current_stock_kg NUMERIC, price NUMERIC, last_review_date DATE,"
                             " responsible_employee TEXT)")
-        self.connection.commit()
+        self.apply_migrations(from_version=0)
+
+    def get_schema_version(self):
+        """Returns schema version of connected database
+
+        Returns:
+            version (int): number of migrations already applied to database"""
+
+        self.cursor.execute("PRAGMA user_version")
+        return self.cursor.fetchone()[0]
+
+    def apply_migrations(self, from_version):
+        """Applies schema migrations newer than provided version and saves
+        the latest version number in database
+
+        Arguments:
+            from_version (int): schema version the database currently has"""
+
+        if from_version <= UNIQUE_SKU_MIGRATION:
+            duplicated_sku_ids = self.find_duplicated_skus()
+            if duplicated_sku_ids:
+                raise DuplicatedSKUs(
+                    f"Database can not be upgraded, SKUs saved more than once: "
+                    f"{', '.join(map(str, duplicated_sku_ids))}. Remove or change "
+                    f"duplicated rows and start program again")
+        with self.transaction():
+            for migration in SCHEMA_MIGRATIONS[from_version:]:
+                for statement in migration:
+                    self.cursor.execute(statement)
+            self.cursor.execute(f"PRAGMA user_version = {len(SCHEMA_MIGRATIONS)}")
+
+    def find_duplicated_skus(self):
+        """Returns sku codes saved in more than one row of raw materials table
+
+        Returns:
+            duplicated_sku_ids (list): duplicated sku codes in ascending order"""
+
+        self.cursor.execute("SELECT sku_id FROM raw_materials_stock GROUP BY sku_id"
+                            " HAVING COUNT(*) > 1 ORDER BY sku_id")
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def has_raw_materials_table(self):
+        """Checks if raw materials table exists in connected database
+
+        Returns:
+            exists (bool): True when table exists"""
+
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND "
+                            "name='raw_materials_stock'")
+        return self.cursor.fetchone() is not None
+
+    def migrate_database(self):
+        """Upgrades schema of existing database to the current version. Raw materials table
+        is created when database file has none, e.g. when file is empty"""
+
+        if not self.has_raw_materials_table():
+            self.create_raw_materials_table()
+            return
+        schema_version = self.get_schema_version()
+        if schema_version < len(SCHEMA_MIGRATIONS):
+            self.apply_migrations(from_version=schema_version)
 
     def reset_database(self):
         """Deletes table in database if exist and creates empty new one"""
@@ -68,18 +547,24 @@ class Database():
         self.check_database_existence()
         if self.exists:
             self.drop_table_from_database()
+            self.write_counter += 1
         self.create_raw_materials_table()
         print("Database reset")
 
     def start_database(self):
         """Starts database if it exists, not or is restarted"""
 
+        for pragma in self.parsed_arguments.pragma:
+            name, _, value = pragma.partition("=")
+            self.pragmas[name.strip()] = value.strip()
         self.check_database_existence()
         self.connect_database()
         if self.parsed_arguments.reset_db:
             self.reset_database()
         elif not self.exists:
             self.create_raw_materials_table()
+        else:
+            self.migrate_database()
 
     def add_new_material(self):
         """Adds new row to raw material's table"""
@@ -90,21 +575,39 @@ class Database():
         price = float(input("Enter material unit price\n"))
         last_review_date = datetime.date.today()
         responsible_employee = input("Enter person email responsible for material's management\n")
-        self.cursor.execute("INSERT INTO raw_materials_stock"
-                            "(sku_description,"
-                            "sku_id,"
-                            "current_stock_kg,"
-                            "price,"
-                            "last_review_date,"
-                            "responsible_employee)"
-                            "VALUES(?, ?, ?, ?, ?, ?)",
-                            (sku_description, sku_id, current_stock_kg, price,
-                             last_review_date, responsible_employee))
-        self.connection.commit()
+        try:
+            self.add_materials([(sku_description, sku_id, current_stock_kg, price,
+                                 last_review_date, responsible_employee)])
+        except sqlite3.IntegrityError:
+            print("Material with provided SKU already exists. Try again")
+            return
         print("Material added")
 
+    def add_materials(self, materials):
+        """Adds many rows to raw material's table in single transaction
+
+        Arguments:
+            materials (iterable): tuples of material name, sku code, stock [kg], unit price,
+            last review date and email of responsible person
+
+        Returns:
+            added_rows (int): number of added materials"""
+
+        with self.transaction():
+            self.cursor.executemany("INSERT INTO raw_materials_stock"
+                                    "(sku_description,"
+                                    "sku_id,"
+                                    "current_stock_kg,"
+                                    "price,"
+                                    "last_review_date,"
+                                    "responsible_employee)"
+                                    "VALUES(?, ?, ?, ?, ?, ?)",
+                                    materials)
+            return self.cursor.rowcount
+
     def add_sample_raw_materials_stocks(self):
-        """Adds sample rows into raw materials table in database"""
+        """Adds sample rows into raw materials table in database, samples already
+        added are skipped"""
 
         sample_raw_materials_list = [
             ('22REW', 345721, 1000, 7.89, datetime.date(2022, 4, 19), 'autoadmfactor@gmail.com'),
@@ -112,38 +615,146 @@ class Database():
             ('BYSE', 345719, 10000, 3.00, datetime.date(2022, 4, 17), 'autoadmfactor@gmail.com'),
             ('OILB', 345729, 1740, 11.40, datetime.date(2022, 4, 20), 'adampolakfactor@gmail.com')
         ]
-        self.cursor.executemany("INSERT INTO raw_materials_stock"
-                                "(sku_description,"
-                                "sku_id,"
-                                "current_stock_kg,"
-                                "price,"
-                                "last_review_date,"
-                                "responsible_employee)"
-                                "VALUES (?, ?, ?, ?, ?, ?)",
-                                sample_raw_materials_list)
-        self.connection.commit()
-        print("Sample materials added")
+        with self.transaction():
+            self.cursor.executemany("INSERT OR IGNORE INTO raw_materials_stock"
+                                    "(sku_description,"
+                                    "sku_id,"
+                                    "current_stock_kg,"
+                                    "price,"
+                                    "last_review_date,"
+                                    "responsible_employee)"
+                                    "VALUES (?, ?, ?, ?, ?, ?)",
+                                    sample_raw_materials_list)
+            added_rows = self.cursor.rowcount
+        if added_rows:
+            print(f"Sample materials added: {added_rows}")
+        else:
+            print("Sample materials are already added")
+
+    def iter_rows(self, query, parameters=(), batch_size=500, make_row=Material._make):
+        """Streams result of query as Material objects fetching rows in batches, so only
+        one batch is kept in memory at once. Uses separate cursor, so other queries can be
+        executed while rows are consumed
+
+        Arguments:
+            query (str): SELECT statement returning all material columns in table order
+            parameters (tuple): values bound to query placeholders
+            batch_size (int): number of rows fetched from database at once
+            make_row (callable): converts fetched tuple into returned row, plain tuples
+            are returned when None
+
+        Returns:
+            materials (generator): materials returned by query as Material objects"""
+
+        cursor = self.connection.cursor()
+        try:
+            with INSTRUMENTATION.span("database.query"):
+                cursor.execute(query, parameters)
+            with INSTRUMENTATION.span("database.fetch"):
+                rows = cursor.fetchmany(batch_size)
+            while rows:
+                INSTRUMENTATION.count("database.rows", len(rows))
+                if make_row is None:
+                    yield from rows
+                else:
+                    yield from map(make_row, rows)
+                with INSTRUMENTATION.span("database.fetch"):
+                    rows = cursor.fetchmany(batch_size)
+        finally:
+            cursor.close()
+
+    def iter_columns(self, columns=None, limit=None, offset=0, batch_size=500,
+                     sku_ids=None):
+        """Streams chosen columns of page of raw materials table ordered by id
+
+        Arguments:
+            columns (list): names of returned columns, all columns when not provided
+            limit (int): maximal number of returned rows, all rows when not provided
+            offset (int): number of rows skipped from table beginning
+            batch_size (int): number of rows fetched from database at once
+            sku_ids (list): sku codes of returned materials, all materials when
+            not provided
+
+        Returns:
+            rows (generator): tuples with values of chosen columns"""
+
+        columns = columns or MATERIAL_COLUMN_NAMES
+        unknown_columns = set(columns) - set(MATERIAL_COLUMN_NAMES)
+        if unknown_columns:
+            raise ValueError(f"Not existing columns: {', '.join(sorted(unknown_columns))}")
+        if sku_ids is None:
+            return self.iter_rows(f"SELECT {', '.join(columns)} FROM raw_materials_stock"
+                                  " ORDER BY id LIMIT ? OFFSET ?",
+                                  (-1 if limit is None else limit, offset), batch_size,
+                                  make_row=None)
+        # SKUs are passed as one JSON array, so their number is not limited by
+        # maximal number of query parameters
+        return self.iter_rows(f"SELECT {', '.join(columns)} FROM raw_materials_stock"
+                              " WHERE sku_id IN (SELECT value FROM json_each(?))"
+                              " ORDER BY id LIMIT ? OFFSET ?",
+                              (json.dumps(sku_ids), -1 if limit is None else limit, offset),
+                              batch_size, make_row=None)
+
+    def iter_materials(self, batch_size=500):
+        """Streams all rows from database table with raw materials
 
+        Arguments:
+            batch_size (int): number of rows fetched from database at once
+
+        Returns:
+            materials (generator): all raw materials stock as Material objects"""
+
+        return self.iter_rows(f"SELECT {MATERIAL_COLUMNS} FROM raw_materials_stock",
+                              batch_size=batch_size)
+
+    @INSTRUMENTATION.timed("database.get_all_materials")
     def get_all_materials(self):
         """Returns list of all rows from database table with raw materials
 
         Returns:
-            materials (list): list of all raw materials stock as namedtuple objects"""
+            materials (list): list of all raw materials stock as Material objects"""
+
+        return list(self.iter_materials())
+
+    def iter_materials_to_review(self, days_interval=3, batch_size=500):
+        """Streams materials from database what should be reviewed in terms of stock level.
+        They are indicated when days difference between review date and current date is exceeded.
+
+        Arguments:
+            days_interval (int): number of days what added to last review date indicates new date
+            when material should be reviewed
+            batch_size (int): number of rows fetched from database at once
+
+        Returns:
+            materials_to_be_reviewed (generator): materials what should be reviewed"""
 
-        Material = namedtuple("Material", "id, sku_description, sku_id, current_stock_kg, "
-                                          "price, last_review_date, responsible_employee")
-        self.cursor.execute("SELECT id, sku_description, sku_id, current_stock_kg, "
-                            "price, last_review_date, responsible_employee"
-                            " FROM raw_materials_stock")
-        material_list = []
-        for id_row, sku_description, sku_id, current_stock_kg, price, last_review_date, \
-                responsible_employee in self.cursor.fetchall():
-            material = Material(
-                id_row, sku_description, sku_id, current_stock_kg,
-                price, last_review_date, responsible_employee)
-            material_list.append(material)
-        return material_list
+        review_cutoff_date = datetime.date.today() - datetime.timedelta(days=days_interval)
+        return self.iter_rows(f"SELECT {MATERIAL_COLUMNS} FROM raw_materials_stock"
+                              " WHERE last_review_date <= ? ORDER BY id",
+                              (review_cutoff_date,), batch_size)
 
+    def iter_materials_to_review_by_employee(self, days_interval=3, batch_size=500):
+        """Streams materials what should be reviewed grouped by person responsible for them.
+        Rows are ordered by employee in database, so only one group is kept in memory at once
+
+        Arguments:
+            days_interval (int): number of days what added to last review date indicates new date
+            when material should be reviewed
+            batch_size (int): number of rows fetched from database at once
+
+        Returns:
+            groups (generator): pairs of employee email and list of their materials"""
+
+        review_cutoff_date = datetime.date.today() - datetime.timedelta(days=days_interval)
+        materials = self.iter_rows(f"SELECT {MATERIAL_COLUMNS} FROM raw_materials_stock"
+                                   " WHERE last_review_date <= ?"
+                                   " ORDER BY responsible_employee, id",
+                                   (review_cutoff_date,), batch_size)
+        for employee_email, employee_materials in groupby(
+                materials, key=attrgetter("responsible_employee")):
+            yield employee_email, list(employee_materials)
+
+    @INSTRUMENTATION.timed("database.get_materials_to_review")
     def get_materials_to_review(self, days_interval=3):
         """Returns list of materials from database what should be reviewed in terms of stock level.
         They are indicated when days difference between review date and current date is exceeded.
@@ -155,38 +766,173 @@ class Database():
             materials_to_be_reviewed (list): part of database table with materials what should
             be reviewed"""
 
-        materials = self.get_all_materials()
-        materials_to_review = []
-        for material in materials:
-            date = material.last_review_date
-            date_list = date.split("-")
-            year = int(date_list[0])
-            month = int(date_list[1])
-            day = int(date_list[2])
-            date = datetime.date(year, month, day)
-            review_interval = datetime.timedelta(days=days_interval)
-            date_to_be_reviewed = date + review_interval
-            if date_to_be_reviewed <= datetime.date.today():
-                materials_to_review.append(material)
-        return materials_to_review
+        return list(self.iter_materials_to_review(days_interval))
 
     @staticmethod
-    def show_data(materials_list):
-        """Prints chosen part of database table content
+    def show_data(materials_list, headers_list=None, output_format="table"):
+        """Prints chosen part of database table content. Rows are formatted and written
+        to standard output in chunks
+
+        Arguments:
+            materials_list (iterable): raw materials to be shown
+            headers_list (list): names of shown columns, all columns when not provided
+            output_format (str): "table", "csv" or "jsonl" format of printed rows"""
+
+        TableRenderer(headers_list or MATERIAL_COLUMN_NAMES).write(materials_list,
+                                                                  output_format)
+
+    def export_data(self, output_format="table", columns=None, limit=None, offset=0,
+                    output_path=None, sku_ids=None):
+        """Writes page of raw materials table streamed directly from database
+
+        Arguments:
+            output_format (str): one of "table", "csv" or "jsonl"
+            columns (list): names of written columns, all columns when not provided
+            limit (int): maximal number of written rows, all rows when not provided
+            offset (int): number of rows skipped from table beginning
+            output_path (str): path of created file, standard output when not provided
+            sku_ids (list): sku codes of written materials, all materials when
+            not provided"""
+
+        columns = columns or MATERIAL_COLUMN_NAMES
+        rows = self.iter_columns(columns, limit, offset, sku_ids=sku_ids)
+        if output_path is None:
+            TableRenderer(columns).write(rows, output_format)
+            return
+        with open(output_path, "w", encoding="utf-8", newline="") as file:
+            TableRenderer(columns, stream=file).write(rows, output_format)
+
+    def iter_materials_to_notify(self, review_cutoff_date, batch_size=500):
+        """Streams materials due for review what were not notified yet for their current
+        review date, including ones added with old review date after previous runs
+
+        Arguments:
+            review_cutoff_date (datetime.date): materials reviewed on this date or earlier
+            should be reviewed again
+            batch_size (int): number of rows fetched from database at once
+
+        Returns:
+            materials (generator): due and not notified materials as Material objects"""
+
+        return self.iter_rows(f"SELECT {MATERIAL_COLUMNS} FROM raw_materials_stock AS material"
+                              " WHERE last_review_date <= ?"
+                              " AND NOT EXISTS (SELECT 1 FROM notification_ledger AS ledger"
+                              " WHERE ledger.sku_id = material.sku_id"
+                              " AND ledger.last_review_date = material.last_review_date)"
+                              " ORDER BY id",
+                              (review_cutoff_date,), batch_size)
+
+    def record_notifications(self, materials):
+        """Saves in ledger that reminders about provided materials were sent
+
+        Arguments:
+            materials (iterable): materials what reminders were sent about"""
+
+        notified_at = datetime.datetime.now()
+        with self.transaction():
+            self.cursor.executemany("INSERT OR IGNORE INTO notification_ledger"
+                                    "(sku_id, last_review_date, notified_at) VALUES (?, ?, ?)",
+                                    ((material.sku_id, material.last_review_date, notified_at)
+                                     for material in materials))
+
+    def get_reminder_state(self, name):
+        """Returns value saved by reminder runs under provided name
 
         Arguments:
-            materials_list (list): list of raw materials to be shown"""
+            name (str): name of saved value
 
-        headers_list = ["id", "sku_description", "sku_id", "current_stock_kg",
-                        "price", "last_review_date", "responsible_employee"]
+        Returns:
+            value (str): saved value or None if it was not saved yet"""
+
+        self.cursor.execute("SELECT value FROM reminder_state WHERE name=?", (name,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def set_reminder_state(self, name, value):
+        """Saves value of reminder runs under provided name
+
+        Arguments:
+            name (str): name of saved value
+            value (str): value to be saved"""
+
+        with self.transaction():
+            self.cursor.execute("INSERT INTO reminder_state(name, value) VALUES (?, ?) "
+                                "ON CONFLICT(name) DO UPDATE SET value=excluded.value",
+                                (name, value))
+
+    def get_daily_sent_messages(self, day=None):
+        """Returns number of reminders sent on provided day by all runs
+
+        Arguments:
+            day (datetime.date): day of sending, today when not provided
+
+        Returns:
+            sent_messages (int): number of sent messages"""
+
+        saved_count = self.get_reminder_state(f"sent_messages:{day or datetime.date.today()}")
+        return int(saved_count) if saved_count else 0
+
+    def add_daily_sent_messages(self, count, day=None):
+        """Adds sent reminders to count of provided day. Counts of other days are deleted
+
+        Arguments:
+            count (int): number of sent messages
+            day (datetime.date): day of sending, today when not provided"""
+
+        if not count:
+            return
+        name = f"sent_messages:{day or datetime.date.today()}"
+        with self.transaction():
+            self.cursor.execute("DELETE FROM reminder_state WHERE name LIKE 'sent_messages:%'"
+                                " AND name != ?", (name,))
+            self.cursor.execute("INSERT INTO reminder_state(name, value) VALUES (?, ?) "
+                                "ON CONFLICT(name) DO UPDATE SET "
+                                "value=CAST(value AS INTEGER) + excluded.value",
+                                (name, count))
+
+    def material_exists(self, sku_id):
+        """Checks if material with provided SKU is saved in database
+
+        Arguments:
+            sku_id (int): material sku code
+
+        Returns:
+            exists (bool): True if material was found"""
+
+        self.cursor.execute("SELECT 1 FROM raw_materials_stock WHERE sku_id=? LIMIT 1",
+                            (sku_id,))
+        return self.cursor.fetchone() is not None
+
+    def find_missing_skus(self, sku_ids):
+        """Returns provided sku codes what are not saved in database
+
+        Arguments:
+            sku_ids (list): checked material sku codes
+
+        Returns:
+            missing_sku_ids (list): sku codes of not existing materials"""
+
+        self.cursor.execute("SELECT value FROM json_each(?) WHERE value NOT IN "
+                            "(SELECT sku_id FROM raw_materials_stock)", (json.dumps(sku_ids),))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def update_stocks(self, stock_levels):
+        """Changes stock quantities of many materials in single transaction. Review date
+        of every changed material is set on current date
+
+        Arguments:
+            stock_levels (iterable): pairs of material sku code and new quantity [kg]
+
+        Returns:
+            updated_rows (int): number of changed materials"""
 
-        for header in headers_list:
-            print(f"{header:<20}", end=" ")
-        print()
-        for row in materials_list:
-            for data in row:
-                print(f"{data:<20}", end=" ")
-            print()
+        review_date = datetime.date.today()
+        with self.transaction():
+            self.cursor.executemany("UPDATE raw_materials_stock SET last_review_date=?,"
+                                    "current_stock_kg=? WHERE sku_id =?",
+                                    ((review_date, quantity, sku_id)
+                                     for sku_id, quantity in stock_levels))
+            return self.cursor.rowcount
 
     def change_current_stock(self):
         """Gives possibility for user to change stock quantity for given material. Then
@@ -194,15 +940,10 @@ class Database():
 
         try:
             sku_id = int(input("Provide SKU ID\n"))
-            self.cursor.execute("SELECT sku_id FROM raw_materials_stock")
-            existing_skus = [sku[0] for sku in self.cursor.fetchall()]
-            if sku_id not in existing_skus:
+            if not self.material_exists(sku_id):
                 raise NotExistingSKU()
             new_quantity = float(input("Enter new quantity [kg]\n"))
-            self.cursor.execute("UPDATE raw_materials_stock SET last_review_date=?,"
-                                "current_stock_kg=? WHERE sku_id =?",
-                                (datetime.date.today(), new_quantity, sku_id))
-            self.connection.commit()
+            self.update_stocks([(sku_id, new_quantity)])
         except ValueError:
             print("Entered wrong value. Try again!")
         except NotExistingSKU:
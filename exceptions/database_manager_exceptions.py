@@ -4,3 +4,8 @@
 class NotExistingSKU(Exception):
     """Kind of exception what is raised when user input SKU what does not
     exist in database"""
+
+
+class DuplicatedSKUs(Exception):
+    """Kind of exception what is raised when database can not be upgraded, because the same
+    SKU is saved in more than one row"""
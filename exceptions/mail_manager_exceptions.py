@@ -0,0 +1,6 @@
+"""Exceptions for mail_manager class"""
+
+
+class MissingCredentials(Exception):
+    """Exception to be raised when email password is neither provided in file nor
+    in environment variable"""
@@ -0,0 +1,9 @@
+"""Exceptions for material_importer class"""
+
+
+class InvalidMaterialRow(Exception):
+    """Exception to be raised when row of imported file can not be saved as raw material"""
+
+
+class UnsupportedImportFormat(Exception):
+    """Exception to be raised when imported file is neither CSV nor JSON Lines"""
@@ -0,0 +1,187 @@
+"""Contains timing spans, counters and profiling hooks of program hot paths. When disabled,
+instrumented code only checks one flag"""
+from contextlib import contextmanager
+import datetime
+import functools
+import json
+import threading
+import time
+
+
+class Instrumentation():
+    """Collects number of calls, total and maximal time of named spans together with named
+    counters and writes them as JSON Lines log or Prometheus text file"""
+
+    def __init__(self):
+        """Initiates disabled instrumentation with no collected data"""
+
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+
+    def enable(self):
+        """Starts collecting timings and counters"""
+
+        self.enabled = True
+
+    def disable(self):
+        """Stops collecting timings and counters"""
+
+        self.enabled = False
+
+    def reset(self):
+        """Removes collected data"""
+
+        with self.lock:
+            self.spans = {}
+            self.counters = {}
+
+    def record(self, name, elapsed_time):
+        """Adds single measurement to named span
+
+        Arguments:
+            name (str): name of span
+            elapsed_time (float): measured time [s]"""
+
+        with self.lock:
+            span = self.spans.setdefault(name, [0, 0.0, 0.0])
+            span[0] += 1
+            span[1] += elapsed_time
+            span[2] = max(span[2], elapsed_time)
+
+    def count(self, name, value=1):
+        """Increases named counter when instrumentation is enabled
+
+        Arguments:
+            name (str): name of counter
+            value (int): added value"""
+
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def span(self, name):
+        """Measures time of code executed inside block
+
+        Arguments:
+            name (str): name of span"""
+
+        if not self.enabled:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def timed(self, name):
+        """Creates decorator measuring every call of decorated function
+
+        Arguments:
+            name (str): name of span
+
+        Returns:
+            decorator (callable): decorator of measured function"""
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start_time = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start_time)
+            return wrapper
+        return decorator
+
+    def get_snapshot(self):
+        """Returns copy of collected data
+
+        Returns:
+            snapshot (dict): spans with calls, total and maximal time and counters values"""
+
+        with self.lock:
+            spans = {name: {"calls": calls, "seconds_total": total, "seconds_max": maximum}
+                     for name, (calls, total, maximum) in self.spans.items()}
+            return {"spans": spans, "counters": dict(self.counters)}
+
+    def format_prometheus(self):
+        """Formats collected data in Prometheus text exposition format
+
+        Returns:
+            text (str): metrics text"""
+
+        snapshot = self.get_snapshot()
+        lines = ["# TYPE goods_reminder_span_calls_total counter",
+                 "# TYPE goods_reminder_span_seconds_total counter",
+                 "# TYPE goods_reminder_span_seconds_max gauge"]
+        for name, span in sorted(snapshot["spans"].items()):
+            lines.append(f'goods_reminder_span_calls_total{{span="{name}"}} {span["calls"]}')
+            lines.append(f'goods_reminder_span_seconds_total{{span="{name}"}} '
+                         f'{span["seconds_total"]:.6f}')
+            lines.append(f'goods_reminder_span_seconds_max{{span="{name}"}} '
+                         f'{span["seconds_max"]:.6f}')
+        lines.append("# TYPE goods_reminder_events_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'goods_reminder_events_total{{counter="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def format_json_lines(self):
+        """Formats collected data as structured log with one JSON object per span
+        and counter
+
+        Returns:
+            text (str): log lines"""
+
+        snapshot = self.get_snapshot()
+        timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+        records = [{"timestamp": timestamp, "type": "span", "name": name, **span}
+                   for name, span in sorted(snapshot["spans"].items())]
+        records.extend({"timestamp": timestamp, "type": "counter", "name": name, "value": value}
+                       for name, value in sorted(snapshot["counters"].items()))
+        return "".join(json.dumps(record) + "\n" for record in records)
+
+    def write(self, path, output_format="json"):
+        """Saves collected data in file. JSON log is appended, Prometheus file is replaced
+
+        Arguments:
+            path (str): path of metrics file
+            output_format (str): json or prometheus"""
+
+        if output_format == "prometheus":
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.format_prometheus())
+        else:
+            with open(path, "a", encoding="utf-8") as file:
+                file.write(self.format_json_lines())
+
+    @staticmethod
+    @contextmanager
+    def profile(path):
+        """Profiles code executed inside block with cProfile and saves statistics in file,
+        when path is provided
+
+        Arguments:
+            path (str): path of statistics file readable by pstats, no profiling when None"""
+
+        if path is None:
+            yield
+            return
+        # pylint: disable=import-outside-toplevel
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+
+
+INSTRUMENTATION = Instrumentation()
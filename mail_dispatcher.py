@@ -0,0 +1,239 @@
+"""Contains functionalities to send many emails concurrently through pool of logged in
+SMTP connections"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import smtplib
+import threading
+import time
+from instrumentation import INSTRUMENTATION
+from rate_limiter import THROTTLING_SMTP_CODES
+
+DispatchResult = namedtuple("DispatchResult", "mail_to, success, attempts, error")
+
+
+class SmtpConnectionPool():
+    """Represents limited pool of logged in SMTP connections shared between sending threads.
+    Connections are opened lazily, when no idle one is available"""
+
+    def __init__(self, connection_factory, size=4):
+        """Initiates connection pool
+
+        Arguments:
+            connection_factory (callable): returns new, logged in SMTP connection
+            size (int): maximal number of connections opened at once"""
+
+        self.connection_factory = connection_factory
+        self.size = size
+        self.idle_connections = queue.LifoQueue()
+        self.opened_connections = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Takes idle connection from pool or opens new one if limit is not reached yet.
+        Otherwise waits until other thread releases its connection
+
+        Returns:
+            connection (smtplib.SMTP): logged in SMTP connection"""
+
+        try:
+            return self.idle_connections.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            can_open = self.opened_connections < self.size
+            if can_open:
+                self.opened_connections += 1
+        if not can_open:
+            return self.idle_connections.get()
+        try:
+            return self.connection_factory()
+        except Exception:
+            with self.lock:
+                self.opened_connections -= 1
+            raise
+
+    def release(self, connection):
+        """Gives back working connection to pool
+
+        Arguments:
+            connection (smtplib.SMTP): connection taken earlier by acquire"""
+
+        self.idle_connections.put(connection)
+
+    def discard(self, connection):
+        """Closes broken connection and frees its place in pool
+
+        Arguments:
+            connection (smtplib.SMTP): connection taken earlier by acquire"""
+
+        try:
+            connection.close()
+        except OSError:
+            pass
+        with self.lock:
+            self.opened_connections -= 1
+
+    def close(self):
+        """Ends all idle connections with email server"""
+
+        while True:
+            try:
+                connection = self.idle_connections.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.quit()
+            except smtplib.SMTPException:
+                connection.close()
+            with self.lock:
+                self.opened_connections -= 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MailDispatcher():
+    """Sends messages concurrently from thread pool using connections from SMTP connection
+    pool. Transient failures are retried and dropped sessions are reconnected"""
+
+    def __init__(self, pool, sender, max_attempts=3, retry_delay=1.0, rate_limiter=None):
+        """Initiates dispatcher
+
+        Arguments:
+            pool (SmtpConnectionPool): pool of logged in connections used for sending
+            sender (str): email address messages are sent from
+            max_attempts (int): number of tries for every message
+            retry_delay (float): seconds of waiting before next try, multiplied by
+            number of tries already done
+            rate_limiter (RateLimiter): limiter every sending attempt waits for, sending
+            is not limited when None"""
+
+        self.pool = pool
+        self.sender = sender
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.rate_limiter = rate_limiter
+
+    @staticmethod
+    def is_transient(error):
+        """Decides if sending failure is temporary and could succeed when retried
+
+        Arguments:
+            error (Exception): exception raised while sending message
+
+        Returns:
+            transient (bool): True if message should be sent once again"""
+
+        codes = MailDispatcher.get_smtp_codes(error)
+        if codes:
+            return all(400 <= code < 500 for code in codes)
+        return isinstance(error, OSError)
+
+    @staticmethod
+    def get_smtp_codes(error):
+        """Returns SMTP response codes carried by sending failure
+
+        Arguments:
+            error (Exception): exception raised while sending message
+
+        Returns:
+            codes (list): response codes, empty when failure was not server response"""
+
+        if isinstance(error, smtplib.SMTPResponseException):
+            return [error.smtp_code]
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return [code for code, _ in error.recipients.values()]
+        return []
+
+    def send_one(self, mail_to, msg_content):
+        """Sends single message keeping rate limiter informed about its outcome
+
+        Arguments:
+            mail_to (str): email address what will be receiver of message
+            msg_content (str, bytes or EmailMessage): message content or complete
+            MIME message
+
+        Returns:
+            result (DispatchResult): outcome of sending given message"""
+
+        if self.rate_limiter is None:
+            return self.send_with_retries(mail_to, msg_content)
+        try:
+            return self.send_with_retries(mail_to, msg_content)
+        finally:
+            self.rate_limiter.change_backlog(-1)
+
+    def send_with_retries(self, mail_to, msg_content):
+        """Sends single message, retrying it when failure is transient
+
+        Arguments:
+            mail_to (str): email address what will be receiver of message
+            msg_content (str, bytes or EmailMessage): message content or complete
+            MIME message
+
+        Returns:
+            result (DispatchResult): outcome of sending given message"""
+
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                time.sleep(self.retry_delay * (attempt - 1))
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                connection = self.pool.acquire()
+            except smtplib.SMTPAuthenticationError:
+                raise
+            except OSError as connection_error:
+                error = connection_error
+                continue
+            try:
+                with INSTRUMENTATION.span("smtp.send"):
+                    if isinstance(msg_content, (str, bytes)):
+                        connection.sendmail(from_addr=self.sender, to_addrs=mail_to,
+                                            msg=msg_content)
+                    else:
+                        connection.send_message(msg_content, from_addr=self.sender,
+                                                to_addrs=mail_to)
+            except OSError as send_error:
+                error = send_error
+                INSTRUMENTATION.count("smtp.failed_attempts")
+                if self.rate_limiter is not None and any(
+                        code in THROTTLING_SMTP_CODES for code in self.get_smtp_codes(error)):
+                    self.rate_limiter.on_throttled()
+                # smtplib closes the session by itself e.g. after 421 response
+                if connection.sock is None or isinstance(
+                        send_error, (smtplib.SMTPServerDisconnected, ConnectionError)):
+                    self.pool.discard(connection)
+                else:
+                    self.pool.release(connection)
+                if not self.is_transient(send_error):
+                    return DispatchResult(mail_to, False, attempt, send_error)
+            else:
+                self.pool.release(connection)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.on_success()
+                INSTRUMENTATION.count("smtp.sent_messages")
+                return DispatchResult(mail_to, True, attempt, None)
+        return DispatchResult(mail_to, False, self.max_attempts, error)
+
+    def dispatch(self, messages):
+        """Sends all messages concurrently with as many threads as connections in pool
+
+        Arguments:
+            messages (iterable): pairs of receiver address and message content
+
+        Returns:
+            results (list): DispatchResult of every message in order of sending"""
+
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            futures = []
+            for mail_to, msg_content in messages:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.change_backlog(1)
+                futures.append(executor.submit(self.send_one, mail_to, msg_content))
+            return [future.result() for future in futures]
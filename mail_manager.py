@@ -1,5 +1,123 @@
 """Contains functionalities to manage and works with administrator email account"""
-from string import Template
+import base64
+from email.headerregistry import HeaderRegistry
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formataddr, formatdate, make_msgid
+import os
+from exceptions.mail_manager_exceptions import MissingCredentials
+from instrumentation import INSTRUMENTATION
+from mail_transports import LocalSmtpTransport, MailboxTransport, MemoryTransport, \
+    SmtpTransport
+
+
+class CachedHeaderRegistry(HeaderRegistry):
+    """Header registry creating header class for every header name only once. Default
+    registry creates new class whenever header is set or its max count is checked"""
+
+    def __init__(self):
+        """Initiates registry with empty cache of header classes"""
+
+        super().__init__()
+        self.header_classes = {}
+
+    def __getitem__(self, name):
+        """Returns header class of provided header name
+
+        Arguments:
+            name (str): header name
+
+        Returns:
+            header_class (type): class of header objects"""
+
+        key = name.lower()
+        header_class = self.header_classes.get(key)
+        if header_class is None:
+            header_class = self.header_classes[key] = super().__getitem__(name)
+        return header_class
+
+
+BATCH_POLICY = SMTP.clone(header_factory=CachedHeaderRegistry())
+
+
+class MessageBuilder():
+    """Builds MIME messages of one sending batch. Headers being the same for every message
+    of batch and receivers addresses are parsed once and the parsed header objects are reused
+    by all messages"""
+
+    def __init__(self, sender_address, sender_name, policy=BATCH_POLICY):
+        """Initiates builder
+
+        Arguments:
+            sender_address (str): email address messages are sent from
+            sender_name (str): name of sender shown to receivers
+            policy (email.policy.Policy): policy shared by all built messages"""
+
+        self.policy = policy
+        create_header = policy.header_factory
+        self.from_header = create_header("From", formataddr((sender_name, sender_address)))
+        self.date_header = create_header("Date", formatdate(localtime=True))
+        self.mime_version_header = create_header("MIME-Version", "1.0")
+        self.alternative_header = create_header("Content-Type", "multipart/alternative")
+        self.content_type_headers = {
+            subtype: create_header("Content-Type", f'text/{subtype}; charset="utf-8"')
+            for subtype in ("plain", "html")}
+        self.encoding_headers = {
+            encoding: create_header("Content-Transfer-Encoding", encoding)
+            for encoding in ("7bit", "base64")}
+        self.message_id_domain = sender_address.rpartition("@")[2] or "localhost"
+        self.to_headers = {}
+
+    def set_text_content(self, part, subtype, text):
+        """Sets text as payload of message part, encoded with base64 when it is not ASCII
+
+        Arguments:
+            part (EmailMessage): message or its part
+            subtype (str): plain or html
+            text (str): content of part"""
+
+        part["Content-Type"] = self.content_type_headers[subtype]
+        if text.isascii():
+            part["Content-Transfer-Encoding"] = self.encoding_headers["7bit"]
+            part.set_payload(text)
+        else:
+            part["Content-Transfer-Encoding"] = self.encoding_headers["base64"]
+            part.set_payload(base64.encodebytes(text.encode("utf-8")).decode("ascii"))
+
+    @INSTRUMENTATION.timed("email.build_message")
+    def build(self, mail_to, subject, text, html=None):
+        """Creates MIME message with plain text body and optional html alternative
+
+        Arguments:
+            mail_to (str): email address what will be receiver of message
+            subject (str): message subject
+            text (str): plain text body
+            html (str): html body
+
+        Returns:
+            message (EmailMessage): complete message ready to be sent"""
+
+        message = EmailMessage(policy=self.policy)
+        message["From"] = self.from_header
+        to_header = self.to_headers.get(mail_to)
+        if to_header is None:
+            to_header = self.to_headers[mail_to] = self.policy.header_factory("To", mail_to)
+        message["To"] = to_header
+        message["Subject"] = subject
+        message["Date"] = self.date_header
+        message["Message-ID"] = make_msgid(domain=self.message_id_domain)
+        message["MIME-Version"] = self.mime_version_header
+        if html is None:
+            self.set_text_content(message, "plain", text)
+            return message
+        message["Content-Type"] = self.alternative_header
+        parts = []
+        for subtype, content in (("plain", text), ("html", html)):
+            part = EmailMessage(policy=self.policy)
+            self.set_text_content(part, subtype, content)
+            parts.append(part)
+        message.set_payload(parts)
+        return message
 
 
 class Email():
@@ -11,13 +129,100 @@ class Email():
         self.smtp_server = "smtp.gmail.com"
         self.smtp_port = 465
         self.server = None
+        self.transport = None
+
+    @staticmethod
+    def ask_admin_password():
+        """Asks administrator for email account password
+
+        Returns:
+            admin_password (str): entered password"""
+
+        return input("Enter your email password\n")
+
+    @staticmethod
+    def load_admin_password(password_file=None):
+        """Reads administrator's email password without interaction, from provided file or
+        from ADMIN_EMAIL_PASSWORD environment variable
+
+        Arguments:
+            password_file (str): path to file containing only password
+
+        Returns:
+            admin_password (str): read password"""
+
+        if password_file:
+            with open(password_file, encoding="utf-8") as file:
+                admin_password = file.read().strip()
+        else:
+            admin_password = os.environ.get("ADMIN_EMAIL_PASSWORD", "")
+        if not admin_password:
+            raise MissingCredentials("Email password not provided in file "
+                                     "nor in ADMIN_EMAIL_PASSWORD variable")
+        return admin_password
 
     def log_to_admin_email(self):
         """Allows administrator to login into his account."""
 
-        admin_password = input("Enter your email password\n")
+        admin_password = self.ask_admin_password()
         self.server.login(user=self.admin_email, password=admin_password)
 
+    def create_transport(self, name="smtp", target=None):
+        """Creates transport what messages are sent through
+
+        Arguments:
+            name (str): "smtp" for administrator's email server, "local_smtp" for plain SMTP
+            server, "mbox" or "maildir" for mailbox files and "memory" for messages kept
+            in memory
+            target (str): HOST:PORT of local SMTP server or path of mailbox, default
+            one when not provided
+
+        Returns:
+            transport (object): transport with open_connection method"""
+
+        if name == "local_smtp":
+            host, _, port = (target or "localhost:25").partition(":")
+            return LocalSmtpTransport(host or "localhost", int(port or 25))
+        if name == "mbox":
+            return MailboxTransport(target or "data/reminders.mbox", "mbox")
+        if name == "maildir":
+            return MailboxTransport(target or "data/maildir", "maildir")
+        if name == "memory":
+            return MemoryTransport()
+        return SmtpTransport(self.smtp_server, self.smtp_port, self.admin_email)
+
+    def get_transport(self):
+        """Returns chosen transport, administrator's email server when none was chosen
+
+        Returns:
+            transport (object): transport with open_connection method"""
+
+        if self.transport is None:
+            return self.create_transport()
+        return self.transport
+
+    def requires_password(self):
+        """Checks if chosen transport needs administrator's email password
+
+        Returns:
+            requires_password (bool): True when password is needed to open connection"""
+
+        return self.get_transport().requires_password
+
+    def open_connection(self, admin_password):
+        """Opens new connection through chosen transport, with administrator's email server
+        and logged into account by default
+
+        Arguments:
+            admin_password (str): administrator's email account password
+
+        Returns:
+            server (smtplib.SMTP_SSL): logged in connection or connection of other transport
+            with the same sending methods"""
+
+        return self.get_transport().open_connection(admin_password)
+
+    @INSTRUMENTATION.timed("email.send_email")
     def send_email(self, mail_to, msg_content):
         """Sends mail from admin email account to chosen address with parametrized content
 
@@ -27,33 +232,27 @@ class Email():
 
         self.server.sendmail(from_addr=self.admin_email, to_addrs=mail_to, msg=msg_content)
 
-    def logout(self):
-        """Ends connection with administrator's email server"""
+    def create_message_builder(self, sender_name):
+        """Returns builder of MIME messages sent from administrator's account
 
-        self.server.close()
+        Arguments:
+            sender_name (str): name of sender shown to receivers
 
-    @staticmethod
-    def create_email_template(material_name, stock, last_review_date):
-        """Creates custom email content to be sent as reminder by using Template class object
+        Returns:
+            builder (MessageBuilder): builder of one sending batch"""
+
+        return MessageBuilder(self.admin_email, sender_name)
+
+    @INSTRUMENTATION.timed("email.send_message")
+    def send_message(self, message):
+        """Sends MIME message from admin email account to its receiver
 
         Arguments:
-            material_name (str): name of material
-            stock (str): stock level [kg]
-            last_review_date (str): date of last stock review
+            message (EmailMessage): complete message with To header"""
 
-        Returns:
-            message (str): complete email message content to be sent"""
+        self.server.send_message(message, from_addr=self.admin_email)
 
-        message_template = Template("From: $sender\n"
-                                    "Subject: $subject\n"
-                                    "$body")
-        subject_template = Template("Raw material $material_name needs review")
-        body_template = Template("Reminder!\nRaw material $material_name has $stock kg " \
-                                 "stock and was reviewed last time on $last_review_date")
-        sender = "Alert from system"
-        subject = subject_template.substitute(material_name=material_name)
-        body = body_template.substitute(material_name=material_name, stock=stock,
-                                        last_review_date=last_review_date)
-        message = message_template.substitute(sender=sender, subject=subject, body=body)
+    def logout(self):
+        """Ends connection with administrator's email server"""
 
-        return message
+        self.server.close()
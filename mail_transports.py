@@ -0,0 +1,206 @@
+"""Contains transports opening connections what reminders are sent through. Besides email
+servers, messages can be written into mailbox files or kept in memory, so the whole
+sending pipeline can be run and measured without network access"""
+import mailbox
+import smtplib
+import threading
+
+
+class SmtpTransport():
+    """Sends messages through email server over SSL after logging into account"""
+
+    requires_password = True
+
+    def __init__(self, host, port, user):
+        """Initiates transport
+
+        Arguments:
+            host (str): address of email server
+            port (int): SSL port of email server
+            user (str): login of email account"""
+
+        self.host = host
+        self.port = port
+        self.user = user
+
+    def open_connection(self, password):
+        """Opens new connection with email server and logs into account
+
+        Arguments:
+            password (str): email account password
+
+        Returns:
+            connection (smtplib.SMTP_SSL): logged in connection"""
+
+        connection = smtplib.SMTP_SSL(host=self.host, port=self.port)
+        try:
+            connection.login(user=self.user, password=password)
+        except smtplib.SMTPException:
+            connection.close()
+            raise
+        return connection
+
+
+class LocalSmtpTransport():
+    """Sends messages through plain SMTP server without logging in, e.g. local mail
+    relay or debugging server"""
+
+    requires_password = False
+
+    def __init__(self, host="localhost", port=25):
+        """Initiates transport
+
+        Arguments:
+            host (str): address of email server
+            port (int): port of email server"""
+
+        self.host = host
+        self.port = port
+
+    def open_connection(self, password=None):
+        """Opens new connection with email server
+
+        Arguments:
+            password (str): not used
+
+        Returns:
+            connection (smtplib.SMTP): opened connection"""
+
+        return smtplib.SMTP(host=self.host, port=self.port)
+
+
+class TransportConnection():
+    """Stands in for SMTP connection of transports what do not use network. Messages are
+    passed to transport, which stores them"""
+
+    def __init__(self, transport):
+        """Initiates connection
+
+        Arguments:
+            transport (MemoryTransport or MailboxTransport): transport storing messages"""
+
+        self.transport = transport
+        self.sock = True
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        """Stores message content
+
+        Arguments:
+            from_addr (str): sender address
+            to_addrs (str or list): receivers addresses
+            msg (str or bytes): message content
+
+        Returns:
+            refused_recipients (dict): always empty"""
+
+        if isinstance(msg, str):
+            msg = msg.encode("utf-8")
+        self.transport.store(to_addrs, msg)
+        return {}
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        """Stores MIME message
+
+        Arguments:
+            msg (EmailMessage): complete message
+            from_addr (str): sender address
+            to_addrs (str or list): receivers addresses, To header when not provided
+
+        Returns:
+            refused_recipients (dict): always empty"""
+
+        self.transport.store(to_addrs or msg["To"], msg.as_bytes())
+        return {}
+
+    def quit(self):
+        """Ends connection saving stored messages"""
+
+        self.close()
+
+    def close(self):
+        """Ends connection saving stored messages"""
+
+        self.sock = None
+        self.transport.flush()
+
+
+class MemoryTransport():
+    """Keeps sent messages in memory"""
+
+    requires_password = False
+
+    def __init__(self):
+        """Initiates transport with empty list of messages"""
+
+        self.lock = threading.Lock()
+        self.messages = []
+
+    def open_connection(self, password=None):
+        """Opens connection storing messages in this transport
+
+        Arguments:
+            password (str): not used
+
+        Returns:
+            connection (TransportConnection): opened connection"""
+
+        return TransportConnection(self)
+
+    def store(self, to_addrs, content):
+        """Saves message
+
+        Arguments:
+            to_addrs (str or list): receivers addresses
+            content (bytes): complete message content"""
+
+        with self.lock:
+            self.messages.append((to_addrs, content))
+
+    def flush(self):
+        """Does nothing, messages are already kept"""
+
+
+class MailboxTransport():
+    """Writes sent messages into mbox file or Maildir directory"""
+
+    requires_password = False
+
+    def __init__(self, path, mailbox_format="mbox"):
+        """Initiates transport, mailbox is created when it does not exist
+
+        Arguments:
+            path (str): path of mbox file or Maildir directory
+            mailbox_format (str): "mbox" or "maildir" type of mailbox"""
+
+        self.lock = threading.Lock()
+        if mailbox_format == "maildir":
+            self.mailbox = mailbox.Maildir(path, create=True)
+        else:
+            self.mailbox = mailbox.mbox(path, create=True)
+
+    def open_connection(self, password=None):
+        """Opens connection storing messages in this transport
+
+        Arguments:
+            password (str): not used
+
+        Returns:
+            connection (TransportConnection): opened connection"""
+
+        return TransportConnection(self)
+
+    def store(self, to_addrs, content):
+        """Adds message to mailbox
+
+        Arguments:
+            to_addrs (str or list): receivers addresses
+            content (bytes): complete message content"""
+
+        with self.lock:
+            self.mailbox.add(content)
+
+    def flush(self):
+        """Writes messages added to mailbox file"""
+
+        with self.lock:
+            self.mailbox.flush()
@@ -0,0 +1,207 @@
+"""Contains functionalities to load many raw materials into database from CSV or JSON Lines
+files in single transaction"""
+import csv
+import datetime
+from itertools import islice
+import json
+import os
+import time
+from exceptions.material_importer_exceptions import InvalidMaterialRow, UnsupportedImportFormat
+
+IMPORT_FIELDS = ("sku_description", "sku_id", "current_stock_kg", "price",
+                 "last_review_date", "responsible_employee")
+
+
+class MaterialImporter():
+    """Imports raw materials from file into database. Rows are validated, inserted in chunks
+    and existing materials with the same SKU are updated"""
+
+    def __init__(self, database, chunk_size=10000):
+        """Initiates importer
+
+        Arguments:
+            database (Database): connected database rows are imported into
+            chunk_size (int): number of rows inserted by single executemany call"""
+
+        self.database = database
+        self.chunk_size = chunk_size
+        self.rejected_rows = []
+
+    @staticmethod
+    def read_records(file_path):
+        """Streams records from CSV file with header or from JSON Lines file
+
+        Arguments:
+            file_path (str): path to imported file
+
+        Returns:
+            records (generator): pairs of line number and record as dict"""
+
+        extension = os.path.splitext(file_path)[1].lower()
+        with open(file_path, encoding="utf-8", newline="") as file:
+            if extension == ".csv":
+                reader = csv.DictReader(file)
+                for record in reader:
+                    yield reader.line_num, record
+            elif extension in (".jsonl", ".json", ".ndjson"):
+                for line_number, line in enumerate(file, start=1):
+                    if line.strip():
+                        try:
+                            yield line_number, json.loads(line)
+                        except json.JSONDecodeError:
+                            yield line_number, None
+            else:
+                raise UnsupportedImportFormat(f"Not supported file type: {extension}")
+
+    @staticmethod
+    def validate_record(record):
+        """Converts record read from file into values saved in database
+
+        Arguments:
+            record (dict): raw material fields read from file
+
+        Returns:
+            row (tuple): values of IMPORT_FIELDS in their order"""
+
+        if not isinstance(record, dict):
+            raise InvalidMaterialRow("Row is not a valid object")
+        try:
+            sku_description = str(record["sku_description"]).strip()
+            sku_id = int(record["sku_id"])
+            current_stock_kg = float(record["current_stock_kg"])
+            price = float(record["price"])
+            responsible_employee = str(record["responsible_employee"]).strip()
+            last_review_date = record.get("last_review_date")
+            if last_review_date:
+                last_review_date = datetime.date.fromisoformat(str(last_review_date))
+            else:
+                last_review_date = datetime.date.today()
+        except KeyError as error:
+            raise InvalidMaterialRow(f"Missing field {error}") from error
+        except (TypeError, ValueError) as error:
+            raise InvalidMaterialRow(f"Wrong value: {error}") from error
+        if not sku_description:
+            raise InvalidMaterialRow("Empty material name")
+        if current_stock_kg < 0 or price < 0:
+            raise InvalidMaterialRow("Stock and price can not be negative")
+        if "@" not in responsible_employee:
+            raise InvalidMaterialRow(f"Wrong email address: {responsible_employee}")
+        return (sku_description, sku_id, current_stock_kg, price,
+                last_review_date, responsible_employee)
+
+    @staticmethod
+    def validate_stock_record(record):
+        """Converts stock count record read from file into values used for update
+
+        Arguments:
+            record (dict): sku_id and current_stock_kg fields read from file
+
+        Returns:
+            stock_level (tuple): material sku code and new quantity [kg]"""
+
+        if not isinstance(record, dict):
+            raise InvalidMaterialRow("Row is not a valid object")
+        try:
+            sku_id = int(record["sku_id"])
+            current_stock_kg = float(record["current_stock_kg"])
+        except KeyError as error:
+            raise InvalidMaterialRow(f"Missing field {error}") from error
+        except (TypeError, ValueError) as error:
+            raise InvalidMaterialRow(f"Wrong value: {error}") from error
+        if current_stock_kg < 0:
+            raise InvalidMaterialRow("Stock can not be negative")
+        return sku_id, current_stock_kg
+
+    def iter_valid_rows(self, file_path, validator=None):
+        """Streams validated rows from file remembering rejected ones
+
+        Arguments:
+            file_path (str): path to imported file
+            validator (callable): converts record into saved values, validate_record
+            when not provided
+
+        Returns:
+            rows (generator): validated values ready to be saved"""
+
+        validator = validator or self.validate_record
+        for line_number, record in self.read_records(file_path):
+            try:
+                yield validator(record)
+            except InvalidMaterialRow as error:
+                self.rejected_rows.append((line_number, str(error)))
+
+    def import_file(self, file_path):
+        """Inserts or updates all valid materials from file in single transaction
+
+        Arguments:
+            file_path (str): path to imported file
+
+        Returns:
+            imported_rows (int): number of saved rows"""
+
+        self.rejected_rows = []
+        rows = self.iter_valid_rows(file_path)
+        imported_rows = 0
+        with self.database.transaction() as cursor:
+            chunk = list(islice(rows, self.chunk_size))
+            while chunk:
+                cursor.executemany("INSERT INTO raw_materials_stock"
+                                   "(sku_description,"
+                                   "sku_id,"
+                                   "current_stock_kg,"
+                                   "price,"
+                                   "last_review_date,"
+                                   "responsible_employee)"
+                                   "VALUES (?, ?, ?, ?, ?, ?) "
+                                   "ON CONFLICT(sku_id) DO UPDATE SET "
+                                   "sku_description=excluded.sku_description,"
+                                   "current_stock_kg=excluded.current_stock_kg,"
+                                   "price=excluded.price,"
+                                   "last_review_date=excluded.last_review_date,"
+                                   "responsible_employee=excluded.responsible_employee",
+                                   chunk)
+                imported_rows += len(chunk)
+                chunk = list(islice(rows, self.chunk_size))
+        return imported_rows
+
+    def run(self, file_path):
+        """Imports file and prints throughput of import with list of rejected rows
+
+        Arguments:
+            file_path (str): path to imported file"""
+
+        start_time = time.perf_counter()
+        imported_rows = self.import_file(file_path)
+        elapsed_time = time.perf_counter() - start_time
+        rows_per_second = imported_rows / elapsed_time if elapsed_time else 0
+        print(f"Imported {imported_rows} materials in {elapsed_time:.2f} s "
+              f"({rows_per_second:.0f} rows/s), rejected {len(self.rejected_rows)}")
+        for line_number, reason in self.rejected_rows:
+            print(f"Line {line_number} rejected: {reason}")
+
+    def update_stocks_file(self, file_path):
+        """Sets stock levels from file in single transaction and prints throughput of update
+        with number of unknown SKUs and list of rejected rows
+
+        Arguments:
+            file_path (str): path to file with stock counts"""
+
+        self.rejected_rows = []
+        counted_rows = 0
+
+        def count_rows(stock_levels):
+            nonlocal counted_rows
+            for stock_level in stock_levels:
+                counted_rows += 1
+                yield stock_level
+
+        start_time = time.perf_counter()
+        updated_rows = self.database.update_stocks(
+            count_rows(self.iter_valid_rows(file_path, self.validate_stock_record)))
+        elapsed_time = time.perf_counter() - start_time
+        rows_per_second = updated_rows / elapsed_time if elapsed_time else 0
+        print(f"Updated stock of {updated_rows} materials in {elapsed_time:.2f} s "
+              f"({rows_per_second:.0f} rows/s), not existing SKUs "
+              f"{counted_rows - updated_rows}, rejected {len(self.rejected_rows)}")
+        for line_number, reason in self.rejected_rows:
+            print(f"Line {line_number} rejected: {reason}")
@@ -0,0 +1,112 @@
+"""Contains in-memory snapshot of raw materials table, so repeated views and lookups do
+not query database while nothing was changed"""
+from bisect import bisect_right
+import datetime
+from operator import attrgetter
+from database_manager import MATERIAL_COLUMNS
+from instrumentation import INSTRUMENTATION
+
+
+class MaterialsCache():
+    """Keeps all materials in memory together with indexes by SKU, responsible person and
+    review date. Snapshot is loaded again when program wrote to database, which is counted
+    by Database.write_counter, or when other connection changed it, which is shown by
+    PRAGMA data_version"""
+
+    def __init__(self, database):
+        """Initiates empty cache
+
+        Arguments:
+            database (Database): database of raw materials"""
+
+        self.database = database
+        self.version = None
+        self.materials = []
+        self.materials_by_sku = {}
+        self.materials_by_employee = {}
+        self.materials_by_review_date = []
+        self.review_dates = []
+
+    def get_database_version(self):
+        """Returns values what change with every write to database
+
+        Returns:
+            version (tuple): number of transactions committed by program and data version
+            of database file"""
+
+        self.database.cursor.execute("PRAGMA data_version")
+        return self.database.write_counter, self.database.cursor.fetchone()[0]
+
+    def refresh(self):
+        """Loads materials and builds indexes again if database was changed since
+        previous loading"""
+
+        version = self.get_database_version()
+        if version == self.version:
+            INSTRUMENTATION.count("cache.hits")
+            return
+        INSTRUMENTATION.count("cache.misses")
+        with INSTRUMENTATION.span("cache.load"):
+            self.materials = list(self.database.iter_rows(
+                f"SELECT {MATERIAL_COLUMNS} FROM raw_materials_stock ORDER BY id"))
+            self.materials_by_sku = {material.sku_id: material for material in self.materials}
+            self.materials_by_employee = {}
+            for material in self.materials:
+                self.materials_by_employee.setdefault(material.responsible_employee,
+                                                      []).append(material)
+            # Review dates are compared as ISO text, like in database
+            self.materials_by_review_date = sorted(
+                self.materials, key=lambda material: str(material.last_review_date))
+            self.review_dates = [str(material.last_review_date)
+                                 for material in self.materials_by_review_date]
+        self.version = version
+
+    def get_all_materials(self):
+        """Returns all materials ordered by id
+
+        Returns:
+            materials (list): all raw materials stock as Material objects"""
+
+        self.refresh()
+        return self.materials
+
+    def get_materials_to_review(self, days_interval=3):
+        """Returns materials what were not reviewed for longer than provided number
+        of days, ordered by id
+
+        Arguments:
+            days_interval (int): number of days what added to last review date indicates
+            new date when material should be reviewed
+
+        Returns:
+            materials_to_be_reviewed (list): materials what should be reviewed"""
+
+        self.refresh()
+        review_cutoff_date = datetime.date.today() - datetime.timedelta(days=days_interval)
+        due_materials_count = bisect_right(self.review_dates, review_cutoff_date.isoformat())
+        return sorted(self.materials_by_review_date[:due_materials_count],
+                      key=attrgetter("id"))
+
+    def get_material(self, sku_id):
+        """Returns material with provided SKU
+
+        Arguments:
+            sku_id (int): material sku code
+
+        Returns:
+            material (Material): found material or None if it does not exist"""
+
+        self.refresh()
+        return self.materials_by_sku.get(sku_id)
+
+    def get_employee_materials(self, employee_email):
+        """Returns materials managed by provided person
+
+        Arguments:
+            employee_email (str): email address of person responsible for materials
+
+        Returns:
+            materials (list): materials of person ordered by id"""
+
+        self.refresh()
+        return self.materials_by_employee.get(employee_email, [])
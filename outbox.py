@@ -0,0 +1,167 @@
+"""Contains persistent queue of emails saved in database before sending, so interrupted
+sending can be resumed without sending the same message twice"""
+import datetime
+from mail_dispatcher import MailDispatcher
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class Outbox():
+    """Represents outbox table of database. Messages are enqueued in bulk and drained in
+    small batches by dispatcher. Drain claims messages it sends for lease time, so
+    overlapping drains do not send the same message, while messages of drain what stopped
+    are sent again after lease ends. Failed messages wait with growing delay before next
+    attempt. Sent messages are kept only for retention time"""
+
+    def __init__(self, database, max_attempts=5, backoff_seconds=60, lease_seconds=600,
+                 retention_days=7):
+        """Initiates outbox
+
+        Arguments:
+            database (Database): connected database with outbox table
+            max_attempts (int): number of sending attempts after which message is failed
+            backoff_seconds (float): delay before second attempt, doubled by every next one
+            lease_seconds (float): time after which message claimed by drain what did not
+            save its result can be claimed again
+            retention_days (float): days after sending when message is deleted, it should
+            not be shorter than suppression window, so deleted reminders are not created
+            again"""
+
+        self.database = database
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease = datetime.timedelta(seconds=lease_seconds)
+        self.retention = datetime.timedelta(days=retention_days)
+
+    def enqueue(self, entries):
+        """Saves messages in outbox as pending. Message with key already present in outbox
+        is skipped, so enqueueing the same reminders again is safe
+
+        Arguments:
+            entries (iterable): triples of unique message key, receiver address and message
+
+        Returns:
+            enqueued_messages (int): number of newly saved messages"""
+
+        created_at = datetime.datetime.now()
+        with self.database.transaction() as cursor:
+            cursor.executemany("INSERT OR IGNORE INTO outbox(dedupe_key, recipient, message,"
+                               " status, attempts, next_attempt_at, created_at)"
+                               " VALUES (?, ?, ?, ?, 0, ?, ?)",
+                               ((dedupe_key, recipient, self.serialize(message), PENDING,
+                                 created_at, created_at)
+                                for dedupe_key, recipient, message in entries))
+            return cursor.rowcount
+
+    @staticmethod
+    def serialize(message):
+        """Converts message into bytes saved in outbox
+
+        Arguments:
+            message (str, bytes or EmailMessage): message content
+
+        Returns:
+            content (bytes): complete message content"""
+
+        if isinstance(message, bytes):
+            return message
+        if isinstance(message, str):
+            return message.encode("utf-8")
+        return message.as_bytes()
+
+    def claim_pending(self, limit=20):
+        """Marks oldest pending messages what are ready to be sent, and messages with ended
+        lease, as sending until end of new lease and returns them. Messages are selected
+        and marked by single statement, so two drains never claim the same message. For
+        sending messages next attempt time is end of their lease
+
+        Arguments:
+            limit (int): maximal number of claimed messages
+
+        Returns:
+            entries (list): tuples of outbox id, attempts, receiver address and message,
+            ordered by id"""
+
+        now = datetime.datetime.now()
+        with self.database.transaction() as cursor:
+            cursor.execute("UPDATE outbox SET status=?, next_attempt_at=? WHERE id IN"
+                           " (SELECT id FROM outbox WHERE status IN (?, ?)"
+                           " AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?)"
+                           " RETURNING id, attempts, recipient, message",
+                           (SENDING, now + self.lease, PENDING, SENDING, now, limit))
+            return sorted(cursor.fetchall())
+
+    def count_pending(self):
+        """Returns number of messages waiting for sending
+
+        Returns:
+            pending_messages (int): number of pending messages"""
+
+        self.database.cursor.execute("SELECT COUNT(*) FROM outbox WHERE status=?", (PENDING,))
+        return self.database.cursor.fetchone()[0]
+
+    def save_results(self, entries, results):
+        """Marks sent messages and schedules next attempt of failed ones
+
+        Arguments:
+            entries (list): entries returned by claim_pending
+            results (list): DispatchResult of every entry"""
+
+        now = datetime.datetime.now()
+        sent_rows = []
+        failed_rows = []
+        for (outbox_id, attempts, _, _), result in zip(entries, results):
+            if result.success:
+                sent_rows.append((SENT, now, outbox_id))
+                continue
+            attempts += 1
+            if attempts >= self.max_attempts or not MailDispatcher.is_transient(result.error):
+                status = FAILED
+            else:
+                status = PENDING
+            next_attempt_at = now + datetime.timedelta(
+                seconds=self.backoff_seconds * 2 ** (attempts - 1))
+            failed_rows.append((status, attempts, next_attempt_at, str(result.error),
+                                outbox_id))
+        with self.database.transaction() as cursor:
+            cursor.executemany("UPDATE outbox SET status=?, attempts=attempts + 1, sent_at=?"
+                               " WHERE id=?", sent_rows)
+            cursor.executemany("UPDATE outbox SET status=?, attempts=?, next_attempt_at=?,"
+                               " last_error=? WHERE id=?", failed_rows)
+
+    def purge_sent(self):
+        """Deletes messages sent before retention time
+
+        Returns:
+            purged_messages (int): number of deleted messages"""
+
+        with self.database.transaction() as cursor:
+            cursor.execute("DELETE FROM outbox WHERE status=? AND sent_at < ?",
+                           (SENT, datetime.datetime.now() - self.retention))
+            return cursor.rowcount
+
+    def drain(self, dispatcher, batch_size=20):
+        """Claims and sends ready pending messages batch by batch saving result of every
+        batch, until no message is ready. Small batches keep number of messages sent again
+        after interruption low. Messages sent before retention time are deleted at the end
+
+        Arguments:
+            dispatcher (MailDispatcher): dispatcher sending messages
+            batch_size (int): number of messages sent between saving results
+
+        Returns:
+            results (list): DispatchResult of every sent message"""
+
+        all_results = []
+        entries = self.claim_pending(batch_size)
+        while entries:
+            results = dispatcher.dispatch((recipient, message)
+                                          for _, _, recipient, message in entries)
+            self.save_results(entries, results)
+            all_results.extend(results)
+            entries = self.claim_pending(batch_size)
+        self.purge_sent()
+        return all_results
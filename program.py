@@ -1,10 +1,25 @@
-"""Contains main functions of program and defines its working"""
-import smtplib
-from smtplib import SMTPAuthenticationError
+"""Contains main functions of program and defines its working. Modules used only for
+sending emails, importing and forecasting are imported by methods what need them, so
+quick queries started from scripts do not load SMTP, SSL and asyncio machinery"""
+from argparse import Namespace
+import datetime
+import hashlib
+import html
+from itertools import islice
+from operator import attrgetter, itemgetter
+import sqlite3
 import sys
+import time
 from database_manager import Database
+from exceptions.database_manager_exceptions import DuplicatedSKUs
+from exceptions.mail_manager_exceptions import MissingCredentials
 from exceptions.program_exceptions import InvalidMenuNumber
-from mail_manager import Email
+from instrumentation import INSTRUMENTATION
+from materials_cache import MaterialsCache
+from template_registry import HtmlMarkup, TemplateRegistry
+
+SENDER_NAME = "System alert"
+TEMPLATE_REGISTRY = TemplateRegistry()
 
 
 class Program():
@@ -15,14 +30,45 @@ class Program():
         """Initiates new program object"""
 
         self.database = Database()
-        self.email = Email()
-        self.menu_actions = {
+        self.email_account = None
+        self.materials_cache = MaterialsCache(self.database)
+        self.menu_actions = None
+
+    @property
+    def email(self):
+        """Administrator's email account created when it is used first time
+
+        Returns:
+            email (Email): administrator's email account"""
+
+        if self.email_account is None:
+            # pylint: disable=import-outside-toplevel
+            from mail_manager import Email
+            self.email_account = Email()
+        return self.email_account
+
+    @email.setter
+    def email(self, email):
+        """Replaces administrator's email account
+
+        Arguments:
+            email (Email): administrator's email account"""
+
+        self.email_account = email
+
+    def create_menu_actions(self):
+        """Returns options of interactive menu with methods they perform
+
+        Returns:
+            menu_actions (dict): description and actions of every menu option"""
+
+        return {
             1: {
                 "description": "Show raw materials to be reviewed",
                 "actions": [
                     {
                         "action_method": self.database.show_data,
-                        "argument": self.database.get_materials_to_review,
+                        "argument": self.materials_cache.get_materials_to_review,
                     },
                 ]
             },
@@ -40,7 +86,7 @@ class Program():
                 "actions": [
                     {
                         "action_method": self.database.show_data,
-                        "argument": self.database.get_all_materials,
+                        "argument": self.materials_cache.get_all_materials,
                     },
                 ]
             },
@@ -80,6 +126,24 @@ class Program():
                     },
                 ]
             },
+            8: {
+                "description": "Send digest autoreminders (one per employee)",
+                "actions": [
+                    {
+                        "action_method": self.send_digest_reminders,
+                        "argument": None,
+                    },
+                ]
+            },
+            9: {
+                "description": "Send pending autoreminders from outbox",
+                "actions": [
+                    {
+                        "action_method": self.send_pending_reminders,
+                        "argument": None,
+                    },
+                ]
+            },
             0: {
                 "description": "Quit program",
                 "actions": [
@@ -98,6 +162,8 @@ class Program():
     def print_menu(self):
         """Prints main menu of program as list of available options to be performed"""
 
+        if self.menu_actions is None:
+            self.menu_actions = self.create_menu_actions()
         print("Menu")
         for key, option in self.menu_actions.items():
             print(f"{key}. {option['description']}", end="\t")
@@ -108,12 +174,359 @@ class Program():
         """Collects methods creating core of program run"""
 
         self.database.define_parser_arguments()
-        self.database.start_database()
+        arguments = self.database.parsed_arguments
+        if arguments.metrics_file:
+            INSTRUMENTATION.enable()
+        try:
+            with INSTRUMENTATION.profile(arguments.profile):
+                self.run_chosen_mode()
+        finally:
+            if arguments.metrics_file:
+                INSTRUMENTATION.write(arguments.metrics_file, arguments.metrics_format)
+
+    def run_chosen_mode(self):
+        """Runs non-interactive operation chosen by flags or interactive menu"""
+
+        try:
+            self.database.start_database()
+        except DuplicatedSKUs as exception:
+            print(exception)
+            sys.exit(1)
+        self.configure_transport()
+        if self.database.parsed_arguments.dry_run:
+            self.run_dry_run(self.database.parsed_arguments)
+            self.database.disconnect_database()
+            return
+        if self.database.parsed_arguments.command:
+            succeeded = self.run_command()
+            self.database.disconnect_database()
+            if not succeeded:
+                sys.exit(1)
+            return
+        if self.database.parsed_arguments.list_due:
+            self.database.show_data(self.database.iter_materials_to_review())
+            self.database.disconnect_database()
+            return
+        if self.database.parsed_arguments.import_file:
+            self.import_files(Namespace(
+                import_files=[self.database.parsed_arguments.import_file]))
+            self.database.disconnect_database()
+            return
+        if self.database.parsed_arguments.update_stocks:
+            succeeded = self.update_stocks_file(self.database.parsed_arguments.update_stocks)
+            self.database.disconnect_database()
+            if not succeeded:
+                sys.exit(1)
+            return
+        if self.database.parsed_arguments.show or self.database.parsed_arguments.export:
+            self.export_materials(self.database.parsed_arguments)
+            self.database.disconnect_database()
+            return
+        if self.database.parsed_arguments.async_send:
+            self.run_async_reminders()
+            self.database.disconnect_database()
+            return
+        if self.database.parsed_arguments.run_once or self.database.parsed_arguments.daemon:
+            self.run_reminder_daemon()
+            self.database.disconnect_database()
+            return
         if self.database.parsed_arguments.add:
             self.database.add_new_material()
         self.select_menu_options()
 
+    def configure_transport(self):
+        """Sets transport of reminders chosen by flags, administrator's email server is
+        used when no other was chosen"""
+
+        arguments = self.database.parsed_arguments
+        if arguments.transport != "smtp":
+            self.email.transport = self.email.create_transport(arguments.transport,
+                                                               arguments.transport_target)
+
+    def load_admin_password(self, password_file=None):
+        """Reads administrator's email password without interaction when chosen transport
+        needs it
+
+        Arguments:
+            password_file (str): path to file containing only password
+
+        Returns:
+            admin_password (str): read password or None when it is not needed"""
+
+        if not self.email.requires_password():
+            return None
+        return self.email.load_admin_password(password_file)
+
+    def run_command(self):
+        """Runs single operation chosen by subcommand
+
+        Returns:
+            succeeded (bool): False when operation or any of processed materials failed"""
+
+        commands = {
+            "list": self.export_materials,
+            "export": self.export_materials,
+            "due": self.print_due_materials,
+            "add": self.add_materials,
+            "set-stock": self.set_stocks,
+            "remind": self.send_reminders_without_interaction,
+            "import": self.import_files,
+            "report": self.print_stock_report,
+        }
+        arguments = self.database.parsed_arguments
+        return commands[arguments.command](arguments)
+
+    def export_materials(self, arguments):
+        """Prints or writes page of raw materials table in chosen format
+
+        Arguments:
+            arguments (Namespace): parsed program arguments
+
+        Returns:
+            succeeded (bool): False when not existing columns were chosen"""
+
+        try:
+            self.database.export_data(arguments.export or "table", arguments.columns,
+                                      arguments.limit, arguments.offset, arguments.output,
+                                      getattr(arguments, "sku_ids", None))
+        except ValueError as exception:
+            print(exception)
+            return False
+        return True
+
+    def print_due_materials(self, arguments):
+        """Prints materials to be reviewed, optionally only the ones with chosen SKUs
+
+        Arguments:
+            arguments (Namespace): parsed program arguments
+
+        Returns:
+            succeeded (bool): always True"""
+
+        materials = self.database.iter_materials_to_review(arguments.days)
+        if arguments.sku_ids:
+            sku_ids = set(arguments.sku_ids)
+            materials = (material for material in materials if material.sku_id in sku_ids)
+        self.database.show_data(materials, output_format=arguments.output_format)
+        return True
+
+    def print_stock_report(self, arguments):
+        """Prints stock value and review backlog report
+
+        Arguments:
+            arguments (Namespace): parsed program arguments
+
+        Returns:
+            succeeded (bool): always True"""
+
+        # pylint: disable=import-outside-toplevel
+        from stock_report import StockReport
+        StockReport.print_report(StockReport(self.database, arguments.days).create(),
+                                 arguments.output_format)
+        return True
+
+    def add_materials(self, arguments):
+        """Adds materials provided as arguments in single transaction and imports
+        materials from provided file
+
+        Arguments:
+            arguments (Namespace): parsed program arguments
+
+        Returns:
+            succeeded (bool): False when any material was rejected"""
+
+        # pylint: disable=import-outside-toplevel
+        from exceptions.material_importer_exceptions import InvalidMaterialRow
+        from material_importer import MaterialImporter
+        succeeded = True
+        rows = []
+        for values in arguments.materials:
+            try:
+                rows.append(MaterialImporter.validate_record(dict(zip(
+                    ("sku_description", "sku_id", "current_stock_kg", "price",
+                     "responsible_employee"), values))))
+            except InvalidMaterialRow as exception:
+                print(f"Material {values[0]} rejected: {exception}")
+                succeeded = False
+        if rows:
+            try:
+                print(f"Materials added: {self.database.add_materials(rows)}")
+            except sqlite3.IntegrityError:
+                print("Material with provided SKU already exists, nothing added")
+                succeeded = False
+        if arguments.materials_file:
+            succeeded = self.import_files(Namespace(import_files=[arguments.materials_file])) \
+                and succeeded
+        return succeeded
+
+    def set_stocks(self, arguments):
+        """Sets stock levels provided as arguments in single transaction and stock levels
+        from provided file
+
+        Arguments:
+            arguments (Namespace): parsed program arguments
+
+        Returns:
+            succeeded (bool): False when any SKU does not exist or file or row was
+            rejected"""
+
+        succeeded = True
+        if arguments.stock_levels:
+            missing_sku_ids = self.database.find_missing_skus(
+                [sku_id for sku_id, _ in arguments.stock_levels])
+            updated_rows = self.database.update_stocks(arguments.stock_levels)
+            print(f"Updated stock of {updated_rows} materials")
+            if missing_sku_ids:
+                print(f"Not existing SKUs: {', '.join(map(str, missing_sku_ids))}")
+                succeeded = False
+        if arguments.stocks_file:
+            succeeded = self.update_stocks_file(arguments.stocks_file) and succeeded
+        return succeeded
+
+    def send_reminders_without_interaction(self, arguments):
+        """Sends reminders through outbox with password read from file or environment
+
+        Arguments:
+            arguments (Namespace): parsed program arguments
+
+        Returns:
+            succeeded (bool): False when password was not provided or connection could
+            not be opened"""
+
+        try:
+            admin_password = self.load_admin_password(arguments.password_file)
+        except MissingCredentials as exception:
+            print(exception)
+            return False
+        results = self.send_email_reminders(digest=arguments.digest,
+                                            enqueue=not arguments.pending,
+                                            admin_password=admin_password)
+        return results is not None
+
+    def import_files(self, arguments):
+        """Imports or updates materials from provided files, each in single transaction
+
+        Arguments:
+            arguments (Namespace): parsed program arguments
+
+        Returns:
+            succeeded (bool): False when any file or row was rejected"""
+
+        # pylint: disable=import-outside-toplevel
+        from exceptions.material_importer_exceptions import UnsupportedImportFormat
+        from material_importer import MaterialImporter
+        succeeded = True
+        for file_path in arguments.import_files:
+            importer = MaterialImporter(self.database)
+            try:
+                importer.run(file_path)
+            except (OSError, UnsupportedImportFormat) as exception:
+                print(f"File {file_path} not imported: {exception}")
+                succeeded = False
+                continue
+            succeeded = succeeded and not importer.rejected_rows
+        return succeeded
+
+    def update_stocks_file(self, file_path):
+        """Sets stock levels from provided file in single transaction
+
+        Arguments:
+            file_path (str): path to file with stock counts
+
+        Returns:
+            succeeded (bool): False when file or any row was rejected"""
+
+        # pylint: disable=import-outside-toplevel
+        from exceptions.material_importer_exceptions import UnsupportedImportFormat
+        from material_importer import MaterialImporter
+        importer = MaterialImporter(self.database)
+        try:
+            importer.update_stocks_file(file_path)
+        except (OSError, UnsupportedImportFormat) as exception:
+            print(f"File {file_path} not imported: {exception}")
+            return False
+        return not importer.rejected_rows
+
+    def run_reminder_daemon(self):
+        """Sends reminders without interaction once or periodically, depending on
+        provided flags. Password is read from file or environment"""
+
+        # pylint: disable=import-outside-toplevel
+        from smtplib import SMTPAuthenticationError
+        from reminder_daemon import ReminderDaemon
+        from reminder_suppression import ReminderSuppressor
+        arguments = self.database.parsed_arguments
+        try:
+            admin_password = self.load_admin_password(arguments.password_file)
+        except MissingCredentials as exception:
+            print(exception)
+            self.database.disconnect_database()
+            sys.exit(1)
+        daemon = ReminderDaemon(self.database, self.email, self.build_reminder_messages,
+                                admin_password, smtp_connections=arguments.smtp_connections,
+                                rate_limiter=self.create_rate_limiter(),
+                                suppressor=ReminderSuppressor(self.database,
+                                                              arguments.suppression_days))
+        try:
+            if arguments.daemon:
+                daemon.run_forever(arguments.interval_minutes)
+            else:
+                self.print_dispatch_results(daemon.run_once())
+        except SMTPAuthenticationError:
+            print("Incorrect email password")
+
+    def run_async_reminders(self):
+        """Sends reminders about due materials without interaction through asyncio
+        pipeline. Password is read from file or environment"""
+
+        # pylint: disable=import-outside-toplevel
+        from smtplib import SMTPAuthenticationError
+        from async_pipeline import AsyncReminderPipeline
+        from mail_dispatcher import MailDispatcher, SmtpConnectionPool
+        from reminder_suppression import ReminderSuppressor
+        arguments = self.database.parsed_arguments
+        try:
+            admin_password = self.load_admin_password(arguments.password_file)
+        except MissingCredentials as exception:
+            print(exception)
+            return
+        rate_limiter = self.create_rate_limiter()
+        with SmtpConnectionPool(lambda: self.email.open_connection(admin_password),
+                                size=arguments.smtp_connections) as pool:
+            dispatcher = MailDispatcher(pool, sender=self.email.admin_email,
+                                        rate_limiter=rate_limiter)
+            suppressor = ReminderSuppressor(self.database, arguments.suppression_days)
+            suppressor.evict()
+            pipeline = AsyncReminderPipeline(self.database, dispatcher,
+                                             self.build_reminder_messages,
+                                             queue_size=arguments.queue_size,
+                                             suppressor=suppressor)
+            try:
+                self.print_dispatch_results(pipeline.run())
+            except SMTPAuthenticationError:
+                print("Incorrect email password")
+                return
+            finally:
+                self.save_sent_messages(rate_limiter)
+        if rate_limiter is not None:
+            self.print_rate_metrics(rate_limiter.get_metrics())
+
+    @staticmethod
+    def compose_message(rendered_message):
+        """Joins rendered template parts into email content with headers
+
+        Arguments:
+            rendered_message (RenderedMessage): filled subject and body
+
+        Returns:
+            message (str): complete email message content to be sent"""
+
+        return f"From: {SENDER_NAME}\n" \
+               f"Subject: {rendered_message.subject}\n" \
+               f"{rendered_message.text}"
+
     @staticmethod
+    @INSTRUMENTATION.timed("program.fill_message_template")
     def fill_message_template(material_name, stock, last_review_date):
         """Creates personalized email content to be sent as reminder
 
@@ -125,36 +538,448 @@ class Program():
         Returns:
             message (str): complete email message content to be sent"""
 
-        sender = "System alert"
-        subject = f"Raw material {material_name} needs review"
-        body = f"Reminder!\n Raw material {material_name} has {stock} kg " \
-               f"stock and was reviewed last time on {last_review_date}"
+        rendered_message = TEMPLATE_REGISTRY.render("reminder", material_name=material_name,
+                                                    stock=stock,
+                                                    last_review_date=last_review_date)
+        return Program.compose_message(rendered_message)
+
+    @staticmethod
+    def render_reminders(materials):
+        """Renders reminder template for batch of materials with the same compiled template
+
+        Arguments:
+            materials (list): materials what reminders are created for
+
+        Returns:
+            rendered_messages (generator): RenderedMessage for every material"""
+
+        values_list = ({"material_name": material.sku_description,
+                        "stock": material.current_stock_kg,
+                        "last_review_date": material.last_review_date}
+                       for material in materials)
+        return TEMPLATE_REGISTRY.render_many("reminder", values_list)
+
+    @staticmethod
+    def render_digest(employee_email, materials, forecasts=()):
+        """Renders digest template listing all materials of one responsible person
+        what need review and materials what should be reordered
+
+        Arguments:
+            employee_email (str): email address of person responsible for materials
+            materials (list): materials to be reviewed by given person
+            forecasts (list): ReorderForecast of materials to be reordered by given person
+
+        Returns:
+            rendered_message (RenderedMessage): filled subject and bodies"""
+
+        table_rows = [f"{'sku_id':<12}{'sku_description':<24}{'current_stock_kg':<20}"
+                      f"last_review_date"]
+        html_rows = []
+        for material in materials:
+            table_rows.append(f"{material.sku_id!s:<12}{material.sku_description!s:<24}"
+                              f"{material.current_stock_kg!s:<20}{material.last_review_date}")
+            html_rows.append("<tr>" + "".join(
+                f"<td>{html.escape(str(value))}</td>"
+                for value in (material.sku_id, material.sku_description,
+                              material.current_stock_kg, material.last_review_date))
+                             + "</tr>")
+        reorder_summary = reorder_table = reorder_html = ""
+        if forecasts:
+            reorder_summary = f", {len(forecasts)} need reorder"
+            reorder_rows = ["", " Raw materials what will run out soon and should be "
+                                "reordered:",
+                            f"{'sku_id':<12}{'sku_description':<24}{'current_stock_kg':<20}"
+                            f"days_of_cover"]
+            reorder_html_rows = []
+            for forecast in forecasts:
+                material = forecast.material
+                reorder_rows.append(f"{material.sku_id!s:<12}{material.sku_description!s:<24}"
+                                    f"{material.current_stock_kg!s:<20}"
+                                    f"{forecast.days_of_cover:.1f}")
+                reorder_html_rows.append("<tr>" + "".join(
+                    f"<td>{html.escape(str(value))}</td>"
+                    for value in (material.sku_id, material.sku_description,
+                                  material.current_stock_kg,
+                                  f"{forecast.days_of_cover:.1f}")) + "</tr>")
+            reorder_table = "\n".join(reorder_rows)
+            reorder_html = ("<p>Raw materials what will run out soon and should be "
+                            "reordered:</p>\n<table border=\"1\" cellpadding=\"4\">\n"
+                            "<tr><th>sku_id</th><th>sku_description</th>"
+                            "<th>current_stock_kg</th><th>days_of_cover</th></tr>\n"
+                            + "\n".join(reorder_html_rows) + "\n</table>")
+        return TEMPLATE_REGISTRY.render(
+            "digest", employee_email=employee_email, materials_count=len(materials),
+            materials_table="\n".join(table_rows),
+            materials_html_rows=HtmlMarkup("\n".join(html_rows)),
+            reorder_summary=reorder_summary, reorder_table=reorder_table,
+            reorder_html=HtmlMarkup(reorder_html))
+
+    @staticmethod
+    @INSTRUMENTATION.timed("program.fill_digest_template")
+    def fill_digest_template(employee_email, materials):
+        """Creates single email content listing all materials of one responsible person
+        what need review
+
+        Arguments:
+            employee_email (str): email address of person responsible for materials
+            materials (list): materials to be reviewed by given person
+
+        Returns:
+            message (str): complete email message content to be sent"""
+
+        return Program.compose_message(Program.render_digest(employee_email, materials))
+
+    @INSTRUMENTATION.timed("program.build_reminder_messages")
+    def build_reminder_messages(self, materials):
+        """Creates MIME reminders for batch of materials sharing headers of one batch
+
+        Arguments:
+            materials (list): materials what reminders are created for
+
+        Returns:
+            messages (list): EmailMessage for every material"""
+
+        builder = self.email.create_message_builder(SENDER_NAME)
+        return [builder.build(material.responsible_employee, rendered_message.subject,
+                              rendered_message.text, rendered_message.html)
+                for material, rendered_message
+                in zip(materials, self.render_reminders(materials))]
+
+    @INSTRUMENTATION.timed("program.build_reorder_messages")
+    def build_reorder_messages(self, forecasts):
+        """Creates MIME reminders about materials what will soon fall below reorder point
+
+        Arguments:
+            forecasts (list): ReorderForecast of every material to be reordered
+
+        Returns:
+            messages (list): EmailMessage for every material"""
+
+        builder = self.email.create_message_builder(SENDER_NAME)
+        values_list = ({"material_name": forecast.material.sku_description,
+                        "stock": forecast.material.current_stock_kg,
+                        "consumption": f"{forecast.consumption_kg_per_day:.1f}",
+                        "days_of_cover": f"{forecast.days_of_cover:.1f}"}
+                       for forecast in forecasts)
+        return [builder.build(forecast.material.responsible_employee,
+                              rendered_message.subject, rendered_message.text,
+                              rendered_message.html)
+                for forecast, rendered_message
+                in zip(forecasts, TEMPLATE_REGISTRY.render_many("reorder", values_list))]
+
+    def get_reorder_forecasts(self):
+        """Recalculates consumption forecasts of materials what stock changed and returns
+        materials what projected stock falls below reorder point
+
+        Returns:
+            forecasts (list): ReorderForecast of every material to be reordered"""
+
+        # pylint: disable=import-outside-toplevel
+        from stock_forecast import StockForecaster
+        forecaster = StockForecaster(self.database)
+        forecaster.refresh()
+        return list(forecaster.iter_materials_to_reorder())
+
+    def create_reorder_messages(self):
+        """Creates reminder for every material what projected stock falls below reorder
+        point. Material is reminded about at most once a day. Forecasts are calculated
+        before returning, so messages can be enqueued with the same database cursor
+
+        Returns:
+            messages (list): triples of outbox key, receiver address and MIME message"""
+
+        forecasts = self.get_reorder_forecasts()
+        reorder_date = datetime.date.today()
+        return [(f"reorder:{forecast.material.sku_id}:{reorder_date}",
+                 forecast.material.responsible_employee, message)
+                for forecast, message in zip(forecasts, self.build_reorder_messages(forecasts))]
+
+    def create_reminder_messages(self, batch_size=500, shard_results=None, suppressor=None):
+        """Creates reminder for every material what should be reviewed. Materials are
+        rendered in batches
+
+        Arguments:
+            batch_size (int): number of materials rendered at once
+            shard_results (list): ShardResult of scanned plant databases used instead
+            of main database, outbox keys of their reminders contain shard name
+            suppressor (ReminderSuppressor): drops reminders sent recently and saves
+            created ones as sent, all reminders are created when None
+
+        Returns:
+            messages (generator): triples of outbox key, receiver address and MIME message"""
+
+        if shard_results is None:
+            materials = (("reminder", material)
+                         for material in self.database.iter_materials_to_review())
+        else:
+            # pylint: disable=import-outside-toplevel
+            from shard_scanner import ShardScanner
+            materials = ((f"reminder:{shard}", material) for shard, material
+                         in ShardScanner.iter_materials(shard_results))
+        batch = list(islice(materials, batch_size))
+        while batch:
+            if suppressor is not None:
+                batch = suppressor.filter(batch, key=itemgetter(1))
+                suppressor.mark_sent(material for _, material in batch)
+            messages = self.build_reminder_messages([material for _, material in batch])
+            for (key_prefix, material), message in zip(batch, messages):
+                yield (f"{key_prefix}:{material.sku_id}:{material.last_review_date}",
+                       material.responsible_employee, message)
+            batch = list(islice(materials, batch_size))
 
-        message = f"From: {sender}\n" \
-                  f"Subject: {subject}\n" \
-                  f"{body}"
+    def create_digest_messages(self, shard_results=None, suppressor=None, forecasts=()):
+        """Creates one reminder for every person responsible for materials what should
+        be reviewed or reordered. Outbox key of digest contains hash of listed materials,
+        so digest of materials what became due after earlier digest of the same day is
+        not taken for its duplicate
 
-        return message
+        Arguments:
+            shard_results (list): ShardResult of scanned plant databases used instead
+            of main database, one person gets single digest for all plants
+            suppressor (ReminderSuppressor): drops materials reminded about recently, or
+            reminded about reorder the same day, and saves listed ones as sent, all
+            materials are listed when None
+            forecasts (list): ReorderForecast of materials to be reordered listed in
+            digests of their responsible persons
+
+        Returns:
+            messages (generator): triples of outbox key, receiver address and MIME message"""
+
+        builder = self.email.create_message_builder(SENDER_NAME)
+        digest_date = datetime.date.today()
+        reorder_tag = f"reorder:{digest_date}"
+        if shard_results is None:
+            groups = self.database.iter_materials_to_review_by_employee()
+        else:
+            # pylint: disable=import-outside-toplevel
+            from shard_scanner import ShardScanner
+            groups = ShardScanner.iter_materials_by_employee(shard_results)
+        for employee_email, materials, employee_forecasts in self.merge_reorder_groups(
+                groups, forecasts):
+            if suppressor is not None:
+                materials = suppressor.filter(materials)
+                suppressor.mark_sent(materials)
+                employee_forecasts = suppressor.filter(employee_forecasts,
+                                                       key=attrgetter("material"),
+                                                       tag=reorder_tag)
+                suppressor.mark_sent((forecast.material for forecast in employee_forecasts),
+                                     tag=reorder_tag)
+            if not materials and not employee_forecasts:
+                continue
+            listed_materials = hashlib.blake2b(digest_size=8)
+            for material in materials:
+                listed_materials.update(
+                    f"{material.sku_id}:{material.last_review_date}\x1f".encode("utf-8"))
+            for forecast in employee_forecasts:
+                listed_materials.update(f"{forecast.material.sku_id}:{reorder_tag}\x1f"
+                                        .encode("utf-8"))
+            rendered_message = self.render_digest(employee_email, materials,
+                                                  employee_forecasts)
+            yield (f"digest:{employee_email}:{digest_date}:{listed_materials.hexdigest()}",
+                   employee_email,
+                   builder.build(employee_email, rendered_message.subject,
+                                 rendered_message.text, rendered_message.html))
+
+    @staticmethod
+    def merge_reorder_groups(groups, forecasts):
+        """Joins materials of every person to be reordered with their materials to be
+        reviewed. Persons having only materials to be reordered follow the other ones
+
+        Arguments:
+            groups (iterable): pairs of employee email and list of materials to review
+            forecasts (list): ReorderForecast of materials to be reordered
 
-    def send_email_reminders(self):
+        Returns:
+            groups (generator): triples of employee email, list of materials to review
+            and list of ReorderForecast"""
+
+        reorder_groups = {}
+        for forecast in forecasts:
+            reorder_groups.setdefault(forecast.material.responsible_employee,
+                                      []).append(forecast)
+        for employee_email, materials in groups:
+            yield employee_email, materials, reorder_groups.pop(employee_email, [])
+        for employee_email, employee_forecasts in reorder_groups.items():
+            yield employee_email, [], employee_forecasts
+
+    def send_email_reminders(self, digest=False, enqueue=True, admin_password=None):
         """Allows sending reminding emails to responsible persons where raw materials
-        have too long time with no review"""
+        have too long time with no review. Reminders are saved in outbox first and then
+        sent concurrently through pool of logged in connections, so interrupted sending
+        is resumed by next run without repeating already sent reminders
+
+        Arguments:
+            digest (bool): sends one email per person listing all their materials to be
+            reviewed and reordered instead of one email per material
+            enqueue (bool): adds reminders of currently due materials to outbox, only
+            pending outbox messages are sent otherwise
+            admin_password (str): administrator's email account password, asked for
+            when not provided and chosen transport needs it
+
+        Returns:
+            results (list): DispatchResult of every sent message, None when connection
+            could not be opened"""
 
-        with smtplib.SMTP_SSL(host=self.email.smtp_server, port=self.email.smtp_port)\
-                as self.email.server:
+        # pylint: disable=import-outside-toplevel
+        from smtplib import SMTPAuthenticationError, SMTPException
+        from mail_dispatcher import MailDispatcher, SmtpConnectionPool
+        from outbox import Outbox
+        from reminder_suppression import ReminderSuppressor
+        outbox = Outbox(self.database,
+                        retention_days=self.database.parsed_arguments.suppression_days)
+        if enqueue:
+            shard_results = self.scan_shards()
+            suppressor = ReminderSuppressor(self.database,
+                                            self.database.parsed_arguments.suppression_days)
+            suppressor.evict()
+            if digest:
+                entries = self.create_digest_messages(shard_results, suppressor,
+                                                      self.get_reorder_forecasts())
+            else:
+                entries = self.create_reminder_messages(shard_results=shard_results,
+                                                        suppressor=suppressor)
+            print(f"New reminders in outbox: {outbox.enqueue(entries)}")
+            if not digest:
+                print(f"New reorder reminders in outbox: "
+                      f"{outbox.enqueue(self.create_reorder_messages())}")
+        if admin_password is None and self.email.requires_password():
+            admin_password = self.email.ask_admin_password()
+        results = []
+        pool = SmtpConnectionPool(lambda: self.email.open_connection(admin_password),
+                                  size=self.database.parsed_arguments.smtp_connections)
+        with pool:
             try:
-                self.email.log_to_admin_email()
+                pool.release(pool.acquire())
                 print("Logging successfully")
-                materials_list = self.database.get_materials_to_review()
-                for material in materials_list:
-                    material_name = material.sku_description
-                    stock = material.current_stock_kg
-                    last_review_date = material.last_review_date
-                    email_address = material.responsible_employee
-                    message = self.fill_message_template(material_name, stock, last_review_date)
-                    self.email.send_email(mail_to=email_address, msg_content=message)
+                rate_limiter = self.create_rate_limiter()
+                dispatcher = MailDispatcher(pool, sender=self.email.admin_email,
+                                            rate_limiter=rate_limiter)
+                try:
+                    results = outbox.drain(dispatcher)
+                finally:
+                    self.save_sent_messages(rate_limiter)
+                self.print_dispatch_results(results)
+                if rate_limiter is not None:
+                    self.print_rate_metrics(rate_limiter.get_metrics())
             except SMTPAuthenticationError:
                 print("Entered incorrect password")
+                results = None
+            except (OSError, SMTPException) as exception:
+                print(f"Connection failed: {exception}")
+                results = None
+        if results is None:
+            print(f"Messages remain queued in outbox: {outbox.count_pending()}")
+        return results
+
+    def run_dry_run(self, arguments):
+        """Runs whole sending of reminders, scanning database, rendering messages and
+        passing them to chosen transport, at full speed and prints number of messages sent
+        per second. Memory transport is used instead of administrator's email server and
+        all database changes are rolled back, so outbox and sent reminders are left as
+        they were
+
+        Arguments:
+            arguments (Namespace): parsed program arguments, digest and pending options
+            of remind subcommand are used when provided"""
+
+        if self.email.requires_password():
+            self.email.transport = self.email.create_transport("memory")
+        start_time = time.perf_counter()
+        with self.database.rolled_back():
+            results = self.send_email_reminders(
+                digest=getattr(arguments, "digest", False),
+                enqueue=not getattr(arguments, "pending", False))
+        elapsed_time = time.perf_counter() - start_time
+        if results is None:
+            return
+        sent_messages = sum(1 for result in results if result.success)
+        send_rate = sent_messages / elapsed_time if elapsed_time else 0.0
+        print(f"Dry run: {sent_messages} messages in {elapsed_time:.3f} s, "
+              f"{send_rate:.1f} messages/s, database changes discarded")
+
+    def scan_shards(self):
+        """Scans plant databases provided with flags for materials to be reviewed and
+        prints scanning time of every one
+
+        Returns:
+            shard_results (list): ShardResult of every shard or None when main database
+            should be used"""
+
+        arguments = self.database.parsed_arguments
+        if not arguments.shards:
+            return None
+        # pylint: disable=import-outside-toplevel
+        from shard_scanner import ShardScanner, find_shard_paths
+        scanner = ShardScanner(find_shard_paths(arguments.shards),
+                               workers=arguments.shard_workers,
+                               use_processes=arguments.shard_processes)
+        start_time = time.perf_counter()
+        shard_results = scanner.scan()
+        ShardScanner.print_timings(shard_results)
+        print(f"Shards scanned: {len(shard_results)} in "
+              f"{time.perf_counter() - start_time:.3f} s")
+        return shard_results
+
+    def create_rate_limiter(self):
+        """Returns limiter of sent emails configured with quota flags
+
+        Returns:
+            rate_limiter (RateLimiter): limiter or None when no quota was provided or in
+            dry run"""
+
+        arguments = self.database.parsed_arguments
+        if arguments.dry_run or (not arguments.max_per_minute and not arguments.max_per_day):
+            return None
+        # pylint: disable=import-outside-toplevel
+        from rate_limiter import RateLimiter
+        return RateLimiter(per_minute=arguments.max_per_minute, per_day=arguments.max_per_day,
+                           sent_today=self.database.get_daily_sent_messages())
+
+    def save_sent_messages(self, rate_limiter):
+        """Adds messages sent through limiter since previous saving to count of today, so
+        per-day quota is kept by next runs
+
+        Arguments:
+            rate_limiter (RateLimiter): limiter of finished sending or None"""
+
+        if rate_limiter is not None:
+            self.database.add_daily_sent_messages(rate_limiter.take_unsaved_messages())
+
+    @staticmethod
+    def print_rate_metrics(metrics):
+        """Prints sending statistics collected by rate limiter
+
+        Arguments:
+            metrics (dict): statistics returned by RateLimiter.get_metrics"""
+
+        print(f"Send rate: {metrics['send_rate_per_second']:.2f} emails/s, "
+              f"backlog: {metrics['backlog']}, "
+              f"throttle events: {metrics['throttle_events']}, "
+              f"waited: {metrics['waited_seconds']:.1f} s")
+
+    def send_digest_reminders(self):
+        """Sends reminders grouped into one email per responsible person"""
+
+        self.send_email_reminders(digest=True)
+
+    def send_pending_reminders(self):
+        """Sends reminders left in outbox by previous, interrupted runs"""
+
+        self.send_email_reminders(enqueue=False)
+
+    @staticmethod
+    def print_dispatch_results(results):
+        """Prints summary of sent reminders with list of the ones what failed
+
+        Arguments:
+            results (list): DispatchResult of every sent message"""
+
+        failed_results = [result for result in results if not result.success]
+        print(f"Reminders sent: {len(results) - len(failed_results)}, "
+              f"failed: {len(failed_results)}")
+        for result in failed_results:
+            print(f"Not sent to {result.mail_to} after {result.attempts} attempts: "
+                  f"{result.error}")
 
     def select_menu_options(self):
         """Creates option path of program functions and allows user to decide which ones
@@ -0,0 +1,162 @@
+"""Contains rate limiting of sent emails matching quotas of email provider"""
+import threading
+import time
+
+THROTTLING_SMTP_CODES = (421, 450, 451, 452, 454)
+
+
+class TokenBucket():
+    """Represents bucket refilled with tokens at constant rate up to its capacity.
+    Every sent message takes one token"""
+
+    def __init__(self, capacity, refill_period, clock=time.monotonic):
+        """Initiates full bucket
+
+        Arguments:
+            capacity (float): maximal number of tokens
+            refill_period (float): seconds in which empty bucket becomes full
+            clock (callable): returns current time in seconds"""
+
+        self.capacity = capacity
+        self.refill_rate = capacity / refill_period
+        self.tokens = capacity
+        self.clock = clock
+        self.updated_at = clock()
+
+    def refill(self, rate_factor=1.0):
+        """Adds tokens collected since last refill
+
+        Arguments:
+            rate_factor (float): part of nominal refill rate currently allowed"""
+
+        now = self.clock()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated_at) * self.refill_rate * rate_factor)
+        self.updated_at = now
+
+    def get_wait_time(self, rate_factor=1.0):
+        """Returns seconds to wait until one token is available
+
+        Arguments:
+            rate_factor (float): part of nominal refill rate currently allowed
+
+        Returns:
+            wait_time (float): 0 when token is available now"""
+
+        self.refill(rate_factor)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / (self.refill_rate * rate_factor)
+
+
+class RateLimiter():
+    """Limits sending to per-minute and per-day quotas. When server answers with temporary
+    failure, allowed rate is halved and sending is paused, then rate is restored step by step
+    with every successful send. Per-day bucket starts without messages already sent today
+    by previous runs"""
+
+    def __init__(self, per_minute=None, per_day=None, backoff_seconds=30.0, min_rate_factor=0.1,
+                 recovery_step=0.05, clock=time.monotonic, sleep=time.sleep, sent_today=0):
+        """Initiates limiter
+
+        Arguments:
+            per_minute (int): maximal number of messages per minute, not limited when None
+            per_day (int): maximal number of messages per day, not limited when None
+            backoff_seconds (float): pause of sending after temporary failure
+            min_rate_factor (float): the lowest part of nominal rate throttling can reach
+            recovery_step (float): part of nominal rate restored after successful send
+            clock (callable): returns current time in seconds
+            sleep (callable): waits given number of seconds
+            sent_today (int): number of messages sent today before limiter was created"""
+
+        self.buckets = []
+        if per_minute:
+            self.buckets.append(TokenBucket(per_minute, 60, clock))
+        if per_day:
+            day_bucket = TokenBucket(per_day, 86400, clock)
+            day_bucket.tokens = max(0, per_day - sent_today)
+            self.buckets.append(day_bucket)
+        self.backoff_seconds = backoff_seconds
+        self.min_rate_factor = min_rate_factor
+        self.recovery_step = recovery_step
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.rate_factor = 1.0
+        self.paused_until = clock()
+        self.started_at = clock()
+        self.sent_messages = 0
+        self.unsaved_messages = 0
+        self.throttle_events = 0
+        self.waited_seconds = 0.0
+        self.backlog = 0
+
+    def acquire(self):
+        """Waits until sending one message fits into quotas and takes its tokens"""
+
+        while True:
+            with self.lock:
+                wait_time = max([self.paused_until - self.clock()] +
+                                [bucket.get_wait_time(self.rate_factor)
+                                 for bucket in self.buckets])
+                if wait_time <= 0:
+                    for bucket in self.buckets:
+                        bucket.tokens -= 1
+                    return
+                self.waited_seconds += wait_time
+            self.sleep(wait_time)
+
+    def on_success(self):
+        """Counts sent message and restores part of throttled rate"""
+
+        with self.lock:
+            self.sent_messages += 1
+            self.unsaved_messages += 1
+            self.rate_factor = min(1.0, self.rate_factor + self.recovery_step)
+
+    def on_throttled(self):
+        """Halves allowed rate and pauses sending after server asked to slow down"""
+
+        with self.lock:
+            self.throttle_events += 1
+            self.rate_factor = max(self.min_rate_factor, self.rate_factor / 2)
+            self.paused_until = max(self.paused_until, self.clock() + self.backoff_seconds)
+
+    def take_unsaved_messages(self):
+        """Returns number of messages sent since previous call, so they can be added to
+        count of messages sent today saved in database
+
+        Returns:
+            unsaved_messages (int): number of messages sent since previous call"""
+
+        with self.lock:
+            unsaved_messages = self.unsaved_messages
+            self.unsaved_messages = 0
+            return unsaved_messages
+
+    def change_backlog(self, change):
+        """Updates number of messages waiting for sending
+
+        Arguments:
+            change (int): number of added messages, negative for finished ones"""
+
+        with self.lock:
+            self.backlog += change
+
+    def get_metrics(self):
+        """Returns current sending statistics
+
+        Returns:
+            metrics (dict): sent messages, average send rate, backlog, throttle events,
+            current part of nominal rate and total waiting time"""
+
+        with self.lock:
+            elapsed_time = self.clock() - self.started_at
+            return {
+                "sent_messages": self.sent_messages,
+                "send_rate_per_second": self.sent_messages / elapsed_time if elapsed_time else 0,
+                "backlog": self.backlog,
+                "throttle_events": self.throttle_events,
+                "rate_factor": self.rate_factor,
+                "waited_seconds": self.waited_seconds,
+            }
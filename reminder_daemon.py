@@ -0,0 +1,85 @@
+"""Contains functionalities to send reminders periodically without interaction"""
+import datetime
+import time
+from mail_dispatcher import MailDispatcher, SmtpConnectionPool
+
+
+class ReminderDaemon():
+    """Sends reminders only about due materials what were not notified yet. Sent reminders
+    are saved in notification ledger, so no material is notified twice for the same review
+    date"""
+
+    def __init__(self, database, email, messages_factory, admin_password,
+                 smtp_connections=4, days_interval=3, rate_limiter=None, suppressor=None):
+        """Initiates daemon
+
+        Arguments:
+            database (Database): connected database of raw materials
+            email (Email): administrator's email account
+            messages_factory (callable): creates list of messages from list of materials
+            admin_password (str): administrator's email account password
+            smtp_connections (int): number of connections used to send reminders at once
+            days_interval (int): number of days what added to last review date indicates
+            new date when material should be reviewed
+            rate_limiter (RateLimiter): limiter of sending shared by all runs, its sent
+            messages are added to count of the day after every run
+            suppressor (ReminderSuppressor): drops materials reminded about recently by any
+            way of sending and saves sent ones, only ledger is checked when None"""
+
+        self.database = database
+        self.email = email
+        self.messages_factory = messages_factory
+        self.admin_password = admin_password
+        self.smtp_connections = smtp_connections
+        self.days_interval = days_interval
+        self.rate_limiter = rate_limiter
+        self.suppressor = suppressor
+
+    def run_once(self):
+        """Sends reminders about due materials not notified yet. Only sent reminders are
+        saved in ledger, so failed ones are tried again in next run
+
+        Returns:
+            results (list): DispatchResult of every sent message"""
+
+        review_cutoff_date = datetime.date.today() - datetime.timedelta(days=self.days_interval)
+        materials = list(self.database.iter_materials_to_notify(review_cutoff_date))
+        if self.suppressor is not None:
+            self.suppressor.evict()
+            materials = self.suppressor.filter(materials)
+        if not materials:
+            return []
+        messages = [(material.responsible_employee, message) for material, message
+                    in zip(materials, self.messages_factory(materials))]
+        with SmtpConnectionPool(lambda: self.email.open_connection(self.admin_password),
+                                size=self.smtp_connections) as pool:
+            dispatcher = MailDispatcher(pool, sender=self.email.admin_email,
+                                        rate_limiter=self.rate_limiter)
+            try:
+                results = dispatcher.dispatch(messages)
+            finally:
+                if self.rate_limiter is not None:
+                    self.database.add_daily_sent_messages(
+                        self.rate_limiter.take_unsaved_messages())
+        sent_materials = [material for material, result in zip(materials, results)
+                          if result.success]
+        self.database.record_notifications(sent_materials)
+        if self.suppressor is not None:
+            self.suppressor.mark_sent(sent_materials)
+        return results
+
+    def run_forever(self, interval_minutes=60):
+        """Runs reminder sending periodically until program is interrupted
+
+        Arguments:
+            interval_minutes (float): minutes between subsequent runs"""
+
+        try:
+            while True:
+                results = self.run_once()
+                failed_results = [result for result in results if not result.success]
+                print(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} reminders sent: "
+                      f"{len(results) - len(failed_results)}, failed: {len(failed_results)}")
+                time.sleep(interval_minutes * 60)
+        except KeyboardInterrupt:
+            print("Reminder daemon stopped")
@@ -0,0 +1,99 @@
+"""Contains coalescing of reminders, what drops reminders already sent to the same person
+about the same material and review date within suppression window"""
+import datetime
+import hashlib
+from instrumentation import INSTRUMENTATION
+
+
+class ReminderSuppressor():
+    """Keeps hashes of (recipient, sku code, review date) keys of sent reminders in database.
+    Keys older than suppression window are evicted, so the table keeps only recent ones"""
+
+    def __init__(self, database, window_days=7, query_size=500):
+        """Initiates suppressor
+
+        Arguments:
+            database (Database): connected database with sent reminders table
+            window_days (float): days after sending when the same reminder is dropped
+            query_size (int): number of keys checked by single query"""
+
+        self.database = database
+        self.window = datetime.timedelta(days=window_days)
+        self.query_size = query_size
+
+    @staticmethod
+    def make_key(material, tag=None):
+        """Returns hash identifying reminder about material
+
+        Arguments:
+            material (Material): material reminder is sent about
+            tag (str): kind of reminder used instead of review date, e.g. for reorder
+            reminders, review date is used when not provided
+
+        Returns:
+            key_hash (bytes): 16 bytes hash of recipient, sku code and review date or tag"""
+
+        key = f"{str(material.responsible_employee).strip().lower()}\x1f" \
+              f"{material.sku_id}\x1f{material.last_review_date if tag is None else tag}"
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+    def evict(self):
+        """Deletes keys of reminders sent before suppression window
+
+        Returns:
+            evicted_keys (int): number of deleted keys"""
+
+        with self.database.transaction():
+            cursor = self.database.connection.cursor()
+            cursor.execute("DELETE FROM sent_reminders WHERE sent_at < ?",
+                           (datetime.datetime.now() - self.window,))
+            return cursor.rowcount
+
+    def filter(self, items, key=None, tag=None):
+        """Returns items what reminders were not sent within suppression window.
+        Repeated items of the same recipient, sku code and review date, e.g. from
+        different shards, are coalesced into the first one. Uses separate cursor, so
+        it can be called while other statement is executed
+
+        Arguments:
+            items (list): materials reminders are created for or items containing them
+            key (callable): returns material of item, items are materials when not provided
+            tag (str): kind of reminder used instead of review date in keys
+
+        Returns:
+            items (list): items what reminders should be sent"""
+
+        keys = [self.make_key(item if key is None else key(item), tag) for item in items]
+        unique_keys = list(set(keys))
+        window_start = datetime.datetime.now() - self.window
+        seen_keys = set()
+        cursor = self.database.connection.cursor()
+        for start in range(0, len(unique_keys), self.query_size):
+            checked_keys = unique_keys[start:start + self.query_size]
+            cursor.execute(f"SELECT key_hash FROM sent_reminders WHERE key_hash IN "
+                           f"({', '.join('?' * len(checked_keys))}) AND sent_at >= ?",
+                           (*checked_keys, window_start))
+            seen_keys.update(row[0] for row in cursor.fetchall())
+        cursor.close()
+        kept_items = []
+        for key_hash, item in zip(keys, items):
+            if key_hash not in seen_keys:
+                seen_keys.add(key_hash)
+                kept_items.append(item)
+        INSTRUMENTATION.count("suppression.dropped_reminders", len(items) - len(kept_items))
+        return kept_items
+
+    def mark_sent(self, materials, tag=None):
+        """Saves keys of reminders about provided materials as sent now
+
+        Arguments:
+            materials (iterable): materials what reminders were sent or queued for
+            tag (str): kind of reminder used instead of review date in keys"""
+
+        sent_at = datetime.datetime.now()
+        with self.database.transaction():
+            cursor = self.database.connection.cursor()
+            cursor.executemany("INSERT OR REPLACE INTO sent_reminders(key_hash, sent_at)"
+                               " VALUES (?, ?)",
+                               ((self.make_key(material, tag), sent_at)
+                                for material in materials))
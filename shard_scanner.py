@@ -0,0 +1,157 @@
+"""Contains scanning of many plant databases (shards) for materials to be reviewed, so their
+reminders are sent by one reminder pipeline"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import groupby
+from operator import attrgetter
+import os
+import sqlite3
+import time
+from database_manager import Database
+from instrumentation import INSTRUMENTATION
+
+ShardResult = namedtuple("ShardResult", "shard path materials seconds error")
+
+
+def find_shard_paths(locations):
+    """Expands provided locations into list of shard database files. Directory is replaced
+    by all *.db files it contains
+
+    Arguments:
+        locations (list): paths of database files or directories with them
+
+    Returns:
+        paths (list): paths of shard database files"""
+
+    paths = []
+    for location in locations:
+        if os.path.isdir(location):
+            paths.extend(sorted(os.path.join(location, name) for name in os.listdir(location)
+                                if name.endswith(".db")))
+        else:
+            paths.append(location)
+    return paths
+
+
+def get_shard_name(path):
+    """Returns name of shard used in reminder keys and reports
+
+    Arguments:
+        path (str): path of shard database file
+
+    Returns:
+        name (str): file name without extension"""
+
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def scan_shard(path, days_interval=3):
+    """Reads materials to be reviewed from single shard. Shard is opened read-only and is
+    not migrated, so scanning never changes databases of other plants. Defined on module
+    level, so it can be run by worker process
+
+    Arguments:
+        path (str): path of shard database file
+        days_interval (int): number of days what added to last review date indicates
+        new date when material should be reviewed
+
+    Returns:
+        result (ShardResult): materials of shard with time of scanning or error"""
+
+    start_time = time.perf_counter()
+    shard = get_shard_name(path)
+    if not os.path.exists(path):
+        return ShardResult(shard, path, [], 0.0, "Database file does not exist")
+    database = Database(path, read_only=True)
+    try:
+        database.connect_database()
+        materials = database.get_materials_to_review(days_interval)
+    except sqlite3.Error as exception:
+        return ShardResult(shard, path, [], time.perf_counter() - start_time, str(exception))
+    finally:
+        if database.connection is not None:
+            database.disconnect_database()
+    return ShardResult(shard, path, materials, time.perf_counter() - start_time, None)
+
+
+class ShardScanner():
+    """Scans databases of many plants at once in pool of threads or processes and merges
+    their materials to be reviewed"""
+
+    def __init__(self, paths, workers=None, use_processes=False, days_interval=3):
+        """Initiates scanner
+
+        Arguments:
+            paths (list): paths of shard database files
+            workers (int): number of shards scanned at once, number of CPUs by default
+            use_processes (bool): scans shards in separate processes instead of threads
+            days_interval (int): number of days what added to last review date indicates
+            new date when material should be reviewed"""
+
+        self.paths = paths
+        self.workers = workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.days_interval = days_interval
+
+    def scan(self):
+        """Scans all shards. Shard what can not be read is reported with error and does not
+        stop scanning of other ones
+
+        Returns:
+            results (list): ShardResult of every shard in order of paths"""
+
+        if not self.paths:
+            return []
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with INSTRUMENTATION.span("shards.scan"):
+            with executor_class(max_workers=min(self.workers, len(self.paths))) as executor:
+                results = list(executor.map(scan_shard, self.paths,
+                                            [self.days_interval] * len(self.paths)))
+        for result in results:
+            INSTRUMENTATION.record("shards.scan_shard", result.seconds)
+            INSTRUMENTATION.count("shards.materials", len(result.materials))
+        return results
+
+    @staticmethod
+    def iter_materials(results):
+        """Merges materials of all shards
+
+        Arguments:
+            results (list): ShardResult of every shard
+
+        Returns:
+            materials (generator): pairs of shard name and its Material"""
+
+        for result in results:
+            for material in result.materials:
+                yield result.shard, material
+
+    @staticmethod
+    def iter_materials_by_employee(results):
+        """Merges materials of all shards grouped by person responsible for them
+
+        Arguments:
+            results (list): ShardResult of every shard
+
+        Returns:
+            groups (generator): pairs of employee email and list of their materials"""
+
+        materials = sorted((material for result in results for material in result.materials),
+                           key=attrgetter("responsible_employee"))
+        for employee_email, employee_materials in groupby(
+                materials, key=attrgetter("responsible_employee")):
+            yield employee_email, list(employee_materials)
+
+    @staticmethod
+    def print_timings(results):
+        """Prints number of found materials and scanning time of every shard
+
+        Arguments:
+            results (list): ShardResult of every shard"""
+
+        for result in results:
+            if result.error is None:
+                print(f"Shard {result.shard}: {len(result.materials)} materials to review "
+                      f"in {result.seconds:.3f} s")
+            else:
+                print(f"Shard {result.shard} not scanned: {result.error}")
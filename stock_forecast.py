@@ -0,0 +1,113 @@
+"""Contains forecasting of materials consumption from history of their stock levels, used
+to remind about materials what will soon fall below reorder point"""
+from collections import namedtuple
+import datetime
+from database_manager import MATERIAL_COLUMNS, Material
+from instrumentation import INSTRUMENTATION
+
+LAST_HISTORY_ID_STATE = "forecast_last_history_id"
+
+ReorderForecast = namedtuple("ReorderForecast", "material consumption_kg_per_day days_of_cover")
+
+
+def make_reorder_forecast(row):
+    """Converts fetched row of material columns followed by forecast columns
+
+    Arguments:
+        row (tuple): fetched values
+
+    Returns:
+        forecast (ReorderForecast): material with its consumption forecast"""
+
+    return ReorderForecast(Material._make(row[:-2]), *row[-2:])
+
+
+class StockForecaster():
+    """Calculates daily consumption and days of cover of every material from stock levels
+    saved in stock history table. Only materials with history added since previous
+    calculation are recalculated"""
+
+    def __init__(self, database, window_days=30, lead_time_days=7, horizon_days=3):
+        """Initiates forecaster
+
+        Arguments:
+            database (Database): connected database with stock history table
+            window_days (int): number of recent days of history consumption is taken from
+            lead_time_days (float): days of delivery, reorder point is consumption of that time
+            horizon_days (float): days ahead stock is projected to before it is compared
+            with reorder point"""
+
+        self.database = database
+        self.window_days = window_days
+        self.lead_time_days = lead_time_days
+        self.horizon_days = horizon_days
+
+    @INSTRUMENTATION.timed("forecast.refresh")
+    def refresh(self):
+        """Recalculates forecasts of materials what stock history changed since previous
+        calculation. Consumption is sum of stock decreases inside window divided by days
+        the window history covers, deliveries are not counted. History older than window
+        is deleted, as it is never used again
+
+        Returns:
+            recalculated_materials (int): number of materials with new forecast"""
+
+        window_start = datetime.datetime.now() - datetime.timedelta(days=self.window_days)
+        with self.database.transaction() as cursor:
+            cursor.execute("DELETE FROM stock_history WHERE recorded_at < ?", (window_start,))
+            INSTRUMENTATION.count("forecast.pruned_history", cursor.rowcount)
+            cursor.execute("SELECT MAX(id) FROM stock_history")
+            last_history_id = cursor.fetchone()[0]
+            previous_history_id = int(self.database.get_reminder_state(
+                LAST_HISTORY_ID_STATE) or 0)
+            if last_history_id is None or last_history_id <= previous_history_id:
+                return 0
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS changed_skus "
+                           "(sku_id INTEGER PRIMARY KEY)")
+            cursor.execute("DELETE FROM changed_skus")
+            cursor.execute("INSERT INTO changed_skus SELECT DISTINCT sku_id FROM stock_history"
+                           " WHERE id > ? AND id <= ?",
+                           (previous_history_id, last_history_id))
+            cursor.execute("DELETE FROM stock_forecast"
+                           " WHERE sku_id IN (SELECT sku_id FROM changed_skus)")
+            cursor.execute("INSERT INTO stock_forecast(sku_id, consumption_kg_per_day,"
+                           " days_of_cover, computed_at)"
+                           " WITH steps AS (SELECT history.sku_id, history.recorded_at,"
+                           " LAG(history.stock_kg) OVER (PARTITION BY history.sku_id"
+                           " ORDER BY history.id) - history.stock_kg AS decrease"
+                           " FROM stock_history AS history JOIN changed_skus"
+                           " ON changed_skus.sku_id = history.sku_id"
+                           " WHERE history.id <= ? AND history.recorded_at >= ?),"
+                           " rates AS (SELECT sku_id, TOTAL(MAX(decrease, 0)) / MAX("
+                           "julianday(MAX(recorded_at)) - julianday(MIN(recorded_at)), 1)"
+                           " AS consumption_kg_per_day FROM steps GROUP BY sku_id)"
+                           " SELECT rates.sku_id, consumption_kg_per_day,"
+                           " CASE WHEN consumption_kg_per_day > 0"
+                           " THEN material.current_stock_kg / consumption_kg_per_day END, ?"
+                           " FROM rates JOIN raw_materials_stock AS material"
+                           " ON material.sku_id = rates.sku_id",
+                           (last_history_id, window_start, datetime.datetime.now()))
+            recalculated_materials = cursor.rowcount
+            self.database.set_reminder_state(LAST_HISTORY_ID_STATE, str(last_history_id))
+        INSTRUMENTATION.count("forecast.recalculated_materials", recalculated_materials)
+        return recalculated_materials
+
+    def iter_materials_to_reorder(self, batch_size=500):
+        """Streams materials what projected stock after horizon days is not greater
+        than their reorder point, the ones running out first are returned first
+
+        Arguments:
+            batch_size (int): number of rows fetched from database at once
+
+        Returns:
+            forecasts (generator): ReorderForecast of every material to be reordered"""
+
+        material_columns = ", ".join(f"material.{column}"
+                                     for column in MATERIAL_COLUMNS.split(", "))
+        return self.database.iter_rows(
+            f"SELECT {material_columns}, forecast.consumption_kg_per_day,"
+            " forecast.days_of_cover FROM stock_forecast AS forecast"
+            " JOIN raw_materials_stock AS material ON material.sku_id = forecast.sku_id"
+            " WHERE forecast.days_of_cover <= ? ORDER BY forecast.days_of_cover",
+            (self.lead_time_days + self.horizon_days,), batch_size,
+            make_row=make_reorder_forecast)
@@ -0,0 +1,143 @@
+"""Contains reports of stock value and review backlog calculated by SQL aggregates, so large
+tables are summarized inside database without loading rows into Python"""
+from bisect import bisect_left
+from collections import namedtuple
+import datetime
+import json
+import time
+from instrumentation import INSTRUMENTATION
+
+OwnerSummary = namedtuple("OwnerSummary",
+                          "responsible_employee materials stock_value overdue_materials")
+AgeBucket = namedtuple("AgeBucket", "label materials")
+
+
+class StockReport():
+    """Calculates total and per person stock value, number of materials overdue for
+    review and histogram of days since last review"""
+
+    def __init__(self, database, days_interval=3, age_limits=(3, 7, 14, 30, 90)):
+        """Initiates report
+
+        Arguments:
+            database (Database): connected database of raw materials
+            days_interval (int): number of days what added to last review date indicates
+            new date when material should be reviewed
+            age_limits (tuple): growing upper limits of days since review of histogram
+            buckets, last bucket contains all older materials"""
+
+        self.database = database
+        self.days_interval = days_interval
+        self.age_limits = age_limits
+        self.timings = {}
+
+    def measure(self, name, query, parameters=()):
+        """Executes query and saves its time under provided name
+
+        Arguments:
+            name (str): name of report part
+            query (str): SELECT statement
+            parameters (tuple): values bound to query placeholders
+
+        Returns:
+            rows (list): all rows returned by query"""
+
+        start_time = time.perf_counter()
+        with INSTRUMENTATION.span(f"report.{name}"):
+            self.database.cursor.execute(query, parameters)
+            rows = self.database.cursor.fetchall()
+        self.timings[name] = time.perf_counter() - start_time
+        return rows
+
+    def get_owner_summaries(self):
+        """Returns number of materials, stock value and number of materials overdue for
+        review of every responsible person, the highest stock value first
+
+        Returns:
+            summaries (list): OwnerSummary of every person"""
+
+        review_cutoff_date = datetime.date.today() - datetime.timedelta(days=self.days_interval)
+        rows = self.measure("owners",
+                            "SELECT responsible_employee, COUNT(*),"
+                            " TOTAL(current_stock_kg * price),"
+                            " TOTAL(last_review_date <= ?) FROM raw_materials_stock"
+                            " GROUP BY responsible_employee ORDER BY 3 DESC",
+                            (review_cutoff_date,))
+        return [OwnerSummary(employee, materials, stock_value, int(overdue_materials))
+                for employee, materials, stock_value, overdue_materials in rows]
+
+    def get_age_histogram(self):
+        """Returns number of materials in every range of days since last review. Materials
+        are counted per review date using review date index, and only these counts are
+        divided into ranges. Materials without valid review date are counted as "unknown"
+
+        Returns:
+            histogram (list): AgeBucket of every range, empty ones included"""
+
+        labels = []
+        lower_limit = 0
+        for upper_limit in self.age_limits:
+            labels.append(f"{lower_limit}-{upper_limit}")
+            lower_limit = upper_limit + 1
+        labels.append(f">{self.age_limits[-1]}")
+        counts = [0] * len(labels)
+        unknown_materials = 0
+        rows = self.measure("age_histogram",
+                            "SELECT CAST(julianday(?) - julianday(last_review_date)"
+                            " AS INTEGER), COUNT(*) FROM raw_materials_stock"
+                            " GROUP BY last_review_date",
+                            (datetime.date.today(),))
+        for age, materials in rows:
+            if age is None:
+                unknown_materials += materials
+            else:
+                counts[bisect_left(self.age_limits, age)] += materials
+        histogram = [AgeBucket(label, count) for label, count in zip(labels, counts)]
+        if unknown_materials:
+            histogram.append(AgeBucket("unknown", unknown_materials))
+        return histogram
+
+    @INSTRUMENTATION.timed("report.create")
+    def create(self):
+        """Calculates complete report
+
+        Returns:
+            report (dict): totals, summaries of persons, age histogram and time of
+            calculating every part [s]"""
+
+        self.timings = {}
+        owner_summaries = self.get_owner_summaries()
+        age_histogram = self.get_age_histogram()
+        return {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "materials": sum(summary.materials for summary in owner_summaries),
+            "stock_value": sum(summary.stock_value for summary in owner_summaries),
+            "overdue_materials": sum(summary.overdue_materials for summary in owner_summaries),
+            "owners": [summary._asdict() for summary in owner_summaries],
+            "age_histogram": [bucket._asdict() for bucket in age_histogram],
+            "timings": dict(self.timings),
+        }
+
+    @staticmethod
+    def print_report(report, output_format="table"):
+        """Prints report as text tables or JSON
+
+        Arguments:
+            report (dict): report returned by create
+            output_format (str): "table" or "json" format of printed report"""
+
+        if output_format == "json":
+            print(json.dumps(report, indent=2))
+            return
+        print(f"Materials: {report['materials']}, stock value: {report['stock_value']:.2f}, "
+              f"overdue for review: {report['overdue_materials']}")
+        print(f"{'responsible_employee':<40}{'materials':>12}{'stock_value':>16}"
+              f"{'overdue':>10}")
+        for summary in report["owners"]:
+            print(f"{summary['responsible_employee']!s:<40}{summary['materials']:>12}"
+                  f"{summary['stock_value']:>16.2f}{summary['overdue_materials']:>10}")
+        print(f"{'days_since_review':<20}{'materials':>12}")
+        for bucket in report["age_histogram"]:
+            print(f"{bucket['label']:<20}{bucket['materials']:>12}")
+        print("Calculated in " + ", ".join(f"{name} {seconds:.3f} s"
+                                           for name, seconds in report["timings"].items()))
@@ -0,0 +1,106 @@
+"""Contains functionalities to print and export tables of raw materials in buffered chunks"""
+import csv
+from itertools import islice
+import json
+import sys
+
+
+class TableRenderer():
+    """Writes rows as fixed width text table, CSV or JSON Lines. Rows are formatted in
+    chunks and every chunk is written to stream at once"""
+
+    def __init__(self, headers, stream=None, chunk_size=1000, column_width=20):
+        """Initiates renderer
+
+        Arguments:
+            headers (list): names of written columns
+            stream (file): text stream rows are written to, standard output by default
+            chunk_size (int): number of rows formatted before single write
+            column_width (int): width of column in text table"""
+
+        self.headers = list(headers)
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.column_width = column_width
+        self.line_format = "".join(f"{{{index}!s:<{column_width}}} "
+                                   for index in range(len(self.headers))) + "\n"
+
+    def get_stream(self):
+        """Returns stream rows are written to. Standard output is looked up on every call,
+        so redirected output is respected
+
+        Returns:
+            stream (file): text stream"""
+
+        return self.stream if self.stream is not None else sys.stdout
+
+    def iter_chunks(self, rows):
+        """Splits rows into lists of chunk size
+
+        Arguments:
+            rows (iterable): table rows
+
+        Returns:
+            chunks (generator): lists of rows"""
+
+        rows = iter(rows)
+        chunk = list(islice(rows, self.chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(rows, self.chunk_size))
+
+    def format_line(self, values):
+        """Formats values as single line of text table
+
+        Arguments:
+            values (iterable): values of one row
+
+        Returns:
+            line (str): values aligned to column width with line end"""
+
+        return self.line_format.format(*values)
+
+    def render(self, rows):
+        """Writes rows as text table with headers line
+
+        Arguments:
+            rows (iterable): table rows"""
+
+        stream = self.get_stream()
+        stream.write(self.format_line(self.headers))
+        for chunk in self.iter_chunks(rows):
+            stream.write("".join(map(self.format_line, chunk)))
+        stream.flush()
+
+    def export_csv(self, rows):
+        """Writes rows as CSV with headers line
+
+        Arguments:
+            rows (iterable): table rows"""
+
+        writer = csv.writer(self.get_stream(), lineterminator="\n")
+        writer.writerow(self.headers)
+        for chunk in self.iter_chunks(rows):
+            writer.writerows(chunk)
+
+    def export_json_lines(self, rows):
+        """Writes every row as separate JSON object
+
+        Arguments:
+            rows (iterable): table rows"""
+
+        stream = self.get_stream()
+        for chunk in self.iter_chunks(rows):
+            stream.write("".join(json.dumps(dict(zip(self.headers, row)), default=str) + "\n"
+                                 for row in chunk))
+
+    def write(self, rows, output_format="table"):
+        """Writes rows in chosen format
+
+        Arguments:
+            rows (iterable): table rows
+            output_format (str): table, csv or jsonl"""
+
+        writers = {"table": self.render, "csv": self.export_csv,
+                   "jsonl": self.export_json_lines}
+        writers[output_format](rows)
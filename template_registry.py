@@ -0,0 +1,153 @@
+"""Contains registry of named email templates loaded from files and cached between uses"""
+from collections import namedtuple
+from html import escape
+import os
+from string import Template
+
+TEMPLATES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+TEMPLATE_FILES = {"subject": "subject.txt", "text": "body.txt", "html": "body.html"}
+
+CompiledTemplate = namedtuple("CompiledTemplate", "subject, text, html, modification_times")
+RenderedMessage = namedtuple("RenderedMessage", "subject, text, html")
+
+
+class HtmlMarkup(str):
+    """Text already formatted as HTML, inserted into html body without escaping"""
+
+
+class TemplateRegistry():
+    """Loads templates from directories named after them. Every directory contains
+    subject.txt, body.txt and optionally body.html with $placeholders, unless other template
+    engine is provided. Templates are compiled once and loaded again only when any of their files is modified. Values inserted into
+    html body are escaped, unless they are HtmlMarkup"""
+
+    def __init__(self, directory=TEMPLATES_DIRECTORY, compile_template=Template):
+        """Initiates registry
+
+        Arguments:
+            directory (str): directory containing templates directories
+            compile_template (callable): compiles content of template file into object
+            with substitute method taking dict of values, string.Template by default"""
+
+        self.directory = directory
+        self.compile_template = compile_template
+        self.cache = {}
+
+    def get_template_paths(self, name):
+        """Returns paths of files of named template
+
+        Arguments:
+            name (str): name of template
+
+        Returns:
+            paths (dict): template part name mapped to file path"""
+
+        return {part: os.path.join(self.directory, name, file_name)
+                for part, file_name in TEMPLATE_FILES.items()}
+
+    @staticmethod
+    def get_modification_times(paths):
+        """Returns modification times of template files, None for not existing ones
+
+        Arguments:
+            paths (dict): template part name mapped to file path
+
+        Returns:
+            modification_times (tuple): modification time of every file"""
+
+        modification_times = []
+        for path in paths.values():
+            try:
+                modification_times.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                modification_times.append(None)
+        return tuple(modification_times)
+
+    def load(self, name, paths, modification_times):
+        """Reads and compiles template files
+
+        Arguments:
+            name (str): name of template
+            paths (dict): template part name mapped to file path
+            modification_times (tuple): modification time of every file
+
+        Returns:
+            template (CompiledTemplate): compiled template"""
+
+        parts = {}
+        for part, path in paths.items():
+            if not os.path.exists(path):
+                if part != "html":
+                    raise FileNotFoundError(f"Template {name} has no file {path}")
+                parts[part] = None
+                continue
+            with open(path, encoding="utf-8") as file:
+                content = file.read()
+            if part != "html":
+                content = content.rstrip("\n")
+            parts[part] = self.compile_template(content)
+        return CompiledTemplate(parts["subject"], parts["text"], parts["html"],
+                                modification_times)
+
+    def get(self, name):
+        """Returns compiled template from cache, loading it again if files were changed
+
+        Arguments:
+            name (str): name of template
+
+        Returns:
+            template (CompiledTemplate): compiled template"""
+
+        paths = self.get_template_paths(name)
+        modification_times = self.get_modification_times(paths)
+        template = self.cache.get(name)
+        if template is None or template.modification_times != modification_times:
+            template = self.load(name, paths, modification_times)
+            self.cache[name] = template
+        return template
+
+    @staticmethod
+    def substitute(template, values):
+        """Fills compiled template with values, escaped in html body
+
+        Arguments:
+            template (CompiledTemplate): compiled template
+            values (dict): placeholder name mapped to its value
+
+        Returns:
+            message (RenderedMessage): filled subject, text and html body"""
+
+        html = None
+        if template.html is not None:
+            html = template.html.substitute({
+                name: value if isinstance(value, HtmlMarkup) else escape(str(value))
+                for name, value in values.items()})
+        return RenderedMessage(template.subject.substitute(values),
+                               template.text.substitute(values), html)
+
+    def render(self, name, **values):
+        """Fills named template with values
+
+        Arguments:
+            name (str): name of template
+            values: placeholder values
+
+        Returns:
+            message (RenderedMessage): filled subject, text and html body"""
+
+        return self.substitute(self.get(name), values)
+
+    def render_many(self, name, values_list):
+        """Fills named template with many sets of values. Template is looked up once,
+        so only substitution is done for every message
+
+        Arguments:
+            name (str): name of template
+            values_list (iterable): dicts with placeholder values of every message
+
+        Returns:
+            messages (generator): RenderedMessage for every set of values"""
+
+        template = self.get(name)
+        for values in values_list:
+            yield self.substitute(template, values)
@@ -0,0 +1,74 @@
+"""Contains tests for asyncio reminder pipeline module"""
+import datetime
+from freezegun import freeze_time
+import pytest
+from async_pipeline import AsyncReminderPipeline
+from mail_dispatcher import DispatchResult, MailDispatcher, SmtpConnectionPool
+from program import Program
+from tests.fake_smtp_server import FakeSmtpServer
+from tests.helpers import connect_to, create_test_database
+
+
+def test_pipeline_sends_due_materials_once_through_bounded_queue():
+    """Checks if every due material is sent when queue is smaller than number of
+    reminders and already notified materials are not sent again"""
+
+    # GIVEN
+    test_database = create_test_database()
+    with FakeSmtpServer() as server:
+        server.responses = [None, "550 No such user"]
+        with SmtpConnectionPool(connect_to(server), size=2) as pool:
+            dispatcher = MailDispatcher(pool, sender="autoadmfactor@gmail.com",
+                                        max_attempts=1)
+            test_pipeline = AsyncReminderPipeline(test_database, dispatcher,
+                                                  Program().build_reminder_messages,
+                                                  queue_size=1, batch_size=2)
+            # WHEN
+            with freeze_time(datetime.date(2022, 4, 22)):
+                first_results = test_pipeline.run()
+                second_results = test_pipeline.run()
+        # THEN
+        assert len(server.messages) == 3
+    assert sorted(result.success for result in first_results) == [False, True, True]
+    assert [result.success for result in second_results] == [True]
+    test_database.cursor.execute("SELECT COUNT(*) FROM notification_ledger")
+    assert test_database.cursor.fetchone()[0] == 3
+
+
+class FailingDispatcher():
+    """Stands in for dispatcher what sends provided number of messages and then fails"""
+
+    def __init__(self, successful_sends):
+        """Initiates dispatcher with single connection"""
+
+        self.pool = SmtpConnectionPool(lambda: None, size=1)
+        self.rate_limiter = None
+        self.successful_sends = successful_sends
+
+    def send_one(self, mail_to, message):
+        """Returns successful result or raises error when all sends were used"""
+
+        if not self.successful_sends:
+            raise RuntimeError("Connection lost")
+        self.successful_sends -= 1
+        return DispatchResult(mail_to, True, 1, None)
+
+
+def test_pipeline_records_messages_sent_before_failure():
+    """Checks if materials sent before sending task failed are saved in ledger, so next
+    run sends only the remaining ones"""
+
+    # GIVEN
+    test_database = create_test_database()
+    # WHEN
+    with freeze_time(datetime.date(2022, 4, 22)):
+        with pytest.raises(RuntimeError):
+            AsyncReminderPipeline(test_database, FailingDispatcher(2),
+                                  lambda materials: ["message"] * len(materials)).run()
+        next_results = AsyncReminderPipeline(test_database, FailingDispatcher(5),
+                                             lambda materials: ["message"] * len(materials)
+                                             ).run()
+    # THEN
+    test_database.cursor.execute("SELECT COUNT(*) FROM notification_ledger")
+    assert test_database.cursor.fetchone()[0] == 3
+    assert len(next_results) == 1
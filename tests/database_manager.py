@@ -4,7 +4,8 @@ import datetime
 import sqlite3
 from freezegun import freeze_time
 import pytest
-from database_manager import Database
+from database_manager import Database, Material, SCHEMA_MIGRATIONS
+from exceptions.database_manager_exceptions import DuplicatedSKUs
 
 
 def test_check_data_base_existence_positive():
@@ -90,6 +91,25 @@ def test_add_sample_raw_materials_stocks():
         assert rows_from_database == expected_table_content
 
 
+def test_add_sample_raw_materials_stocks_twice(capsys):
+    """Checks if adding samples to database already containing them keeps table unchanged
+    instead of failing"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+        # WHEN
+        test_database.add_sample_raw_materials_stocks()
+        test_database.cursor.execute("SELECT COUNT(*) FROM raw_materials_stock")
+        rows_number = test_database.cursor.fetchone()[0]
+    # THEN
+    assert rows_number == 4
+    assert capsys.readouterr().out.splitlines()[-1] == "Sample materials are already added"
+
+
 def test_get_all_materials():
     """Checks if method returns from database table all rows in correct form"""
 
@@ -261,3 +281,229 @@ def test_change_current_stock_sku_ok_qty_expected_result_wrong():
         test_database.change_current_stock()
         # THEN
         assert test_database.get_all_materials() != wrongly_expected_materials_return
+
+
+def test_migrate_database_creates_review_date_index():
+    """Checks if migration of database created by older program version adds index
+    on review date column and saves current schema version"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.cursor.execute("CREATE TABLE raw_materials_stock (id INTEGER PRIMARY KEY "
+                                     "AUTOINCREMENT, sku_description TEXT, sku_id INTEGER,"
+                                     " current_stock_kg NUMERIC, price NUMERIC,"
+                                     " last_review_date DATE, responsible_employee TEXT)")
+        # WHEN
+        test_database.migrate_database()
+        test_database.cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        indexes = [row[0] for row in test_database.cursor.fetchall()]
+        # THEN
+        assert "idx_raw_materials_last_review_date" in indexes
+        assert test_database.get_schema_version() == len(SCHEMA_MIGRATIONS)
+
+
+def test_iter_materials_small_batches():
+    """Checks if streamed materials fetched in batches smaller than table size are
+    returned completely, in table order and as Material objects"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    expected_materials = [
+        (1, '22REW', 345721, 1000, 7.89, '2022-04-19', 'autoadmfactor@gmail.com'),
+        (2, '32REW', 345718, 2000, 4.2, '2022-04-18', 'adampolakfactor@gmail.com'),
+        (3, 'BYSE', 345719, 10000, 3, '2022-04-17', 'autoadmfactor@gmail.com'),
+        (4, 'OILB', 345729, 1740, 11.4, '2022-04-20', 'adampolakfactor@gmail.com')]
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+    # WHEN
+    materials = list(test_database.iter_materials(batch_size=3))
+    # THEN
+    assert materials == expected_materials
+    assert all(isinstance(material, Material) for material in materials)
+    assert materials[2].sku_description == "BYSE"
+
+
+@freeze_time(datetime.date(2022, 4, 21))
+def test_iter_materials_to_review_by_employee():
+    """Checks if materials what should be reviewed are grouped by responsible person"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    expected_groups = [
+        ('adampolakfactor@gmail.com', [
+            (2, '32REW', 345718, 2000, 4.2, '2022-04-18', 'adampolakfactor@gmail.com')]),
+        ('autoadmfactor@gmail.com', [
+            (1, '22REW', 345721, 1000, 7.89, '2022-04-19', 'autoadmfactor@gmail.com'),
+            (3, 'BYSE', 345719, 10000, 3, '2022-04-17', 'autoadmfactor@gmail.com')])]
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+    # WHEN
+    groups = list(test_database.iter_materials_to_review_by_employee(days_interval=2))
+    # THEN
+    assert groups == expected_groups
+
+
+@freeze_time(datetime.date(2022, 4, 21))
+def test_update_stocks_many_materials():
+    """Checks if stock levels of many materials are changed at once with current review
+    date and not existing SKU is skipped"""
+
+    # GIVEN
+    expected_materials_return = [
+        (1, '22REW', 345721, 300, 7.89, '2022-04-21', 'autoadmfactor@gmail.com'),
+        (2, '32REW', 345718, 2000, 4.2, '2022-04-18', 'adampolakfactor@gmail.com'),
+        (3, 'BYSE', 345719, 0, 3, '2022-04-21', 'autoadmfactor@gmail.com'),
+        (4, 'OILB', 345729, 1740, 11.4, '2022-04-20', 'adampolakfactor@gmail.com')]
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+        # WHEN
+        updated_rows = test_database.update_stocks([(345721, 300), (345719, 0), (999999, 5)])
+        # THEN
+        assert updated_rows == 2
+        assert test_database.material_exists(345721) is True
+        assert test_database.material_exists(999999) is False
+    assert test_database.get_all_materials() == expected_materials_return
+
+
+def test_connect_database_sets_pragmas(tmp_path):
+    """Checks if connection is opened once and configured with default and
+    overridden PRAGMA values"""
+
+    # GIVEN
+    test_database = Database(str(tmp_path / "test_pragmas.db"), pragmas={"cache_size": -2000})
+    # WHEN
+    test_database.connect_database()
+    connection = test_database.connection
+    test_database.connect_database()
+    # THEN
+    assert test_database.connection is connection
+    assert test_database.cursor.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert test_database.cursor.execute("PRAGMA synchronous").fetchone()[0] == 1
+    assert test_database.cursor.execute("PRAGMA cache_size").fetchone()[0] == -2000
+    test_database.disconnect_database()
+
+
+def test_transaction_rolls_back_nested_changes():
+    """Checks if exception raised inside nested transaction block rolls back all
+    changes made by outer transaction"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    # WHEN
+    with pytest.raises(ValueError):
+        with test_database.transaction():
+            test_database.add_sample_raw_materials_stocks()
+            with test_database.transaction():
+                raise ValueError("Import failed")
+    # THEN
+    assert test_database.get_all_materials() == []
+    assert test_database.transaction_depth == 0
+
+
+def test_export_data_page_of_chosen_columns(capsys):
+    """Checks if only chosen columns of requested page of table are exported"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    test_database.add_sample_raw_materials_stocks()
+    capsys.readouterr()
+    # WHEN
+    test_database.export_data("csv", columns=["sku_id", "price"], limit=2, offset=1)
+    # THEN
+    assert capsys.readouterr().out == "sku_id,price\n345718,4.2\n345719,3\n"
+
+
+def test_migrate_database_normalizes_review_dates():
+    """Checks if migration rewrites review dates saved with time into ISO dates, which
+    are then read as date objects"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    test_database.cursor.execute("INSERT INTO raw_materials_stock(sku_description, sku_id, "
+                                 "current_stock_kg, price, last_review_date, "
+                                 "responsible_employee) VALUES ('22REW', 345721, 1000, 7.89, "
+                                 "'2022-04-19 10:15:00', 'autoadmfactor@gmail.com')")
+    test_database.cursor.execute("PRAGMA user_version = 4")
+    # WHEN
+    test_database.migrate_database()
+    materials = test_database.get_all_materials()
+    # THEN
+    assert materials[0].last_review_date == datetime.date(2022, 4, 19)
+    assert test_database.get_schema_version() == len(SCHEMA_MIGRATIONS)
+
+
+def test_migrate_database_reports_duplicated_skus():
+    """Checks if database of older program version with SKU saved twice is not upgraded
+    and duplicated SKU is reported"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.cursor.execute("CREATE TABLE raw_materials_stock (id INTEGER PRIMARY KEY "
+                                 "AUTOINCREMENT, sku_description TEXT, sku_id INTEGER,"
+                                 " current_stock_kg NUMERIC, price NUMERIC,"
+                                 " last_review_date DATE, responsible_employee TEXT)")
+    test_database.cursor.executemany("INSERT INTO raw_materials_stock(sku_description, sku_id)"
+                                     " VALUES (?, ?)",
+                                     [("22REW", 345721), ("BYSE", 345719), ("22REW", 345721)])
+    # WHEN
+    with pytest.raises(DuplicatedSKUs) as exception_info:
+        test_database.migrate_database()
+    # THEN
+    assert "345721" in str(exception_info.value)
+    assert "345719" not in str(exception_info.value)
+    assert test_database.get_schema_version() == 0
+
+
+def test_start_database_creates_missing_table(monkeypatch, tmp_path):
+    """Checks if database started from empty file, or reset when its file is missing,
+    gets raw materials table with current schema version"""
+
+    # GIVEN
+    empty_path = tmp_path / "empty.db"
+    empty_path.touch()
+    started_databases = []
+    for database_path, flags in [(empty_path, []), (tmp_path / "missing.db", ["--reset_db"])]:
+        test_database = Database(str(database_path))
+        monkeypatch.setattr("sys.argv", ["main.py", *flags])
+        test_database.define_parser_arguments()
+        # WHEN
+        test_database.start_database()
+        started_databases.append(test_database)
+    # THEN
+    for test_database in started_databases:
+        assert test_database.has_raw_materials_table()
+        assert test_database.get_schema_version() == len(SCHEMA_MIGRATIONS)
+        test_database.disconnect_database()
+
+
+def test_add_new_material_existing_sku(monkeypatch, capsys):
+    """Checks if adding material with existing SKU prints message instead of failing"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    test_database.add_sample_raw_materials_stocks()
+    input_values = ["22REW", "345721", "500", "7.89", "autoadmfactor@gmail.com"]
+    monkeypatch.setattr(builtins, "input", lambda input_text: input_values.pop(0))
+    # WHEN
+    test_database.add_new_material()
+    # THEN
+    assert "already exists" in capsys.readouterr().out
+    assert len(test_database.get_all_materials()) == 4
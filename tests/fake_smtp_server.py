@@ -0,0 +1,96 @@
+"""Contains minimal local SMTP server used as stand-in for real email server in tests"""
+import socketserver
+import threading
+
+
+class FakeSmtpHandler(socketserver.StreamRequestHandler):
+    """Handles single SMTP session accepting any login and storing received messages"""
+
+    def reply(self, line):
+        """Sends single response line to client"""
+
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        """Serves SMTP commands until client quits or server drops session"""
+
+        server = self.server
+        self.reply("220 localhost fake SMTP ready")
+        mail_to = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                mail_to = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                mail_to.append(command.split(":", 1)[1].strip("<> "))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data_lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    data_lines.append(data_line)
+                with server.lock:
+                    server.data_commands += 1
+                    response = server.responses.pop(0) if server.responses else None
+                if response == "disconnect":
+                    return
+                if response is not None:
+                    self.reply(response)
+                    continue
+                with server.lock:
+                    server.messages.append((mail_to, b"".join(data_lines)))
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    """Local SMTP server listening on free port of localhost. Responses to subsequent
+    DATA commands can be forced by filling responses list, e.g. with "421 Try later"
+    or "disconnect" what drops the session"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        """Initiates server on random free port"""
+
+        super().__init__(("127.0.0.1", 0), FakeSmtpHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.responses = []
+        self.data_commands = 0
+        self.thread = None
+
+    @property
+    def port(self):
+        """Port number server listens on"""
+
+        return self.server_address[1]
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
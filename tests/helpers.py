@@ -0,0 +1,24 @@
+"""Contains helpers shared by tests of many modules"""
+import smtplib
+from database_manager import Database
+
+
+def connect_to(server):
+    """Returns factory of logged in connections to provided fake server"""
+
+    def connection_factory():
+        connection = smtplib.SMTP(host="127.0.0.1", port=server.port, timeout=5)
+        connection.login(user="autoadmfactor@gmail.com", password="fake_pass")
+        return connection
+
+    return connection_factory
+
+
+def create_test_database():
+    """Returns new in-memory database with sample materials"""
+
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    test_database.add_sample_raw_materials_stocks()
+    return test_database
@@ -0,0 +1,47 @@
+"""Contains tests for instrumentation module"""
+from instrumentation import Instrumentation
+
+
+def test_timed_collects_spans_only_when_enabled():
+    """Checks if decorated function is measured only after instrumentation is enabled
+    and still returns its result"""
+
+    # GIVEN
+    instrumentation = Instrumentation()
+
+    @instrumentation.timed("test.add")
+    def add(first, second):
+        return first + second
+
+    # WHEN
+    disabled_result = add(1, 2)
+    instrumentation.count("test.rows", 5)
+    instrumentation.enable()
+    enabled_result = add(2, 2)
+    with instrumentation.span("test.block"):
+        instrumentation.count("test.rows", 3)
+    snapshot = instrumentation.get_snapshot()
+    # THEN
+    assert disabled_result == 3
+    assert enabled_result == 4
+    assert snapshot["spans"]["test.add"]["calls"] == 1
+    assert snapshot["spans"]["test.block"]["calls"] == 1
+    assert snapshot["counters"] == {"test.rows": 3}
+
+
+def test_format_prometheus():
+    """Checks if collected data is formatted as Prometheus metrics with labels"""
+
+    # GIVEN
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    instrumentation.record("database.query", 0.5)
+    instrumentation.record("database.query", 0.25)
+    instrumentation.count("database.rows", 10)
+    # WHEN
+    text = instrumentation.format_prometheus()
+    # THEN
+    assert 'goods_reminder_span_calls_total{span="database.query"} 2\n' in text
+    assert 'goods_reminder_span_seconds_total{span="database.query"} 0.750000\n' in text
+    assert 'goods_reminder_span_seconds_max{span="database.query"} 0.500000\n' in text
+    assert 'goods_reminder_events_total{counter="database.rows"} 10\n' in text
@@ -0,0 +1,84 @@
+"""Contains tests for mail dispatcher module"""
+from mail_dispatcher import MailDispatcher, SmtpConnectionPool
+from rate_limiter import RateLimiter
+from tests.fake_smtp_server import FakeSmtpServer
+from tests.helpers import connect_to
+
+
+def test_dispatch_sends_all_messages_concurrently():
+    """Checks if every message is delivered and reported as successful when sent
+    by several connections from pool"""
+
+    # GIVEN
+    messages = [(f"employee{number}@gmail.com", f"Subject: reminder {number}\n\nbody")
+                for number in range(20)]
+    with FakeSmtpServer() as server:
+        with SmtpConnectionPool(connect_to(server), size=3) as pool:
+            dispatcher = MailDispatcher(pool, sender="autoadmfactor@gmail.com")
+            # WHEN
+            results = dispatcher.dispatch(messages)
+        # THEN
+        assert len(server.messages) == 20
+        assert pool.opened_connections == 0
+    assert [result.mail_to for result in results] == [mail_to for mail_to, _ in messages]
+    assert all(result.success and result.attempts == 1 for result in results)
+
+
+def test_dispatch_retries_transient_failure_and_dropped_session():
+    """Checks if message is sent again after temporary server error and after
+    dropped session what needs new connection"""
+
+    # GIVEN
+    with FakeSmtpServer() as server:
+        server.responses = ["421 Try again later", "disconnect"]
+        with SmtpConnectionPool(connect_to(server), size=1) as pool:
+            dispatcher = MailDispatcher(pool, sender="autoadmfactor@gmail.com",
+                                        retry_delay=0)
+            # WHEN
+            results = dispatcher.dispatch([("buyer@gmail.com", "Subject: test\n\nbody")])
+        # THEN
+        assert len(server.messages) == 1
+        assert server.data_commands == 3
+    assert results[0].success is True
+    assert results[0].attempts == 3
+
+
+def test_dispatch_reports_permanent_failure():
+    """Checks if permanently rejected message is not retried and is reported as failed"""
+
+    # GIVEN
+    with FakeSmtpServer() as server:
+        server.responses = ["554 Message rejected"]
+        with SmtpConnectionPool(connect_to(server), size=2) as pool:
+            dispatcher = MailDispatcher(pool, sender="autoadmfactor@gmail.com",
+                                        retry_delay=0)
+            # WHEN
+            results = dispatcher.dispatch([("buyer@gmail.com", "Subject: test\n\nbody")])
+        # THEN
+        assert server.messages == []
+    assert results[0].success is False
+    assert results[0].attempts == 1
+    assert results[0].error.smtp_code == 554
+
+
+def test_dispatch_throttles_on_temporary_failure():
+    """Checks if rate limiter is informed about 421 response and every message is counted
+    in backlog only until it is finished"""
+
+    # GIVEN
+    limiter = RateLimiter(per_minute=600, backoff_seconds=0)
+    with FakeSmtpServer() as server:
+        server.responses = ["421 Too many messages"]
+        with SmtpConnectionPool(connect_to(server), size=2) as pool:
+            dispatcher = MailDispatcher(pool, sender="autoadmfactor@gmail.com",
+                                        retry_delay=0, rate_limiter=limiter)
+            # WHEN
+            results = dispatcher.dispatch([(f"buyer{number}@gmail.com", "Subject: t\n\nbody")
+                                           for number in range(3)])
+        # THEN
+        assert len(server.messages) == 3
+    metrics = limiter.get_metrics()
+    assert all(result.success for result in results)
+    assert metrics["throttle_events"] == 1
+    assert metrics["sent_messages"] == 3
+    assert metrics["backlog"] == 0
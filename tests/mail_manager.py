@@ -77,17 +77,17 @@ def test_send_email(mock_smtp):
             msg="witam")
 
 
-def test_create_email_template():
-    """Checks if methos correctly creates complete email message from template"""
+@patch("smtplib.SMTP_SSL")
+def test_send_message(mock_smtp):
+    """Checks if MIME message is passed to connection with admin address as sender"""
 
-    #GIVEN
+    # GIVEN
     test_email = Email()
-    expected_email_content = "From: Alert from system\n"\
-                             "Subject: Raw material RAW23 needs review\n"\
-                             "Reminder!\nRaw material RAW23 has 2010 kg "\
-                             "stock and was reviewed last time on 22-04-2022"
-    #WHEN
-    test_email_content = test_email.create_email_template(
-        material_name="RAW23", stock="2010",last_review_date="22-04-2022")
-    #THEN
-    assert test_email_content == expected_email_content
+    message = test_email.create_message_builder("System alert").build(
+        mail_to="adampolakfactor@gmail.com", subject="Test", text="witam")
+    with smtplib.SMTP_SSL(host="smtp.gmail.com", port=465) as test_email.server:
+        context = mock_smtp.return_value.__enter__.return_value
+        # WHEN
+        test_email.send_message(message)
+        # THEN
+        context.send_message.assert_called_with(message, from_addr=test_email.admin_email)
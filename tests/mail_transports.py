@@ -0,0 +1,110 @@
+"""Contains tests for mail transports module"""
+from argparse import Namespace
+import datetime
+import mailbox
+from freezegun import freeze_time
+import pytest
+from database_manager import Database
+from mail_manager import Email, MessageBuilder
+from mail_transports import MailboxTransport, MemoryTransport
+from program import Program
+from tests.fake_smtp_server import FakeSmtpServer
+from tests.helpers import create_test_database
+
+
+def test_mailbox_transports_write_sent_messages(tmp_path):
+    """Checks if messages sent through mbox and Maildir transports are saved in mailboxes
+    when connection is closed"""
+
+    # GIVEN
+    builder = MessageBuilder("autoadmfactor@gmail.com", "Alert from system")
+    message = builder.build("adampolakfactor@gmail.com", "Raw material BYSE needs review",
+                            "Reminder!")
+    mbox_path = str(tmp_path / "reminders.mbox")
+    maildir_path = str(tmp_path / "maildir")
+    # WHEN
+    for transport in (MailboxTransport(mbox_path, "mbox"),
+                      MailboxTransport(maildir_path, "maildir")):
+        connection = transport.open_connection()
+        connection.send_message(message, from_addr="autoadmfactor@gmail.com")
+        connection.sendmail("autoadmfactor@gmail.com", "autoadmfactor@gmail.com",
+                            "Subject: Raw material 22REW needs review\n\nReminder!")
+        connection.quit()
+    # THEN
+    for saved_mailbox in (mailbox.mbox(mbox_path), mailbox.Maildir(maildir_path)):
+        assert sorted(saved_message["Subject"] for saved_message in saved_mailbox) == [
+            "Raw material 22REW needs review", "Raw material BYSE needs review"]
+
+
+def test_local_smtp_transport_sends_without_login():
+    """Checks if local SMTP transport chosen by name sends messages to provided server
+    without password"""
+
+    # GIVEN
+    test_email = Email()
+    with FakeSmtpServer() as server:
+        test_email.transport = test_email.create_transport("local_smtp",
+                                                           f"127.0.0.1:{server.port}")
+        # WHEN
+        connection = test_email.open_connection(None)
+        connection.sendmail("autoadmfactor@gmail.com", "adampolakfactor@gmail.com",
+                            "Subject: Raw material OILB needs review\n\nReminder!")
+        connection.quit()
+        # THEN
+        assert len(server.messages) == 1
+    assert not test_email.requires_password()
+
+
+def test_dry_run_sends_due_reminders_and_discards_changes(capsys):
+    """Checks if dry run passes reminders of all due materials to memory transport and
+    leaves outbox and sent reminders empty"""
+
+    # GIVEN
+    test_program = Program()
+    test_program.database = create_test_database()
+    test_program.database.parsed_arguments = Namespace(
+        smtp_connections=2, max_per_minute=1, max_per_day=None, shards=[],
+        suppression_days=7, dry_run=True)
+    test_program.email.transport = MemoryTransport()
+    # WHEN
+    with freeze_time(datetime.date(2022, 4, 22)):
+        test_program.run_dry_run(test_program.database.parsed_arguments)
+    # THEN
+    assert sorted(to_addrs for to_addrs, _ in test_program.email.transport.messages) == [
+        "adampolakfactor@gmail.com", "autoadmfactor@gmail.com", "autoadmfactor@gmail.com"]
+    assert "Dry run: 3 messages" in capsys.readouterr().out
+    for table in ("outbox", "sent_reminders"):
+        test_program.database.cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        assert test_program.database.cursor.fetchone()[0] == 0
+
+
+def test_dry_run_of_remind_subcommand_discards_changes(monkeypatch, capsys, tmp_path):
+    """Checks if remind subcommand run with --dry_run sends digests to memory transport
+    and saves nothing, while memory transport is refused without --dry_run"""
+
+    # GIVEN
+    database_path = str(tmp_path / "goods.db")
+    test_database = Database(database_path)
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    test_database.add_sample_raw_materials_stocks()
+    test_database.disconnect_database()
+    test_program = Program()
+    test_program.database = Database(database_path)
+    monkeypatch.setattr("sys.argv", ["main.py", "--dry_run", "remind", "--digest"])
+    test_program.database.define_parser_arguments()
+    capsys.readouterr()
+    # WHEN
+    with freeze_time(datetime.date(2022, 4, 22)):
+        test_program.run_chosen_mode()
+    monkeypatch.setattr("sys.argv", ["main.py", "--transport", "memory", "remind"])
+    with pytest.raises(SystemExit) as exit_info:
+        Database(database_path).define_parser_arguments()
+    # THEN
+    assert "Dry run: 2 messages" in capsys.readouterr().out
+    assert exit_info.value.code == 2
+    test_database.connect_database()
+    for table in ("outbox", "sent_reminders"):
+        test_database.cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        assert test_database.cursor.fetchone()[0] == 0
+    test_database.disconnect_database()
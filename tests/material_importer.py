@@ -0,0 +1,78 @@
+"""Contains tests for material importer module"""
+import datetime
+import sqlite3
+from freezegun import freeze_time
+import pytest
+from database_manager import Database
+from exceptions.material_importer_exceptions import InvalidMaterialRow
+from material_importer import MaterialImporter
+
+
+def test_import_file_csv_inserts_and_updates_by_sku(tmp_path):
+    """Checks if rows from CSV file are inserted and material with already existing
+    SKU is updated instead of duplicated"""
+
+    # GIVEN
+    import_path = tmp_path / "materials.csv"
+    import_path.write_text(
+        "sku_description,sku_id,current_stock_kg,price,last_review_date,responsible_employee\n"
+        "22REW,345721,50,8.10,2022-04-21,autoadmfactor@gmail.com\n"
+        "NEWRM,400001,120,2.50,2022-04-20,adampolakfactor@gmail.com\n",
+        encoding="utf-8")
+    expected_materials = [
+        (1, '22REW', 345721, 50, 8.1, '2022-04-21', 'autoadmfactor@gmail.com'),
+        (2, '32REW', 345718, 2000, 4.2, '2022-04-18', 'adampolakfactor@gmail.com'),
+        (3, 'BYSE', 345719, 10000, 3, '2022-04-17', 'autoadmfactor@gmail.com'),
+        (4, 'OILB', 345729, 1740, 11.4, '2022-04-20', 'adampolakfactor@gmail.com'),
+        (6, 'NEWRM', 400001, 120, 2.5, '2022-04-20', 'adampolakfactor@gmail.com')]
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+        importer = MaterialImporter(test_database, chunk_size=1)
+        # WHEN
+        imported_rows = importer.import_file(str(import_path))
+        # THEN
+        assert imported_rows == 2
+        assert importer.rejected_rows == []
+        assert test_database.get_all_materials() == expected_materials
+
+
+@freeze_time(datetime.date(2022, 4, 21))
+def test_import_file_json_lines_rejects_invalid_rows(tmp_path):
+    """Checks if invalid rows of JSON Lines file are skipped and remembered with line
+    number, while valid ones are saved with today's date when review date is missing"""
+
+    # GIVEN
+    import_path = tmp_path / "materials.jsonl"
+    import_path.write_text(
+        '{"sku_description": "OILC", "sku_id": 500001, "current_stock_kg": 10, '
+        '"price": 1.5, "responsible_employee": "autoadmfactor@gmail.com"}\n'
+        '{"sku_description": "BAD", "sku_id": "abc", "current_stock_kg": 10, '
+        '"price": 1.5, "responsible_employee": "autoadmfactor@gmail.com"}\n'
+        'not json\n',
+        encoding="utf-8")
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        importer = MaterialImporter(test_database)
+        # WHEN
+        imported_rows = importer.import_file(str(import_path))
+        # THEN
+        assert imported_rows == 1
+        assert [line_number for line_number, _ in importer.rejected_rows] == [2, 3]
+        assert test_database.get_all_materials() == [
+            (1, 'OILC', 500001, 10, 1.5, '2022-04-21', 'autoadmfactor@gmail.com')]
+
+
+def test_validate_record_negative_stock():
+    """Checks if record with negative stock is not accepted"""
+
+    # GIVEN
+    record = {"sku_description": "22REW", "sku_id": "345721", "current_stock_kg": "-1",
+              "price": "7.89", "responsible_employee": "autoadmfactor@gmail.com"}
+    # WHEN
+    with pytest.raises(InvalidMaterialRow):
+        MaterialImporter.validate_record(record)
@@ -0,0 +1,51 @@
+"""Contains tests for materials cache module"""
+import datetime
+import sqlite3
+from freezegun import freeze_time
+from database_manager import Database
+from materials_cache import MaterialsCache
+from tests.helpers import create_test_database
+
+
+def test_cache_is_reused_until_database_is_written():
+    """Checks if materials are loaded once for repeated views and loaded again after
+    program changed stock"""
+
+    # GIVEN
+    test_database = create_test_database()
+    test_cache = MaterialsCache(test_database)
+    # WHEN
+    with freeze_time(datetime.date(2022, 4, 21)):
+        first_due_materials = test_cache.get_materials_to_review()
+        first_snapshot = test_cache.get_all_materials()
+        second_snapshot = test_cache.get_all_materials()
+        test_database.update_stocks([(345718, 100)])
+        second_due_materials = test_cache.get_materials_to_review()
+    # THEN
+    assert [material.sku_id for material in first_due_materials] == [345718, 345719]
+    assert first_snapshot is second_snapshot
+    assert [material.sku_id for material in second_due_materials] == [345719]
+    assert test_cache.get_material(345718).current_stock_kg == 100
+    assert [material.sku_id for material in test_cache.get_employee_materials(
+        "autoadmfactor@gmail.com")] == [345721, 345719]
+
+
+def test_cache_is_invalidated_by_other_connection(tmp_path):
+    """Checks if change made by other process is noticed through data version"""
+
+    # GIVEN
+    test_database = Database(str(tmp_path / "goods.db"))
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    test_database.add_sample_raw_materials_stocks()
+    test_cache = MaterialsCache(test_database)
+    first_snapshot = test_cache.get_all_materials()
+    # WHEN
+    with sqlite3.connect(test_database.path) as other_connection:
+        other_connection.execute("DELETE FROM raw_materials_stock WHERE sku_id = 345729")
+    other_connection.close()
+    second_snapshot = test_cache.get_all_materials()
+    # THEN
+    assert len(first_snapshot) == 4
+    assert len(second_snapshot) == 3
+    assert test_cache.get_material(345729) is None
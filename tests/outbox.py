@@ -0,0 +1,110 @@
+"""Contains tests for outbox module"""
+import datetime
+from freezegun import freeze_time
+from database_manager import Database
+from mail_dispatcher import MailDispatcher, SmtpConnectionPool
+from outbox import Outbox
+from tests.fake_smtp_server import FakeSmtpServer
+from tests.helpers import connect_to
+
+
+def create_test_outbox(**outbox_options):
+    """Returns outbox of new in-memory database"""
+
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    return Outbox(test_database, **outbox_options)
+
+
+def drain_to(server, test_outbox):
+    """Sends pending messages of outbox to provided fake server"""
+
+    with SmtpConnectionPool(connect_to(server), size=1) as pool:
+        dispatcher = MailDispatcher(pool, sender="autoadmfactor@gmail.com", max_attempts=1)
+        return test_outbox.drain(dispatcher, batch_size=2)
+
+
+def test_enqueue_skips_already_queued_keys():
+    """Checks if enqueueing the same reminders again does not duplicate them"""
+
+    # GIVEN
+    test_outbox = create_test_outbox()
+    entries = [("reminder:345721:2022-04-19", "autoadmfactor@gmail.com", "Subject: a\n\na"),
+               ("reminder:345718:2022-04-18", "adampolakfactor@gmail.com", "Subject: b\n\nb")]
+    # WHEN
+    first_enqueued = test_outbox.enqueue(entries)
+    second_enqueued = test_outbox.enqueue(entries)
+    # THEN
+    assert first_enqueued == 2
+    assert second_enqueued == 0
+    assert test_outbox.count_pending() == 2
+
+
+def test_drain_resumes_from_pending_messages():
+    """Checks if sent messages are not sent again, while message what failed temporarily
+    stays pending for later attempt and permanently rejected one is failed"""
+
+    # GIVEN
+    test_outbox = create_test_outbox(backoff_seconds=0)
+    test_outbox.enqueue((f"reminder:{number}", f"buyer{number}@gmail.com",
+                         f"Subject: {number}\n\nbody") for number in range(5))
+    with FakeSmtpServer() as server:
+        server.responses = [None, "451 Try later", None, "550 No such user"]
+        # WHEN
+        first_results = drain_to(server, test_outbox)
+        second_results = drain_to(server, test_outbox)
+        # THEN
+        assert len(server.messages) == 4
+    test_outbox.database.cursor.execute("SELECT dedupe_key, status, attempts FROM outbox"
+                                        " ORDER BY id")
+    assert test_outbox.database.cursor.fetchall() == [
+        ("reminder:0", "sent", 1), ("reminder:1", "sent", 2), ("reminder:2", "sent", 1),
+        ("reminder:3", "failed", 1), ("reminder:4", "sent", 1)]
+    assert [result.success for result in first_results] == [True, False, True, False,
+                                                            True, True]
+    assert second_results == []
+
+
+def test_drain_deletes_messages_sent_before_retention_time():
+    """Checks if drain deletes messages sent earlier than retention time ago and keeps
+    recently sent ones"""
+
+    # GIVEN
+    test_outbox = create_test_outbox(retention_days=7)
+    test_outbox.enqueue((f"reminder:{number}", f"buyer{number}@gmail.com",
+                         f"Subject: {number}\n\nbody") for number in range(2))
+    with FakeSmtpServer() as server:
+        drain_to(server, test_outbox)
+        test_outbox.database.cursor.execute(
+            "UPDATE outbox SET sent_at=? WHERE dedupe_key='reminder:0'",
+            (datetime.datetime.now() - datetime.timedelta(days=8),))
+        # WHEN
+        drain_to(server, test_outbox)
+    # THEN
+    test_outbox.database.cursor.execute("SELECT dedupe_key, status FROM outbox")
+    assert test_outbox.database.cursor.fetchall() == [("reminder:1", "sent")]
+
+
+def test_claim_pending_skips_messages_claimed_by_other_drain():
+    """Checks if messages claimed by one drain are not claimed by overlapping one until
+    their lease ends"""
+
+    # GIVEN
+    test_outbox = create_test_outbox(lease_seconds=60)
+    other_outbox = Outbox(test_outbox.database, lease_seconds=60)
+    start_time = datetime.datetime(2022, 4, 22, 8)
+    with freeze_time(start_time):
+        test_outbox.enqueue((f"reminder:{number}", f"buyer{number}@gmail.com",
+                             f"Subject: {number}\n\nbody") for number in range(5))
+        # WHEN
+        first_entries = test_outbox.claim_pending(2)
+        other_entries = other_outbox.claim_pending(10)
+        repeated_entries = test_outbox.claim_pending(10)
+    with freeze_time(start_time + datetime.timedelta(minutes=2)):
+        expired_entries = other_outbox.claim_pending(10)
+    # THEN
+    assert [entry[0] for entry in first_entries] == [1, 2]
+    assert [entry[0] for entry in other_entries] == [3, 4, 5]
+    assert repeated_entries == []
+    assert [entry[0] for entry in expired_entries] == [1, 2, 3, 4, 5]
@@ -1,5 +1,13 @@
 """Collects test from program module"""
+import datetime
+import socket
+from freezegun import freeze_time
+import pytest
+from database_manager import Database, Material
+from mail_transports import LocalSmtpTransport
 from program import Program
+from stock_forecast import ReorderForecast
+from tests.helpers import create_test_database
 
 
 def test_fill_message_template():
@@ -15,3 +23,191 @@ def test_fill_message_template():
     message = test_program.fill_message_template("22REW", "200", "2022-04-19")
     # THEN
     assert message == expected_message
+
+
+def test_fill_digest_template():
+    """Checks if digest message lists all provided materials of one person as table"""
+
+    # GIVEN
+    test_program = Program()
+    materials = [
+        Material(1, '22REW', 345721, 1000, 7.89, '2022-04-19', 'autoadmfactor@gmail.com'),
+        Material(3, 'BYSE', 345719, 10000, 3, '2022-04-17', 'autoadmfactor@gmail.com')]
+    expected_message = "From: System alert\n" \
+                       "Subject: 2 raw materials need review\n" \
+                       "Reminder!\n Raw materials managed by autoadmfactor@gmail.com " \
+                       "were not reviewed for too long:\n" \
+                       "sku_id      sku_description         current_stock_kg    " \
+                       "last_review_date\n" \
+                       "345721      22REW                   1000                2022-04-19\n" \
+                       "345719      BYSE                    10000               2022-04-17"
+    # WHEN
+    message = test_program.fill_digest_template("autoadmfactor@gmail.com", materials)
+    # THEN
+    assert message == expected_message
+
+
+def test_build_reminder_messages_mime():
+    """Checks if reminders of batch are MIME messages sharing sender and date headers,
+    having unique ids and keeping non-ASCII material names"""
+
+    # GIVEN
+    test_program = Program()
+    materials = [
+        Material(1, 'Żelatyna', 345721, 1000, 7.89, '2022-04-19', 'autoadmfactor@gmail.com'),
+        Material(3, 'BYSE', 345719, 10000, 3, '2022-04-17', 'adampolakfactor@gmail.com')]
+    # WHEN
+    messages = test_program.build_reminder_messages(materials)
+    # THEN
+    assert [message["To"] for message in messages] == ['autoadmfactor@gmail.com',
+                                                       'adampolakfactor@gmail.com']
+    assert messages[0]["Subject"] == "Raw material Żelatyna needs review"
+    assert messages[0]["From"] == messages[1]["From"] == "System alert <autoadmfactor@gmail.com>"
+    assert messages[0]["Date"] == messages[1]["Date"]
+    assert messages[0]["Message-ID"] != messages[1]["Message-ID"]
+    assert "Żelatyna has 1000 kg" in messages[0].get_body(("plain",)).get_content()
+    assert messages[0].get_body(("html",)) is not None
+    assert messages[0].as_bytes().isascii()
+
+
+def run_test_command(test_program, monkeypatch, *command):
+    """Parses provided subcommand and runs it with program"""
+
+    monkeypatch.setattr("sys.argv", ["main.py", *command])
+    test_program.database.define_parser_arguments()
+    return test_program.run_command()
+
+
+def test_subcommands_process_many_materials(monkeypatch, capsys):
+    """Checks if add, set-stock and list subcommands process many SKUs in single call
+    and report not existing ones"""
+
+    # GIVEN
+    test_program = Program()
+    test_program.database = Database(":memory:")
+    test_program.database.connect_database()
+    test_program.database.create_raw_materials_table()
+    # WHEN
+    added = run_test_command(test_program, monkeypatch, "add",
+                             "--material", "22REW", "345721", "1000", "7.89",
+                             "autoadmfactor@gmail.com",
+                             "--material", "BYSE", "345719", "10000", "3",
+                             "autoadmfactor@gmail.com")
+    updated = run_test_command(test_program, monkeypatch, "set-stock",
+                               "345721=900", "345719=20", "999=1")
+    capsys.readouterr()
+    listed = run_test_command(test_program, monkeypatch, "export", "csv",
+                              "--columns", "sku_id,current_stock_kg",
+                              "--sku", "345719", "345721")
+    # THEN
+    assert (added, updated, listed) == (True, False, True)
+    assert capsys.readouterr().out == "sku_id,current_stock_kg\n345721,900\n345719,20\n"
+
+
+def test_import_flag_reports_unreadable_files(monkeypatch, capsys, tmp_path):
+    """Checks if --import flag reports file of not supported type and missing file
+    instead of failing"""
+
+    # GIVEN
+    unsupported_file = tmp_path / "materials.txt"
+    unsupported_file.write_text("22REW", encoding="utf-8")
+    outputs = []
+    for import_file in [str(unsupported_file), str(tmp_path / "missing.csv")]:
+        test_program = Program()
+        test_program.database = Database(":memory:")
+        monkeypatch.setattr("sys.argv", ["main.py", "--import", import_file])
+        test_program.database.define_parser_arguments()
+        # WHEN
+        test_program.run_chosen_mode()
+        outputs.append(capsys.readouterr().out)
+    # THEN
+    assert "materials.txt not imported: Not supported file type" in outputs[0]
+    assert "missing.csv not imported" in outputs[1]
+
+
+def test_update_stocks_flag_reports_unreadable_files(monkeypatch, capsys, tmp_path):
+    """Checks if --update_stocks flag reports file of not supported type and missing file
+    and exits with error status instead of failing"""
+
+    # GIVEN
+    unsupported_file = tmp_path / "stocks.txt"
+    unsupported_file.write_text("345721,900", encoding="utf-8")
+    outputs = []
+    exit_codes = []
+    for stocks_file in [str(unsupported_file), str(tmp_path / "missing.csv")]:
+        test_program = Program()
+        test_program.database = Database(":memory:")
+        monkeypatch.setattr("sys.argv", ["main.py", "--update_stocks", stocks_file])
+        test_program.database.define_parser_arguments()
+        # WHEN
+        with pytest.raises(SystemExit) as exit_info:
+            test_program.run_chosen_mode()
+        exit_codes.append(exit_info.value.code)
+        outputs.append(capsys.readouterr().out)
+    # THEN
+    assert exit_codes == [1, 1]
+    assert "stocks.txt not imported: Not supported file type" in outputs[0]
+    assert "missing.csv not imported" in outputs[1]
+
+
+def test_set_stock_subcommand_reports_missing_file(monkeypatch, capsys, tmp_path):
+    """Checks if set-stock subcommand reports missing file and fails instead of raising"""
+
+    # GIVEN
+    test_program = Program()
+    test_program.database = Database(":memory:")
+    test_program.database.connect_database()
+    test_program.database.create_raw_materials_table()
+    # WHEN
+    updated = run_test_command(test_program, monkeypatch, "set-stock",
+                               "--file", str(tmp_path / "missing.csv"))
+    # THEN
+    assert updated is False
+    assert "missing.csv not imported" in capsys.readouterr().out
+
+
+def test_remind_subcommand_fails_when_server_is_unreachable(monkeypatch, capsys):
+    """Checks if remind subcommand reports connection error and queued messages and
+    fails instead of raising"""
+
+    # GIVEN
+    with socket.socket() as closed_socket:
+        closed_socket.bind(("127.0.0.1", 0))
+        closed_port = closed_socket.getsockname()[1]
+    test_program = Program()
+    test_program.database = create_test_database()
+    test_program.email.transport = LocalSmtpTransport("127.0.0.1", closed_port)
+    monkeypatch.setenv("ADMIN_EMAIL_PASSWORD", "fake_pass")
+    # WHEN
+    with freeze_time(datetime.date(2022, 4, 21)):
+        succeeded = run_test_command(test_program, monkeypatch, "remind")
+    # THEN
+    output = capsys.readouterr().out
+    assert succeeded is False
+    assert "Connection failed" in output
+    assert "Messages remain queued in outbox: 2" in output
+
+
+def test_digest_messages_include_reorder_alerts():
+    """Checks if materials to be reordered are listed in digest of their responsible
+    person, who gets no other email about them"""
+
+    # GIVEN
+    test_program = Program()
+    test_program.database = create_test_database()
+    forecasts = [
+        ReorderForecast(Material(4, 'OILB', 345729, 1740, 11.4, '2022-04-20',
+                                 'adampolakfactor@gmail.com'), 500, 3.48),
+        ReorderForecast(Material(5, 'SALT', 345730, 20, 0.5, '2022-04-21',
+                                 'buyer@gmail.com'), 10, 2)]
+    # WHEN
+    with freeze_time(datetime.date(2022, 4, 21)):
+        digests = list(test_program.create_digest_messages(forecasts=forecasts))
+    # THEN
+    assert [(recipient, message["Subject"]) for _, recipient, message in digests] == [
+        ("adampolakfactor@gmail.com", "1 raw materials need review, 1 need reorder"),
+        ("autoadmfactor@gmail.com", "1 raw materials need review"),
+        ("buyer@gmail.com", "0 raw materials need review, 1 need reorder")]
+    adam_text = digests[0][2].get_body(("plain",)).get_content()
+    assert "345729      OILB                    1740                3.5" in adam_text
+    assert "<td>SALT</td>" in digests[2][2].get_body(("html",)).get_content()
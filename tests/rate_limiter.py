@@ -0,0 +1,88 @@
+"""Contains tests for rate limiter module"""
+import datetime
+from database_manager import Database
+from rate_limiter import RateLimiter
+
+
+class FakeClock():
+    """Replaces time source and sleeping, so limiter can be tested without waiting"""
+
+    def __init__(self):
+        """Initiates clock at time zero"""
+
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Moves time forward instead of waiting"""
+
+        self.now += seconds
+
+
+def test_acquire_keeps_per_minute_quota():
+    """Checks if sending over per-minute quota waits until new token is available"""
+
+    # GIVEN
+    clock = FakeClock()
+    limiter = RateLimiter(per_minute=60, clock=clock, sleep=clock.sleep)
+    # WHEN
+    for _ in range(61):
+        limiter.acquire()
+    # THEN
+    assert clock.now == 1.0
+    assert limiter.get_metrics()["waited_seconds"] == 1.0
+
+
+def test_on_throttled_pauses_and_halves_rate():
+    """Checks if temporary failure pauses sending, halves allowed rate and is counted,
+    while successful sends restore the rate"""
+
+    # GIVEN
+    clock = FakeClock()
+    limiter = RateLimiter(per_minute=60, backoff_seconds=10, recovery_step=0.25,
+                          clock=clock, sleep=clock.sleep)
+    # WHEN
+    limiter.on_throttled()
+    limiter.acquire()
+    throttled_metrics = limiter.get_metrics()
+    limiter.on_success()
+    limiter.on_success()
+    # THEN
+    assert clock.now == 10.0
+    assert throttled_metrics["throttle_events"] == 1
+    assert throttled_metrics["rate_factor"] == 0.5
+    assert limiter.get_metrics()["rate_factor"] == 1.0
+    assert limiter.get_metrics()["sent_messages"] == 2
+
+
+def test_per_day_quota_is_kept_across_runs():
+    """Checks if messages sent by previous runs today are saved in database and taken
+    from per-day quota of next limiter, while counts of other days are dropped"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    today = datetime.date(2022, 4, 21)
+    test_database.add_daily_sent_messages(5, datetime.date(2022, 4, 20))
+    clock = FakeClock()
+    first_limiter = RateLimiter(per_day=3, clock=clock, sleep=clock.sleep,
+                                sent_today=test_database.get_daily_sent_messages(today))
+    for _ in range(2):
+        first_limiter.acquire()
+        first_limiter.on_success()
+    # WHEN
+    test_database.add_daily_sent_messages(first_limiter.take_unsaved_messages(), today)
+    second_limiter = RateLimiter(per_day=3, clock=clock, sleep=clock.sleep,
+                                 sent_today=test_database.get_daily_sent_messages(today))
+    second_limiter.acquire()
+    waited_before_second = clock.now
+    second_limiter.acquire()
+    # THEN
+    assert test_database.get_daily_sent_messages(today) == 2
+    assert test_database.get_daily_sent_messages(datetime.date(2022, 4, 20)) == 0
+    assert first_limiter.take_unsaved_messages() == 0
+    assert waited_before_second == 0
+    assert clock.now == 86400 / 3
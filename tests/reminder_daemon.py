@@ -0,0 +1,151 @@
+"""Contains tests for reminder daemon module"""
+import datetime
+import smtplib
+import sqlite3
+from freezegun import freeze_time
+import pytest
+from database_manager import Database
+from mail_manager import Email
+from program import Program
+from reminder_daemon import ReminderDaemon
+from reminder_suppression import ReminderSuppressor
+from tests.fake_smtp_server import FakeSmtpServer
+
+
+def create_test_daemon(test_database, server):
+    """Returns daemon sending emails to provided fake server"""
+
+    test_email = Email()
+
+    def open_connection(admin_password):
+        connection = smtplib.SMTP(host="127.0.0.1", port=server.port, timeout=5)
+        connection.login(user=test_email.admin_email, password=admin_password)
+        return connection
+
+    test_email.open_connection = open_connection
+    test_program = Program()
+    test_program.email = test_email
+    return ReminderDaemon(test_database, test_email, test_program.build_reminder_messages,
+                          admin_password="fake_pass", smtp_connections=2)
+
+
+def test_run_once_sends_only_newly_due_materials():
+    """Checks if daemon reminds about every due material once and in following runs
+    sends only materials what became due since previous run"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+        with FakeSmtpServer() as server:
+            test_daemon = create_test_daemon(test_database, server)
+            # WHEN
+            with freeze_time(datetime.date(2022, 4, 21)):
+                first_results = test_daemon.run_once()
+                repeated_results = test_daemon.run_once()
+            with freeze_time(datetime.date(2022, 4, 22)):
+                next_day_results = test_daemon.run_once()
+            # THEN
+            assert len(server.messages) == 3
+        test_database.cursor.execute("SELECT sku_id FROM notification_ledger ORDER BY sku_id")
+        notified_skus = [row[0] for row in test_database.cursor.fetchall()]
+    assert [result.mail_to for result in first_results] == [
+        'adampolakfactor@gmail.com', 'autoadmfactor@gmail.com']
+    assert repeated_results == []
+    assert [result.mail_to for result in next_day_results] == ['autoadmfactor@gmail.com']
+    assert notified_skus == [345718, 345719, 345721]
+
+
+def test_run_once_sends_material_added_with_old_review_date():
+    """Checks if material imported after previous run with review date older than
+    previous runs is reminded about"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+        with FakeSmtpServer() as server:
+            test_daemon = create_test_daemon(test_database, server)
+            # WHEN
+            with freeze_time(datetime.date(2022, 4, 22)):
+                test_daemon.run_once()
+                test_database.add_materials([("OLD1", 777, 50, 2.5, datetime.date(2022, 1, 1),
+                                              "adampolakfactor@gmail.com")])
+                next_results = test_daemon.run_once()
+    # THEN
+    assert [(result.mail_to, result.success) for result in next_results] == [
+        ('adampolakfactor@gmail.com', True)]
+
+
+def test_run_once_retries_failed_materials():
+    """Checks if material what reminder failed for is sent again in next run, while
+    already notified ones are not repeated"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+        with FakeSmtpServer() as server:
+            test_daemon = create_test_daemon(test_database, server)
+            test_daemon.smtp_connections = 1
+            server.responses = ["554 Message rejected"]
+            # WHEN
+            with freeze_time(datetime.date(2022, 4, 21)):
+                first_results = test_daemon.run_once()
+                second_results = test_daemon.run_once()
+    # THEN
+    assert [result.success for result in first_results] == [False, True]
+    assert [result.mail_to for result in second_results] == ['adampolakfactor@gmail.com']
+    assert second_results[0].success is True
+
+
+def test_run_once_skips_materials_reminded_by_remind_command():
+    """Checks if daemon with suppressor does not repeat reminders already sent by remind
+    subcommand and saves its own reminders, so remind subcommand skips them"""
+
+    # GIVEN
+    test_database = Database(":memory:")
+    with sqlite3.connect(test_database.path) as test_database.connection:
+        test_database.cursor = test_database.connection.cursor()
+        test_database.create_raw_materials_table()
+        test_database.add_sample_raw_materials_stocks()
+        with FakeSmtpServer() as server:
+            test_daemon = create_test_daemon(test_database, server)
+            test_daemon.suppressor = ReminderSuppressor(test_database)
+            # WHEN
+            with freeze_time(datetime.date(2022, 4, 21)):
+                reminded_materials = list(test_database.iter_materials_to_review())
+                test_daemon.suppressor.mark_sent(reminded_materials)
+                first_results = test_daemon.run_once()
+            with freeze_time(datetime.date(2022, 4, 22)):
+                next_day_results = test_daemon.run_once()
+                remaining_materials = test_daemon.suppressor.filter(
+                    list(test_database.iter_materials_to_review()))
+    # THEN
+    assert first_results == []
+    assert [result.mail_to for result in next_day_results] == ['autoadmfactor@gmail.com']
+    assert remaining_materials == []
+
+
+def test_run_once_flag_fails_without_password(monkeypatch, capsys):
+    """Checks if --run_once flag reports missing password and exits with error status"""
+
+    # GIVEN
+    test_program = Program()
+    test_program.database = Database(":memory:")
+    test_program.database.connect_database()
+    monkeypatch.delenv("ADMIN_EMAIL_PASSWORD", raising=False)
+    monkeypatch.setattr("sys.argv", ["main.py", "--run_once"])
+    test_program.database.define_parser_arguments()
+    # WHEN
+    with pytest.raises(SystemExit) as exit_info:
+        test_program.run_reminder_daemon()
+    # THEN
+    assert exit_info.value.code == 1
+    assert "Email password not provided" in capsys.readouterr().out
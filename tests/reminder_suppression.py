@@ -0,0 +1,85 @@
+"""Contains tests for reminder suppression module"""
+import datetime
+from freezegun import freeze_time
+from database_manager import Material
+from outbox import Outbox
+from program import Program
+from reminder_suppression import ReminderSuppressor
+from shard_scanner import ShardResult
+from tests.helpers import create_test_database
+
+
+def test_filter_drops_reminders_sent_within_window():
+    """Checks if reminder is dropped for the same person, material and review date until
+    suppression window passes and its key is evicted then"""
+
+    # GIVEN
+    test_suppressor = ReminderSuppressor(create_test_database(), window_days=7)
+    material = Material(1, '22REW', 345721, 1000, 7.89, datetime.date(2022, 4, 19),
+                        'autoadmfactor@gmail.com')
+    reviewed_material = material._replace(last_review_date=datetime.date(2022, 4, 25))
+    other_person_material = material._replace(responsible_employee='buyer@gmail.com')
+    # WHEN
+    with freeze_time(datetime.datetime(2022, 4, 21, 8)):
+        first_materials = test_suppressor.filter([material])
+        test_suppressor.mark_sent(first_materials)
+    with freeze_time(datetime.datetime(2022, 4, 27, 8)):
+        second_materials = test_suppressor.filter([material, reviewed_material,
+                                                   other_person_material])
+    with freeze_time(datetime.datetime(2022, 4, 29, 8)):
+        evicted_keys = test_suppressor.evict()
+        third_materials = test_suppressor.filter([material])
+    # THEN
+    assert first_materials == [material]
+    assert second_materials == [reviewed_material, other_person_material]
+    assert evicted_keys == 1
+    assert third_materials == [material]
+
+
+def test_reminders_are_coalesced_across_shards_and_runs():
+    """Checks if the same reminder found in two shards is created once and is not
+    created again by next run"""
+
+    # GIVEN
+    test_program = Program()
+    test_program.database = create_test_database()
+    materials = test_program.database.get_materials_to_review()
+    shard_results = [ShardResult("plant_a", "plant_a.db", materials, 0.0, None),
+                     ShardResult("plant_b", "plant_b.db", materials[:1], 0.0, None)]
+    test_suppressor = ReminderSuppressor(test_program.database)
+    # WHEN
+    first_messages = list(test_program.create_reminder_messages(
+        shard_results=shard_results, suppressor=test_suppressor))
+    second_messages = list(test_program.create_reminder_messages(
+        shard_results=shard_results, suppressor=test_suppressor))
+    # THEN
+    assert [key for key, _, _ in first_messages] == [
+        "reminder:plant_a:345721:2022-04-19", "reminder:plant_a:345718:2022-04-18",
+        "reminder:plant_a:345719:2022-04-17", "reminder:plant_a:345729:2022-04-20"]
+    assert second_messages == []
+
+
+def test_digest_of_newly_due_material_is_not_dropped():
+    """Checks if material what became due after digest of its person was enqueued gets
+    its own digest the same day, while repeated run enqueues nothing"""
+
+    # GIVEN
+    test_program = Program()
+    test_program.database = create_test_database()
+    test_suppressor = ReminderSuppressor(test_program.database)
+    test_outbox = Outbox(test_program.database)
+    # WHEN
+    with freeze_time(datetime.datetime(2022, 4, 21, 8)):
+        first_enqueued = test_outbox.enqueue(test_program.create_digest_messages(
+            suppressor=test_suppressor))
+        test_program.database.add_materials([("OLD1", 777, 50, 2.5, datetime.date(2022, 1, 1),
+                                              "autoadmfactor@gmail.com")])
+        second_entries = list(test_program.create_digest_messages(
+            suppressor=test_suppressor))
+        second_enqueued = test_outbox.enqueue(second_entries)
+        third_enqueued = test_outbox.enqueue(test_program.create_digest_messages(
+            suppressor=test_suppressor))
+    # THEN
+    assert (first_enqueued, second_enqueued, third_enqueued) == (2, 1, 0)
+    assert second_entries[0][2]["Subject"] == "1 raw materials need review"
+    assert "OLD1" in second_entries[0][2].get_body(("plain",)).get_content()
@@ -0,0 +1,97 @@
+"""Contains tests for shard scanner module"""
+import sqlite3
+from database_manager import Database
+from program import Program
+from shard_scanner import ShardScanner, find_shard_paths
+
+
+def create_test_shard(path, sample_materials=True):
+    """Creates plant database file with sample materials"""
+
+    test_database = Database(str(path))
+    test_database.connect_database()
+    test_database.create_raw_materials_table()
+    if sample_materials:
+        test_database.add_sample_raw_materials_stocks()
+    test_database.disconnect_database()
+    return str(path)
+
+
+def test_find_shard_paths_expands_directories(tmp_path):
+    """Checks if directory is replaced by database files it contains"""
+
+    # GIVEN
+    (tmp_path / "plants").mkdir()
+    for name in ["plant_b.db", "plant_a.db", "notes.txt"]:
+        (tmp_path / "plants" / name).touch()
+    # WHEN
+    paths = find_shard_paths([str(tmp_path / "plants"), str(tmp_path / "other.db")])
+    # THEN
+    assert paths == [str(tmp_path / "plants" / "plant_a.db"),
+                     str(tmp_path / "plants" / "plant_b.db"), str(tmp_path / "other.db")]
+
+
+def test_scan_merges_shards_and_reports_missing_ones(tmp_path):
+    """Checks if materials of all shards are merged in threads and processes, while
+    missing shard is reported without stopping the scan"""
+
+    # GIVEN
+    paths = [create_test_shard(tmp_path / "plant_a.db"),
+             str(tmp_path / "missing.db"),
+             create_test_shard(tmp_path / "plant_b.db", sample_materials=False)]
+    for use_processes in [False, True]:
+        # WHEN
+        results = ShardScanner(paths, workers=2, use_processes=use_processes).scan()
+        # THEN
+        assert [result.shard for result in results] == ["plant_a", "missing", "plant_b"]
+        assert [len(result.materials) for result in results] == [4, 0, 0]
+        assert [result.error is None for result in results] == [True, False, True]
+        assert results[0].materials[0].sku_description == "22REW"
+
+
+def test_scan_reads_unmigrated_shard_without_changing_it(tmp_path):
+    """Checks if shard without indexes and tables of newer schema is scanned and its
+    file is left unchanged"""
+
+    # GIVEN
+    path = str(tmp_path / "plant_old.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE raw_materials_stock (id INTEGER PRIMARY KEY, "
+                       "sku_description TEXT, sku_id INTEGER, current_stock_kg NUMERIC, "
+                       "price NUMERIC, last_review_date DATE, responsible_employee TEXT)")
+    connection.execute("INSERT INTO raw_materials_stock(sku_description, sku_id, "
+                       "current_stock_kg, price, last_review_date, responsible_employee) "
+                       "VALUES ('22REW', 345721, 1000, 7.89, '2022-04-19', "
+                       "'autoadmfactor@gmail.com')")
+    connection.commit()
+    connection.close()
+    with open(path, "rb") as file:
+        content = file.read()
+    # WHEN
+    results = ShardScanner([path]).scan()
+    # THEN
+    assert results[0].error is None
+    assert [material.sku_id for material in results[0].materials] == [345721]
+    with open(path, "rb") as file:
+        assert file.read() == content
+
+
+def test_sharded_messages_have_shard_keys_and_merged_digests(tmp_path):
+    """Checks if reminder keys contain shard name and one person gets single digest
+    for all plants"""
+
+    # GIVEN
+    paths = [create_test_shard(tmp_path / "plant_a.db"),
+             create_test_shard(tmp_path / "plant_b.db")]
+    results = ShardScanner(paths).scan()
+    test_program = Program()
+    # WHEN
+    reminders = list(test_program.create_reminder_messages(shard_results=results))
+    digests = list(test_program.create_digest_messages(shard_results=results))
+    # THEN
+    assert len(reminders) == 8
+    assert reminders[0][0] == "reminder:plant_a:345721:2022-04-19"
+    assert reminders[4][0] == "reminder:plant_b:345721:2022-04-19"
+    assert [recipient for _, recipient, _ in digests] == ["adampolakfactor@gmail.com",
+                                                          "autoadmfactor@gmail.com"]
+    assert digests[0][2]["Subject"] == "4 raw materials need review"
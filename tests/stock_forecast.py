@@ -0,0 +1,104 @@
+"""Contains tests for stock forecast module"""
+import datetime
+from program import Program
+from stock_forecast import StockForecaster
+from tests.helpers import create_test_database
+
+
+def add_stock_history(test_database, sku_id, stock_levels):
+    """Saves stock levels of material recorded on subsequent days ending today"""
+
+    today = datetime.datetime.now().replace(microsecond=0)
+    with test_database.transaction() as cursor:
+        cursor.executemany("INSERT INTO stock_history(sku_id, stock_kg, recorded_at)"
+                           " VALUES (?, ?, ?)",
+                           ((sku_id, stock_kg,
+                             today - datetime.timedelta(days=len(stock_levels) - day))
+                            for day, stock_kg in enumerate(stock_levels, start=1)))
+
+
+def test_stock_changes_are_recorded_in_history():
+    """Checks if added materials and every stock change are saved in stock history"""
+
+    # GIVEN
+    test_database = create_test_database()
+    # WHEN
+    test_database.update_stocks([(345721, 900), (345721, 800)])
+    # THEN
+    test_database.cursor.execute("SELECT sku_id, stock_kg FROM stock_history ORDER BY id")
+    assert test_database.cursor.fetchall() == [(345721, 1000), (345718, 2000),
+                                               (345719, 10000), (345729, 1740),
+                                               (345721, 900), (345721, 800)]
+
+
+def test_unchanged_stocks_are_not_recorded_in_history():
+    """Checks if setting stock level equal to current one adds no stock history"""
+
+    # GIVEN
+    test_database = create_test_database()
+    # WHEN
+    test_database.update_stocks([(345721, 1000), (345718, 1500)])
+    # THEN
+    test_database.cursor.execute("SELECT sku_id, stock_kg FROM stock_history ORDER BY id")
+    assert test_database.cursor.fetchall()[-2:] == [(345729, 1740), (345718, 1500)]
+
+
+def test_refresh_deletes_history_older_than_window():
+    """Checks if stock history recorded before forecast window is deleted and the
+    forecast of material is calculated from the remaining history"""
+
+    # GIVEN
+    test_database = create_test_database()
+    with test_database.transaction() as cursor:
+        cursor.execute("DELETE FROM stock_history")
+    add_stock_history(test_database, 345721, [5000] + [1000] * 30 + [900, 800])
+    test_forecaster = StockForecaster(test_database, window_days=30)
+    # WHEN
+    recalculated_materials = test_forecaster.refresh()
+    # THEN
+    test_database.cursor.execute("SELECT COUNT(*), MIN(stock_kg) FROM stock_history")
+    assert test_database.cursor.fetchone() == (30, 800)
+    test_database.cursor.execute("SELECT consumption_kg_per_day FROM stock_forecast")
+    assert recalculated_materials == 1
+    assert round(test_database.cursor.fetchone()[0], 2) == round(200 / 29, 2)
+
+
+def test_refresh_recalculates_only_changed_materials():
+    """Checks if consumption ignores deliveries, materials running out within lead time
+    and horizon are returned and only materials with new history are recalculated"""
+
+    # GIVEN
+    test_database = create_test_database()
+    test_database.update_stocks([(345721, 700)])
+    with test_database.transaction() as cursor:
+        cursor.execute("DELETE FROM stock_history")
+    add_stock_history(test_database, 345721, [1000, 900, 1200, 800, 700])
+    add_stock_history(test_database, 345718, [2000, 1990, 1980])
+    test_forecaster = StockForecaster(test_database, lead_time_days=7, horizon_days=3)
+    # WHEN
+    first_recalculated = test_forecaster.refresh()
+    second_recalculated = test_forecaster.refresh()
+    add_stock_history(test_database, 345718, [2500])
+    third_recalculated = test_forecaster.refresh()
+    forecasts = list(test_forecaster.iter_materials_to_reorder())
+    # THEN
+    assert (first_recalculated, second_recalculated, third_recalculated) == (2, 0, 1)
+    assert [forecast.material.sku_id for forecast in forecasts] == [345721]
+    assert forecasts[0].consumption_kg_per_day == 150
+    assert round(forecasts[0].days_of_cover, 2) == 4.67
+
+
+def test_create_reorder_messages():
+    """Checks if reminder about material to be reordered shows its days of cover"""
+
+    # GIVEN
+    test_database = create_test_database()
+    add_stock_history(test_database, 345729, [3740, 1740])
+    test_program = Program()
+    test_program.database = test_database
+    # WHEN
+    messages = test_program.create_reorder_messages()
+    # THEN
+    assert [(key, recipient) for key, recipient, _ in messages] == [
+        (f"reorder:345729:{datetime.date.today()}", "adampolakfactor@gmail.com")]
+    assert messages[0][2]["Subject"] == "Raw material OILB will run out in 0.9 days"
@@ -0,0 +1,30 @@
+"""Contains tests for stock report module"""
+import datetime
+from freezegun import freeze_time
+from stock_report import StockReport
+from tests.helpers import create_test_database
+
+
+def test_create_sums_value_overdue_materials_and_ages():
+    """Checks if report contains stock value and overdue materials of every person and
+    histogram of days since last review"""
+
+    # GIVEN
+    test_database = create_test_database()
+    # WHEN
+    with freeze_time(datetime.date(2022, 4, 21)):
+        report = StockReport(test_database, days_interval=3,
+                             age_limits=(1, 3)).create()
+    # THEN
+    assert report["materials"] == 4
+    assert round(report["stock_value"], 2) == 66126
+    assert report["overdue_materials"] == 2
+    assert [(owner["responsible_employee"], owner["materials"],
+             round(owner["stock_value"], 2), owner["overdue_materials"])
+            for owner in report["owners"]] == [
+        ("autoadmfactor@gmail.com", 2, 37890, 1),
+        ("adampolakfactor@gmail.com", 2, 28236, 1)]
+    assert report["age_histogram"] == [{"label": "0-1", "materials": 1},
+                                       {"label": "2-3", "materials": 2},
+                                       {"label": ">3", "materials": 1}]
+    assert set(report["timings"]) == {"owners", "age_histogram"}
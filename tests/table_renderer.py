@@ -0,0 +1,46 @@
+"""Contains tests for table renderer module"""
+import io
+from table_renderer import TableRenderer
+
+
+def test_render_text_table():
+    """Checks if rows rendered in chunks give the same aligned table as printing
+    cell by cell"""
+
+    # GIVEN
+    stream = io.StringIO()
+    renderer = TableRenderer(["sku_id", "price"], stream=stream, chunk_size=2, column_width=8)
+    rows = [(345721, 7.89), (345718, 4.2), (345719, 3)]
+    expected_output = "sku_id   price    \n" \
+                      "345721   7.89     \n" \
+                      "345718   4.2      \n" \
+                      "345719   3        \n"
+    # WHEN
+    renderer.render(rows)
+    # THEN
+    assert stream.getvalue() == expected_output
+
+
+def test_export_csv():
+    """Checks if rows are written as CSV with headers"""
+
+    # GIVEN
+    stream = io.StringIO()
+    renderer = TableRenderer(["sku_description", "sku_id"], stream=stream)
+    # WHEN
+    renderer.write([("22REW", 345721), ("OIL, B", 345729)], output_format="csv")
+    # THEN
+    assert stream.getvalue() == 'sku_description,sku_id\n22REW,345721\n"OIL, B",345729\n'
+
+
+def test_export_json_lines():
+    """Checks if every row is written as separate JSON object with column names as keys"""
+
+    # GIVEN
+    stream = io.StringIO()
+    renderer = TableRenderer(["sku_description", "sku_id"], stream=stream)
+    # WHEN
+    renderer.write([("22REW", 345721), ("BYSE", 345719)], output_format="jsonl")
+    # THEN
+    assert stream.getvalue() == '{"sku_description": "22REW", "sku_id": 345721}\n' \
+                                '{"sku_description": "BYSE", "sku_id": 345719}\n'
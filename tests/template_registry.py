@@ -0,0 +1,92 @@
+"""Contains tests for template registry module"""
+import os
+from template_registry import HtmlMarkup, TemplateRegistry
+
+
+def create_template(directory, subject, body):
+    """Saves template files of template named notice in provided directory"""
+
+    template_directory = directory / "notice"
+    template_directory.mkdir(exist_ok=True)
+    (template_directory / "subject.txt").write_text(subject + "\n", encoding="utf-8")
+    (template_directory / "body.txt").write_text(body + "\n", encoding="utf-8")
+    return template_directory
+
+
+def test_render_many_uses_compiled_template(tmp_path):
+    """Checks if batch of values is rendered with template loaded once and html body is
+    empty when template has no html file"""
+
+    # GIVEN
+    create_template(tmp_path, "Check $material_name", "Stock: $stock kg")
+    registry = TemplateRegistry(str(tmp_path))
+    values_list = [{"material_name": "22REW", "stock": 1000},
+                   {"material_name": "BYSE", "stock": 10000}]
+    # WHEN
+    messages = list(registry.render_many("notice", values_list))
+    # THEN
+    assert [message.subject for message in messages] == ["Check 22REW", "Check BYSE"]
+    assert [message.text for message in messages] == ["Stock: 1000 kg", "Stock: 10000 kg"]
+    assert messages[0].html is None
+    assert list(registry.cache) == ["notice"]
+
+
+def test_get_reloads_modified_template(tmp_path):
+    """Checks if cached template is replaced when its file is modified"""
+
+    # GIVEN
+    template_directory = create_template(tmp_path, "Check $material_name", "Old body")
+    registry = TemplateRegistry(str(tmp_path))
+    first_template = registry.get("notice")
+    body_path = template_directory / "body.txt"
+    body_path.write_text("New body for $material_name\n", encoding="utf-8")
+    modification_time = os.stat(body_path).st_mtime_ns + 1000000000
+    os.utime(body_path, ns=(modification_time, modification_time))
+    # WHEN
+    cached_template = registry.get("notice")
+    message = registry.render("notice", material_name="OILB")
+    # THEN
+    assert cached_template is not first_template
+    assert message.text == "New body for OILB"
+
+
+def test_render_escapes_values_in_html_body(tmp_path):
+    """Checks if values are escaped only in html body and HtmlMarkup is inserted as it is"""
+
+    # GIVEN
+    template_directory = create_template(tmp_path, "Check $material_name",
+                                         "Material: $material_name")
+    (template_directory / "body.html").write_text("<p>$material_name</p>$rows",
+                                                  encoding="utf-8")
+    registry = TemplateRegistry(str(tmp_path))
+    # WHEN
+    message = registry.render("notice", material_name="Oil <b>&</b> Fat",
+                              rows=HtmlMarkup("<tr><td>1</td></tr>"))
+    # THEN
+    assert message.subject == "Check Oil <b>&</b> Fat"
+    assert message.text == "Material: Oil <b>&</b> Fat"
+    assert message.html == "<p>Oil &lt;b&gt;&amp;&lt;/b&gt; Fat</p><tr><td>1</td></tr>"
+
+
+class FormatTemplate():
+    """Template filled with str.format placeholders"""
+
+    def __init__(self, content):
+        self.content = content
+
+    def substitute(self, values):
+        """Fills template with values"""
+
+        return self.content.format_map(values)
+
+
+def test_render_uses_provided_template_engine(tmp_path):
+    """Checks if template files are compiled with provided template engine"""
+
+    # GIVEN
+    create_template(tmp_path, "Check {material_name}", "Stock: {stock} kg")
+    registry = TemplateRegistry(str(tmp_path), compile_template=FormatTemplate)
+    # WHEN
+    message = registry.render("notice", material_name="22REW", stock=1000)
+    # THEN
+    assert (message.subject, message.text) == ("Check 22REW", "Stock: 1000 kg")